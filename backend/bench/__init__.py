@@ -0,0 +1,2 @@
+# This file makes the bench directory a Python package
+# Allows running the benchmark suite from backend/: python -m bench.run
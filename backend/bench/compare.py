@@ -0,0 +1,61 @@
+# backend/bench/compare.py - Side-by-side comparison of two bench.run result files
+#
+#   python -m bench.compare bench/results/OLD.json bench/results/NEW.json [--threshold 5]
+
+import argparse
+import json
+from typing import List
+
+
+def _change(old: float, new: float) -> str:
+    if not old:
+        return "n/a"
+    return f"{100 * (new - old) / old:+.1f}%"
+
+
+def compare(old: dict, new: dict, threshold: float = 5.0) -> List[str]:
+    """
+    Table rows comparing runs with the same scenario and concurrency: throughput
+    and p50/p95/p99 per operation. Changes beyond threshold percent are marked
+    (+ better, - worse); errors are shown when either side had any.
+    """
+    lines = [f"old: {old['git'].get('commit') or '?'} {old.get('label') or ''} ({old['created_at']})",
+             f"new: {new['git'].get('commit') or '?'} {new.get('label') or ''} ({new['created_at']})", ""]
+    old_runs = {(r['scenario'], r['concurrency']): r for r in old['runs']}
+    header = f"{'scenario/operation':<34} {'metric':<8} {'old':>10} {'new':>10} {'change':>8}"
+    for run in new['runs']:
+        key = (run['scenario'], run['concurrency'])
+        base = old_runs.get(key)
+        if base is None:
+            lines.append(f"{run['scenario']} @ {run['concurrency']}: not in old results")
+            continue
+        lines += [f"{run['scenario']} @ concurrency {run['concurrency']}", header]
+        rows = [('all', base, run)] + [(op, base['operations'].get(op), stats)
+                                       for op, stats in run['operations'].items()]
+        for name, before, after in rows:
+            if before is None:
+                continue
+            metrics = [('rps', before['throughput_rps'], after['throughput_rps'], True)]
+            metrics += [(p, before['latency_ms'][p], after['latency_ms'][p], False) for p in ('p50', 'p95', 'p99')]
+            for metric, a, b, higher_is_better in metrics:
+                mark = ""
+                if a and abs(100 * (b - a) / a) >= threshold:
+                    mark = " +" if (b > a) == higher_is_better else " -"
+                lines.append(f"  {name:<32} {metric:<8} {a:>10.2f} {b:>10.2f} {_change(a, b):>8}{mark}")
+            if before['errors'] or after['errors']:
+                lines.append(f"  {name:<32} {'errors':<8} {before['errors']:>10} {after['errors']:>10}")
+        lines.append("")
+    return lines
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=5.0, help="Mark changes of at least this many percent")
+    args = parser.parse_args()
+    with open(args.old, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    print("\n".join(compare(old, new, args.threshold)))
@@ -0,0 +1,65 @@
+# backend/bench/fake_openai.py - Local stand-in for the OpenAI chat completions API
+#
+# Lets benchmarks exercise the real AsyncOpenAI client path (HTTP, JSON, SSE parsing)
+# without network calls or cost. Start it and point the app at it:
+#   uvicorn bench.fake_openai:app --port 9911
+#   OPENAI_BASE_URL=http://127.0.0.1:9911/v1 OPENAI_API_KEY=bench uvicorn main:app
+
+import asyncio
+import json
+import os
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+BENCH_OPENAI_LATENCY_MS = float(os.getenv("BENCH_OPENAI_LATENCY_MS", "300"))  # Until the full reply (or first token)
+BENCH_OPENAI_TOKEN_MS = float(os.getenv("BENCH_OPENAI_TOKEN_MS", "10"))  # Between streamed tokens
+BENCH_OPENAI_REPLY_WORDS = int(os.getenv("BENCH_OPENAI_REPLY_WORDS", "60"))
+
+app = FastAPI(title="Fake OpenAI API for benchmarks")
+
+_WORDS = ("Most adult dogs do well on two measured meals a day of a complete and balanced food "
+          "sized for their breed; puppies need three to four smaller meals and seniors fewer calories").split()
+
+
+def _reply(messages: list) -> list:
+    # Deterministic per prompt, so repeated questions give the same answer
+    offset = len(json.dumps(messages)) % len(_WORDS)
+    return [_WORDS[(offset + i) % len(_WORDS)] for i in range(BENCH_OPENAI_REPLY_WORDS)]
+
+
+def _usage(messages: list, words: list) -> dict:
+    prompt = sum(len(m.get("content") or "") for m in messages) // 4 + 1  # Rough token estimate
+    return {"prompt_tokens": prompt, "completion_tokens": len(words), "total_tokens": prompt + len(words)}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    messages = body.get("messages") or []
+    words = _reply(messages)
+    created = int(time.time())
+    base = {"id": "chatcmpl-bench", "created": created, "model": body.get("model", "bench")}
+    await asyncio.sleep(BENCH_OPENAI_LATENCY_MS / 1000)
+    if not body.get("stream"):
+        return JSONResponse({
+            **base, "object": "chat.completion",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)},
+                         "finish_reason": "stop"}],
+            "usage": _usage(messages, words),
+        })
+
+    async def events():
+        for i, word in enumerate(words):
+            chunk = {**base, "object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word},
+                                  "finish_reason": None}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+            if BENCH_OPENAI_TOKEN_MS:
+                await asyncio.sleep(BENCH_OPENAI_TOKEN_MS / 1000)
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': _usage(messages, words)})}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
@@ -0,0 +1,96 @@
+# backend/bench/postgres.py - Throwaway PostgreSQL cluster for benchmark runs
+
+import logging
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+from typing import Optional
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+# Directory holding initdb/pg_ctl; found on PATH (or via pg_config) when unset
+PG_BIN = os.getenv("PG_BIN")
+
+
+def _find_bin_dir() -> str:
+    if PG_BIN:
+        return PG_BIN
+    initdb = shutil.which("initdb")
+    if initdb:
+        return os.path.dirname(initdb)
+    pg_config = shutil.which("pg_config")
+    if pg_config:
+        return subprocess.run([pg_config, "--bindir"], capture_output=True, text=True, check=True).stdout.strip()
+    raise RuntimeError("PostgreSQL binaries not found; install PostgreSQL or set PG_BIN to the directory with initdb")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class TemporaryPostgres:
+    """
+    A private PostgreSQL cluster in a temporary directory, reachable only
+    through a Unix socket in that directory, and deleted on exit. fsync is
+    off: fine for benchmarks, never for data you care about. Note that
+    initdb refuses to run as root.
+
+    Usage:
+        with TemporaryPostgres() as pg:
+            seed(pg.dsn, ...)
+    """
+
+    def __init__(self, bin_dir: Optional[str] = None, database: str = "bench"):
+        self.bin_dir = bin_dir or _find_bin_dir()
+        self.database = database
+        self.directory = None
+        self.port = None
+
+    @property
+    def dsn(self) -> str:
+        return f"postgresql://postgres@/{self.database}?host={self.directory}&port={self.port}"
+
+    def _run(self, *args):
+        subprocess.run([os.path.join(self.bin_dir, args[0]), *args[1:]], check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    def start(self) -> "TemporaryPostgres":
+        self.directory = tempfile.mkdtemp(prefix="dogdiet-bench-pg-")
+        self.port = free_port()
+        data = os.path.join(self.directory, "data")
+        try:
+            self._run("initdb", "-D", data, "-U", "postgres", "-A", "trust", "-E", "UTF8", "--no-sync")
+            self._run("pg_ctl", "-D", data, "-l", os.path.join(self.directory, "postgres.log"), "-w", "start", "-o",
+                      f"-p {self.port} -k {self.directory} -c listen_addresses='' -c fsync=off "
+                      f"-c synchronous_commit=off -c full_page_writes=off")
+        except subprocess.CalledProcessError as e:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            raise RuntimeError(f"Could not start a temporary PostgreSQL cluster: {e.stderr.decode(errors='replace')}")
+        conn = psycopg2.connect(host=self.directory, port=self.port, user="postgres", dbname="postgres")
+        conn.autocommit = True
+        conn.cursor().execute(f"CREATE DATABASE {self.database}")
+        conn.close()
+        logger.info("Temporary PostgreSQL running in %s (port %d)", self.directory, self.port)
+        return self
+
+    def stop(self):
+        if self.directory is None:
+            return
+        try:
+            self._run("pg_ctl", "-D", os.path.join(self.directory, "data"), "-m", "immediate", "-w", "stop")
+        except subprocess.CalledProcessError as e:
+            logger.warning("pg_ctl stop failed: %s", e.stderr.decode(errors='replace'))
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.directory = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
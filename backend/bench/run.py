@@ -0,0 +1,218 @@
+# backend/bench/run.py - Seed a database, start the API, drive workloads and save the results as JSON
+#
+# Run from backend/:
+#   python -m bench.run --temp-postgres --scenario mixed --concurrency 16 --duration 30
+#   python -m bench.run --database-url postgresql://localhost/bench --reset --scenario breed_reads --scenario chat
+#   python -m bench.run --url http://127.0.0.1:5000 --no-seed --scenario breed_reads   # Already running server
+# Compare two runs with: python -m bench.compare OLD.json NEW.json
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+from bench.postgres import TemporaryPostgres, free_port
+from bench.seed import BENCH_BREEDS, BENCH_RESPONSES, BENCH_SEED, seed
+from bench.workload import SCENARIOS, build_operations, parse_mix, run_workload
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# App settings recorded with each result (secrets and connection strings are left out)
+RECORDED_ENV_PREFIXES = ("DB_", "CHAT_", "BREED_", "SUBMIT_", "REPORT_", "ANALYTICS_", "METRICS_", "OPENAI_MODEL")
+APP_READY_TIMEOUT = 60
+
+
+class ServerProcess:
+    """A uvicorn subprocess, stopped on exit; output goes to a log file next to the results."""
+
+    def __init__(self, app: str, port: int, env: Dict[str, str], workers: int = 1, log_path: Optional[str] = None):
+        self.app = app
+        self.port = port
+        self.env = env
+        self.workers = workers
+        self.log_path = log_path
+        self._process = None
+        self._log = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self._log = open(self.log_path, "ab") if self.log_path else subprocess.DEVNULL
+        self._process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", self.app, "--host", "127.0.0.1", "--port", str(self.port),
+             "--workers", str(self.workers), "--log-level", "warning", "--no-access-log"],
+            cwd=BACKEND_DIR, env=self.env, stdout=self._log, stderr=subprocess.STDOUT,
+        )
+        return self
+
+    def wait_ready(self, path: str, timeout: float = APP_READY_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                raise RuntimeError(f"{self.app} exited with code {self._process.returncode} (see {self.log_path})")
+            try:
+                if httpx.get(self.url + path, timeout=2).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f"{self.app} did not become ready within {timeout:g}s (see {self.log_path})")
+
+    def __exit__(self, *exc):
+        self._process.terminate()
+        try:
+            self._process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+        if self._log not in (None, subprocess.DEVNULL):
+            self._log.close()
+
+
+def git_info() -> dict:
+    def git(*args) -> Optional[str]:
+        try:
+            return subprocess.run(["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {'commit': git("rev-parse", "HEAD"), 'branch': git("rev-parse", "--abbrev-ref", "HEAD"),
+            'dirty': bool(status) if status is not None else None}
+
+
+def app_environment(dsn: str, chat: str, fake_openai_url: Optional[str], overrides: List[str]) -> Dict[str, str]:
+    """Environment for the app under test: the caller's, pointed at the bench database and a local chat backend."""
+    env = dict(os.environ, DATABASE_URL=dsn, PYTHONUNBUFFERED="1")
+    if chat == "fake":
+        env["CHAT_PROVIDER"] = "fake"
+    else:
+        env.update(CHAT_PROVIDER="openai", OPENAI_BASE_URL=fake_openai_url, OPENAI_API_KEY="bench")
+    for item in overrides:
+        key, _, value = item.partition("=")
+        env[key] = value
+    return env
+
+
+def run(args) -> dict:
+    """Run every requested scenario at every concurrency level; returns the result document."""
+    scenarios = {name: SCENARIOS[name] for name in args.scenario or ([] if args.mix else ['mixed'])}
+    if args.mix:
+        scenarios['custom'] = parse_mix(args.mix)
+    operations = build_operations(args.breeds, args.chat_questions)
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    started_at = datetime.now(timezone.utc)
+    log_path = os.path.join(RESULTS_DIR, f"{started_at:%Y%m%dT%H%M%SZ}-server.log")
+
+    result = {
+        'version': 1,
+        'label': args.label,
+        'created_at': started_at.isoformat(),
+        'git': git_info(),
+        'host': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'config': {
+            'duration_s': args.duration, 'warmup_s': args.warmup, 'seed': args.seed, 'chat': args.chat,
+            'workers': args.workers, 'chat_questions': args.chat_questions,
+            'database': 'temporary' if args.temp_postgres else ('external' if args.url else 'given'),
+        },
+        'data': None,
+        'app_env': {},
+        'runs': [],
+    }
+
+    with ExitStack() as stack:
+        base_url = args.url
+        if not base_url:
+            dsn = args.database_url
+            if args.temp_postgres:
+                dsn = stack.enter_context(TemporaryPostgres()).dsn
+            if not args.no_seed:
+                logger.info("Seeding %d breeds and %d responses", args.breeds, args.responses)
+                result['data'] = seed(dsn, args.breeds, args.responses, args.seed, reset=args.reset or args.temp_postgres)
+            fake_openai_url = None
+            if args.chat == "stub":
+                stub = stack.enter_context(ServerProcess("bench.fake_openai:app", free_port(), dict(os.environ),
+                                                         log_path=log_path))
+                stub.wait_ready("/openapi.json")
+                fake_openai_url = stub.url + "/v1"
+            env = app_environment(dsn, args.chat, fake_openai_url, args.app_env)
+            result['app_env'] = {k: v for k, v in sorted(env.items()) if k.startswith(RECORDED_ENV_PREFIXES)}
+            server = stack.enter_context(ServerProcess("main:app", free_port(), env, args.workers, log_path))
+            server.wait_ready("/api/db/pool")
+            base_url = server.url
+
+        for name, mix in scenarios.items():
+            for concurrency in args.concurrency:
+                logger.info("Scenario %s at concurrency %d for %gs (+%gs warmup)",
+                            name, concurrency, args.duration, args.warmup)
+                summary = asyncio.run(run_workload(base_url, operations, mix, concurrency, args.duration,
+                                                   args.warmup, args.seed))
+                result['runs'].append({'scenario': name, **summary})
+                latency = summary['latency_ms']
+                logger.info("  %.1f req/s, p50 %.1f ms, p95 %.1f ms, p99 %.1f ms, %d errors",
+                            summary['throughput_rps'], latency['p50'], latency['p95'], latency['p99'],
+                            summary['errors'])
+    return result
+
+
+def default_output(result: dict) -> str:
+    commit = (result['git'].get('commit') or 'nogit')[:10]
+    stamp = result['created_at'][:19].replace('-', '').replace(':', '')
+    return os.path.join(RESULTS_DIR, f"{stamp}Z-{commit}{'-dirty' if result['git'].get('dirty') else ''}.json")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the Dog Diet API with synthetic data and fixed concurrency")
+    where = parser.add_mutually_exclusive_group()
+    where.add_argument('--temp-postgres', action='store_true',
+                       help="Run against a throwaway PostgreSQL cluster (needs initdb/pg_ctl; see PG_BIN)")
+    where.add_argument('--database-url', default=os.getenv("BENCH_DATABASE_URL"),
+                       help="Seed and run against this database (default: BENCH_DATABASE_URL)")
+    where.add_argument('--url', help="Benchmark an already running API instead of starting one")
+    parser.add_argument('--reset', action='store_true', help="Drop and recreate the app tables before seeding")
+    parser.add_argument('--no-seed', action='store_true', help="Use the data already in the database")
+    parser.add_argument('--breeds', type=int, default=BENCH_BREEDS)
+    parser.add_argument('--responses', type=int, default=BENCH_RESPONSES)
+    parser.add_argument('--seed', type=int, default=BENCH_SEED, help="Seeds both the data and the request sequence")
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help="Workload to run (repeatable; default: mixed)")
+    parser.add_argument('--mix', help="Custom operation weights, e.g. breed_get=5,submit=1")
+    parser.add_argument('--concurrency', type=lambda v: [int(c) for c in v.split(',')], default=[16],
+                        help="Concurrent clients, or a comma-separated list to sweep (e.g. 1,8,32)")
+    parser.add_argument('--duration', type=float, default=30, help="Measured seconds per run")
+    parser.add_argument('--warmup', type=float, default=5, help="Unmeasured seconds before each run")
+    parser.add_argument('--chat', choices=('stub', 'fake'), default='stub',
+                        help="stub: real OpenAI client against bench.fake_openai; fake: CHAT_PROVIDER=fake")
+    parser.add_argument('--chat-questions', type=int, default=50, help="Distinct chat questions (fewer = more cache hits)")
+    parser.add_argument('--workers', type=int, default=1, help="uvicorn workers for the app under test")
+    parser.add_argument('--app-env', action='append', default=[], metavar='KEY=VALUE',
+                        help="Extra environment for the app under test (repeatable), e.g. DB_BACKEND=async")
+    parser.add_argument('--label', help="Free-form note stored with the results")
+    parser.add_argument('--output', help="Result file (default: bench/results/<time>-<commit>.json)")
+    args = parser.parse_args()
+    if args.url and args.app_env:
+        parser.error("--app-env only applies when bench.run starts the app")
+    if args.database_url is None and not (args.temp_postgres or args.url):
+        parser.error("one of --temp-postgres, --database-url (or BENCH_DATABASE_URL) or --url is required")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # One line per request otherwise
+
+    result = run(args)
+    output = args.output or default_output(result)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    logger.info("Results written to %s", output)
@@ -0,0 +1,191 @@
+# backend/bench/seed.py - Synthetic breeds and questionnaire responses for benchmark databases
+#
+# Run from backend/ against a database you can throw away:
+#   python -m bench.seed --database-url postgresql://... --breeds 400 --responses 100000 --reset
+# The same --seed always produces the same rows (timestamps are relative to the time of seeding).
+
+import argparse
+import io
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+import psycopg2
+
+from database import ROLLUP_UPDATE_SQL, ROLLUP_WATERMARK_SQL
+from services.migrations import migrate
+
+logger = logging.getLogger(__name__)
+
+BENCH_BREEDS = int(os.getenv("BENCH_BREEDS", "400"))
+BENCH_RESPONSES = int(os.getenv("BENCH_RESPONSES", "100000"))
+BENCH_SEED = int(os.getenv("BENCH_SEED", "42"))
+
+SEEDED_TABLES = ("questionnaire_status_rollup", "questionnaire_rollup", "analytics_watermark",
+                 "questions_dog_initial3", "breeds_AKC_Rsrch_FoodV1", "schema_migrations")
+
+# Statuses from services/report_rules.json; most dogs have none, a few have two
+STATUSES = ["none", "puppy", "elderly", "pregnant", "allergy", "other health issues"]
+STATUS_WEIGHTS = [50, 15, 15, 5, 10, 5]
+
+_PREFIXES = ["Alpine", "Border", "Coastal", "Dutch", "English", "Field", "Golden", "Highland", "Irish", "Jura",
+             "King", "Lowland", "Miniature", "Northern", "Old", "Portuguese", "Royal", "Silver", "Toy", "Welsh"]
+_KINDS = ["Retriever", "Terrier", "Spaniel", "Hound", "Shepherd", "Setter", "Pointer", "Collie", "Mastiff", "Poodle",
+          "Schnauzer", "Sheepdog", "Bulldog", "Spitz", "Pinscher", "Corgi", "Beagle", "Husky", "Greyhound", "Dachshund"]
+_GROUPS = ["sporting", "hound", "working", "terrier", "toy", "non-sporting", "herding", "misc"]
+_SIZES = ["small", "medium", "large", "extra large"]
+_BRANDS = ["Nutri-Source", "Blue Buffalo", "Hill's Science Diet", "Fromm", "Purina Pro Plan"]
+_FORMATS = ["kibble", "wet", "raw"]
+
+COPY_CHUNK_ROWS = 50000
+
+
+def breed_names(count: int) -> list:
+    """count distinct, readable breed names ("Alpine Retriever", ..., then "Alpine Retriever 2", ...)."""
+    base = [f"{prefix} {kind}" for kind in _KINDS for prefix in _PREFIXES]
+    return [base[i % len(base)] + ("" if i < len(base) else f" {i // len(base) + 1}") for i in range(count)]
+
+
+def breed_rows(count: int, rng: random.Random) -> list:
+    rows = []
+    for i, name in enumerate(breed_names(count)):
+        rows.append((
+            name,
+            f"{name.split(' ')[-1]} {i}" if rng.random() < 0.3 else None,  # Alias on some breeds
+            rng.choice(_GROUPS),
+            rng.choice(_SIZES),
+            round(rng.uniform(8, 16), 1),
+            rng.choice("YN"),
+            rng.choice(_BRANDS),
+            f"{rng.choice(_BRANDS)} {rng.choice(['Adult', 'Puppy', 'Senior'])} Formula",
+            rng.choice(_FORMATS),
+            None,
+            None,
+            None,
+            f"bench-{i:06d}",
+        ))
+    return rows
+
+
+def _statuses(rng: random.Random) -> list:
+    picked = rng.choices(STATUSES, STATUS_WEIGHTS, k=2 if rng.random() < 0.2 else 1)
+    if "none" in picked and len(picked) > 1:
+        picked.remove("none")
+    return list(dict.fromkeys(picked))
+
+
+def _copy_value(value) -> str:
+    if value is None:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+def _copy(cursor, table: str, columns: tuple, rows):
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_value(v) for v in row) + "\n")
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+
+def seed(dsn: str, breeds: int = BENCH_BREEDS, responses: int = BENCH_RESPONSES, seed_value: int = BENCH_SEED,
+         reset: bool = False) -> dict:
+    """
+    Create the benchmark schema and fill it with synthetic data.
+
+    Breed popularity follows a Zipf-like curve (a few breeds get most
+    submissions), submissions are spread over the past year, and the
+    analytics rollups are folded up to date so the app starts with no backlog.
+
+    Args:
+        dsn: Database to seed
+        breeds: Rows in breeds_AKC_Rsrch_FoodV1
+        responses: Rows in questions_dog_initial3
+        seed_value: Random seed; the same seed gives the same data
+        reset: Drop the app tables first. Without it, seeding a database that
+            already has them fails rather than touching existing data.
+            The schema comes from the same migrations as production.
+
+    Returns:
+        {'breeds', 'responses', 'seed', 'seconds'}
+    """
+    started = time.perf_counter()
+    rng = random.Random(seed_value)
+    conn = psycopg2.connect(dsn)
+    try:
+        cursor = conn.cursor()
+        if reset:
+            for table in SEEDED_TABLES:
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        else:
+            cursor.execute("SELECT to_regclass('breeds_AKC_Rsrch_FoodV1') IS NOT NULL")
+            if cursor.fetchone()[0]:
+                raise RuntimeError("Database already has the app tables; pass --reset to replace them")
+        conn.commit()
+        migrate(dsn)  # The production schema and indexes, from migrations/
+
+        rows = breed_rows(breeds, rng)
+        _copy(cursor, "breeds_AKC_Rsrch_FoodV1", (
+            "breed_name_AKC", "breed_otherNames", "breed_group_AKC", "breed_size_categ_AKC", "breed_life_expect_yrs",
+            "listed_DogDiet_MVP", "food_recomm_brand", "food_recomm_product", "food_recomm_format",
+            "food_rec_note_INTERNAL", "size_category", "breed_class_AKC", "dogapi_id"), rows)
+
+        names = [row[0] for row in rows]
+        popularity = [1 / (rank + 1) for rank in range(len(names))]
+        now = datetime.now().replace(microsecond=0)
+        written = 0
+        while written < responses:
+            chunk = min(COPY_CHUNK_ROWS, responses - written)
+            picked = rng.choices(names, popularity, k=chunk)
+            chunk_rows = []
+            for name in picked:
+                statuses = _statuses(rng)
+                chunk_rows.append((
+                    name,
+                    round(rng.uniform(0, 16), 1),
+                    ", ".join(statuses),
+                    "{" + ",".join(f'"{s}"' for s in statuses) + "}",
+                    now - timedelta(seconds=rng.randrange(365 * 86400)),
+                ))
+            _copy(cursor, "questions_dog_initial3", (
+                "breed_name_AKC", "age_years_preReg", "status_dietRelat_preReg", "statuses_dietRelat_preReg",
+                "modified_preReg"), chunk_rows)
+            written += chunk
+        conn.commit()
+
+        # Fold everything into the rollups with the app's own statement
+        while True:
+            cursor.execute(ROLLUP_WATERMARK_SQL)
+            mark = cursor.fetchone()
+            cursor.execute(ROLLUP_UPDATE_SQL.format(since='%s', after_id='%s', lag='%s', limit='%s'),
+                           (mark[0], mark[1], 0, 100000))
+            applied = cursor.fetchone()[0]
+            conn.commit()
+            if not applied:
+                break
+
+        conn.autocommit = True
+        cursor.execute("VACUUM ANALYZE")
+        cursor.close()
+    finally:
+        conn.close()
+    return {'breeds': breeds, 'responses': responses, 'seed': seed_value,
+            'seconds': round(time.perf_counter() - started, 2)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Seed a benchmark database with synthetic breeds and responses")
+    parser.add_argument('--database-url', default=os.getenv("BENCH_DATABASE_URL"),
+                        help="Database to seed (default: BENCH_DATABASE_URL; never falls back to DATABASE_URL)")
+    parser.add_argument('--breeds', type=int, default=BENCH_BREEDS)
+    parser.add_argument('--responses', type=int, default=BENCH_RESPONSES)
+    parser.add_argument('--seed', type=int, default=BENCH_SEED)
+    parser.add_argument('--reset', action='store_true', help="Drop and recreate the app tables first")
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url or BENCH_DATABASE_URL is required")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    result = seed(args.database_url, args.breeds, args.responses, args.seed, args.reset)
+    logger.info("Seeded %(breeds)d breeds and %(responses)d responses in %(seconds)ss", result)
@@ -0,0 +1,180 @@
+# backend/bench/workload.py - Closed-loop HTTP workloads against a running API, with latency percentiles
+
+import asyncio
+import math
+import random
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from bench.seed import STATUSES, breed_names
+
+# Operation weights per named scenario; --mix overrides with e.g. "breed_get=5,submit=1"
+SCENARIOS: Dict[str, Dict[str, int]] = {
+    'breed_reads': {'breed_get': 60, 'breed_suggest': 25, 'breed_list': 15},
+    'submits': {'submit': 1},
+    'chat': {'chat': 1},
+    'chat_stream': {'chat_stream': 1},
+    'analytics': {'analytics_counts': 3, 'questionnaire_filtered': 1},
+    'mixed': {'breed_get': 40, 'breed_suggest': 15, 'breed_list': 10, 'submit': 20, 'chat': 10,
+              'analytics_counts': 5},
+}
+
+# Distinct chat questions; a small pool means most chats are answer-cache hits
+CHAT_QUESTIONS = [
+    "How much should a {breed} eat per day?",
+    "Is grain-free food good for a {breed}?",
+    "What treats are safe for a {breed} puppy?",
+    "How do I switch my {breed} to a senior diet?",
+    "Can a pregnant {breed} eat puppy food?",
+]
+
+
+class Operation:
+    """One request kind: build(rng) returns (method, path, params, json body)."""
+
+    def __init__(self, name: str, build: Callable[[random.Random], Tuple[str, str, Optional[dict], Optional[dict]]],
+                 stream: bool = False):
+        self.name = name
+        self.build = build
+        self.stream = stream
+
+
+def build_operations(breeds: int, chat_questions: int) -> Dict[str, Operation]:
+    """Operations over the names bench.seed created, so reads hit existing rows."""
+    names = breed_names(breeds)
+    popularity = [1 / (rank + 1) for rank in range(len(names))]  # Same skew as the seeded submissions
+    questions = [CHAT_QUESTIONS[i % len(CHAT_QUESTIONS)].format(breed=names[i // len(CHAT_QUESTIONS) % len(names)])
+                 for i in range(max(chat_questions, 1))]
+
+    def breed(rng):
+        return rng.choices(names, popularity)[0]
+
+    def statuses(rng):
+        return rng.sample(STATUSES[1:], rng.choice((1, 1, 2))) if rng.random() < 0.5 else ['none']
+
+    return {op.name: op for op in [
+        Operation('breed_get', lambda rng: ('GET', f"/api/breed/breed_name_AKC/{breed(rng)}", None, None)),
+        Operation('breed_list', lambda rng: ('GET', "/api/breeds", {'limit': 50}, None)),
+        Operation('breed_suggest', lambda rng: ('GET', "/api/breeds/suggest",
+                                                {'q': breed(rng)[:rng.randint(2, 6)]}, None)),
+        Operation('submit', lambda rng: ('POST', "/api/submit-dog-info", None, {
+            'breed_name_AKC': breed(rng),
+            'age_years_preReg': round(rng.uniform(0, 16), 1),
+            'status_dietRelat_preReg': statuses(rng),
+        })),
+        Operation('chat', lambda rng: ('POST', "/api/chat", None, {'message': rng.choice(questions)})),
+        Operation('chat_stream', lambda rng: ('POST', "/api/chat/stream", None, {'message': rng.choice(questions)}),
+                  stream=True),
+        Operation('analytics_counts', lambda rng: ('GET', "/api/analytics/counts",
+                                                   {'by': rng.choice(['breed', 'size', 'age_bucket', 'status']),
+                                                    'limit': 20}, None)),
+        Operation('questionnaire_filtered', lambda rng: ('GET', "/api/questionnaire",
+                                                         {'status': ['pregnant', 'allergy']}, None)),
+    ]}
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    """"breed_get=5,submit=1" -> {'breed_get': 5, 'submit': 1}."""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = int(weight) if weight else 1
+    return mix
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: List[float], errors: int, seconds: float) -> dict:
+    """Throughput and latency summary (milliseconds) for one operation or a whole run."""
+    values = sorted(latencies)
+    count = len(values)
+    return {
+        'requests': count,
+        'errors': errors,
+        'throughput_rps': round(count / seconds, 2) if seconds else 0.0,
+        'latency_ms': {
+            'mean': round(1000 * sum(values) / count, 3) if count else 0.0,
+            'p50': round(1000 * percentile(values, 50), 3),
+            'p95': round(1000 * percentile(values, 95), 3),
+            'p99': round(1000 * percentile(values, 99), 3),
+            'max': round(1000 * values[-1], 3) if count else 0.0,
+        },
+    }
+
+
+async def run_workload(base_url: str, operations: Dict[str, Operation], mix: Dict[str, int], concurrency: int,
+                       duration: float, warmup: float = 0, seed_value: int = 0, timeout: float = 60) -> dict:
+    """
+    Drive a fixed number of concurrent clients, each sending its next request
+    as soon as the previous one completes, for warmup + duration seconds.
+    Only requests that start after the warmup are measured. Each client has
+    its own seeded RNG, so a run replays the same request sequence.
+
+    A request counts as an error on a transport failure or a status >= 400
+    (so 503s from a saturated pool show up rather than looking fast).
+
+    Returns:
+        {'concurrency', 'duration_s', 'mix', **summarize(all), 'status_codes', 'operations': {name: summarize(...)}}
+    """
+    unknown = set(mix) - set(operations)
+    if unknown:
+        raise ValueError(f"Unknown operations {sorted(unknown)}; choose from {sorted(operations)}")
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    status_codes: Dict[str, int] = defaultdict(int)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        started = time.perf_counter()
+        measure_from = started + warmup
+        stop_at = measure_from + duration
+
+        async def worker(number: int):
+            rng = random.Random(seed_value * 1000 + number)
+            while True:
+                begin = time.perf_counter()
+                if begin >= stop_at:
+                    return
+                operation = operations[rng.choices(names, weights)[0]]
+                method, path, params, body = operation.build(rng)
+                status = 'error'
+                try:
+                    if operation.stream:
+                        async with client.stream(method, path, params=params, json=body) as response:
+                            async for _ in response.aiter_raw():
+                                pass
+                    else:
+                        response = await client.request(method, path, params=params, json=body)
+                    status = str(response.status_code)
+                except httpx.HTTPError:
+                    pass
+                elapsed = time.perf_counter() - begin
+                if begin >= measure_from:
+                    latencies[operation.name].append(elapsed)
+                    status_codes[status] += 1
+                    if status == 'error' or int(status) >= 400:
+                        errors[operation.name] += 1
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        measured = time.perf_counter() - measure_from
+
+    every = [latency for values in latencies.values() for latency in values]
+    return {
+        'concurrency': concurrency,
+        'duration_s': round(measured, 3),
+        'mix': mix,
+        **summarize(every, sum(errors.values()), measured),
+        'status_codes': dict(sorted(status_codes.items())),
+        'operations': {name: summarize(latencies[name], errors[name], measured) for name in names},
+    }
@@ -0,0 +1,2 @@
+# This file makes the jobs directory a Python package
+# Allows running one-off jobs from backend/: python -m jobs.backfill_statuses
@@ -0,0 +1,60 @@
+# backend/jobs/backfill_statuses.py - Converts legacy comma-joined statuses into the TEXT[] column
+#
+# Run from backend/ after applying migrations/001_status_array.sql:
+#   python -m jobs.backfill_statuses [--chunk-size 1000] [--start-after ID] [--pause 0.05]
+# Safe to interrupt and rerun; pass the last printed id as --start-after to skip finished rows.
+
+import argparse
+import logging
+import os
+import time
+
+import database as db
+
+logger = logging.getLogger(__name__)
+
+# Rows converted per transaction, and the pause between chunks to leave headroom for live traffic
+BACKFILL_CHUNK_SIZE = int(os.getenv("BACKFILL_CHUNK_SIZE", "1000"))
+BACKFILL_PAUSE_SECONDS = float(os.getenv("BACKFILL_PAUSE_SECONDS", "0.05"))
+
+
+def backfill_statuses(start_after: int = 0, chunk_size: int = BACKFILL_CHUNK_SIZE,
+                      pause_seconds: float = BACKFILL_PAUSE_SECONDS) -> dict:
+    """
+    Backfill statuses_dietRelat_preReg chunk by chunk until no NULL rows remain.
+
+    Args:
+        start_after: Resume after this id_preRegister (the last id logged by a previous run)
+        chunk_size: Rows per transaction
+        pause_seconds: Sleep between chunks
+
+    Returns:
+        {'rows': rows converted, 'chunks': transactions committed, 'last_id': highest id converted}
+    """
+    last_id = start_after
+    rows = chunks = 0
+    while True:
+        updated, chunk_last = db.backfill_status_chunk(last_id, chunk_size)
+        if chunk_last is None:
+            break
+        rows += updated
+        chunks += 1
+        last_id = chunk_last
+        logger.info("Backfilled %d rows (total %d), last id_preRegister %d", updated, rows, last_id)
+        if pause_seconds:
+            time.sleep(pause_seconds)
+    return {'rows': rows, 'chunks': chunks, 'last_id': last_id}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Backfill questions_dog_initial3.statuses_dietRelat_preReg")
+    parser.add_argument('--chunk-size', type=int, default=BACKFILL_CHUNK_SIZE, help="Rows per transaction")
+    parser.add_argument('--start-after', type=int, default=0, help="Resume after this id_preRegister")
+    parser.add_argument('--pause', type=float, default=BACKFILL_PAUSE_SECONDS, help="Seconds to sleep between chunks")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    try:
+        result = backfill_statuses(args.start_after, args.chunk_size, args.pause)
+    finally:
+        db.close_db_pool()
+    logger.info("Done: %(rows)d rows in %(chunks)d chunks, last id_preRegister %(last_id)d", result)
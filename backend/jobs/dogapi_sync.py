@@ -0,0 +1,47 @@
+# backend/jobs/dogapi_sync.py - One-off DogAPI reconciliation of dogapi_id into breeds_AKC_Rsrch_FoodV1
+#
+# Run from backend/:
+#   python -m jobs.dogapi_sync [--batch-size 100]
+# Point DOGAPI_BASE_URL at a local stub server to test without calling dogapi.dog.
+
+import argparse
+import asyncio
+import logging
+
+from fastapi.concurrency import run_in_threadpool
+
+import database as db
+from models.DogApiClient import DogApiClient
+from services.dogapi_sync import DogApiSync, DOGAPI_SYNC_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+async def sync_once(batch_size: int = DOGAPI_SYNC_BATCH_SIZE) -> dict:
+    """Fetch every DogAPI breed and reconcile it into the breed table; returns the sync summary."""
+    async with DogApiClient() as client:
+        sync = DogApiSync(
+            list_breeds=client.list_breeds,
+            load_catalog=lambda: run_in_threadpool(db.get_breed_catalog),
+            apply_batch=lambda batch: run_in_threadpool(db.apply_dogapi_matches, batch),
+            batch_size=batch_size,
+        )
+        result = await sync.run_once()
+        result['client'] = client.stats()
+        return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Reconcile DogAPI breeds into breeds_AKC_Rsrch_FoodV1")
+    parser.add_argument('--batch-size', type=int, default=DOGAPI_SYNC_BATCH_SIZE, help="Breeds updated per transaction")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    try:
+        result = asyncio.run(sync_once(args.batch_size))
+    finally:
+        db.close_db_pool()
+    logger.info("Fetched %d DogAPI breeds, matched %d, updated %d: %s",
+                result['fetched'], result['matched'], len(result['updated']), ', '.join(result['updated']) or '-')
+    if result['unmatched']:
+        logger.info("No catalog row for %d DogAPI breeds: %s", len(result['unmatched']), ', '.join(result['unmatched'][:20]))
+    logger.info("Client: %s", result['client'])
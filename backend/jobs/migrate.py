@@ -0,0 +1,50 @@
+# backend/jobs/migrate.py - Applies the numbered migrations in backend/migrations/ and checks the schema
+#
+# Run from backend/:
+#   python -m jobs.migrate                  # Apply everything pending (same as: up)
+#   python -m jobs.migrate up --target 2    # Stop after 002
+#   python -m jobs.migrate up --dry-run     # List what would run
+#   python -m jobs.migrate status           # Applied / pending / changed per migration
+#   python -m jobs.migrate check            # Missing or invalid indexes and sequential-scan-prone queries
+# Safe to rerun; a failed concurrent index build is dropped and rebuilt on the next run.
+
+import argparse
+import logging
+import sys
+
+from services.migrations import MigrationError, check_schema, migrate, migration_status
+
+logger = logging.getLogger(__name__)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Apply schema migrations to DATABASE_URL")
+    parser.add_argument('command', nargs='?', choices=('up', 'status', 'check'), default='up')
+    parser.add_argument('--target', type=int, help="Highest migration version to apply")
+    parser.add_argument('--dry-run', action='store_true', help="Only list the migrations that would run")
+    parser.add_argument('--database-url', help="Database to migrate (default: DATABASE_URL)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    if args.command == 'status':
+        for row in migration_status(args.database_url):
+            applied = f"applied {row['applied_at']} in {row['duration_ms']} ms" if row['applied_at'] else ""
+            print(f"{row['version']:03d}_{row['name']:<32} {row['state']:<12} {applied}")
+    elif args.command == 'check':
+        report = check_schema(args.database_url)
+        problems = sum(len(v) for v in report.values())
+        logger.info("Schema check: %s", f"{problems} problem(s)" if problems else "OK")
+        sys.exit(1 if problems else 0)
+    else:
+        try:
+            results = migrate(args.database_url, args.target, args.dry_run)
+        except MigrationError as e:
+            logger.error("%s", e)
+            sys.exit(1)
+        for result in results:
+            if args.dry_run:
+                logger.info("Would apply %03d_%s (%d statements%s)", result['version'], result['name'],
+                            result['statements'], "" if result['transactional'] else ", autocommit")
+            else:
+                logger.info("Applied %03d_%s in %d ms", result['version'], result['name'], result['duration_ms'])
+        logger.info("%d migration(s) %s", len(results), "pending" if args.dry_run else "applied")
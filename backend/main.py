@@ -1,17 +1,192 @@
 """Simplified FastAPI application for DogDietApp.
-Uses synchronous psycopg2 access without async pools or external schema/service modules.
+Database access goes through a shared connection pool: psycopg2 (database.py) by default,
+or asyncpg (models/database.py) when DB_BACKEND=async.
 """
 
-from fastapi import FastAPI, HTTPException, Path
+import inspect
+import logging
+from contextlib import asynccontextmanager
+import asyncio
+import anyio
+import csv
+import io
+import json
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from fastapi import FastAPI, HTTPException, Path, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Optional
 import uvicorn
-from database import insert_dog_questionnaire, get_db_connection
-from Report_select import choose_report
-from services.chat_service import get_chat_response, format_conversation_history
+import database
+from database import (
+    DB_BACKEND, BREED_COLUMNS, BREED_SEARCH_FIELDS, BREED_LIST_DEFAULT_FIELDS, QUESTIONNAIRE_COLUMNS, ANALYTICS_DIMENSIONS,
+    BREED_LOOKUP_MAX_KEYS, BREED_UPDATE_FIELDS, BreedImportDataError, PoolTimeoutError
+)
+from services.report_service import report_engine, ReportRenderCache, REPORT_BATCH_MAX_ITEMS
+from services.chat_service import (
+    get_chat_response, stream_chat_response, check_chat_available, format_conversation_history, chat_cache,
+    provider as chat_provider, inflight as chat_inflight, history_compactor, sessions as chat_sessions
+)
+from services.chat_provider import ChatBusyError
+from services.bulk_ingest import iter_json_records, ingest_records
+from services.submission_queue import (
+    SubmissionQueue, QueueFullError, SUBMIT_WRITE_BEHIND, SUBMIT_QUEUE_MAX_SIZE, SUBMIT_BATCH_SIZE,
+    SUBMIT_FLUSH_INTERVAL_MS, SUBMIT_ENQUEUE_TIMEOUT, SUBMIT_PENDING_RETENTION, SUBMIT_DRAIN_TIMEOUT
+)
+from services.breed_cache import (
+    BreedCatalog, BREED_CACHE_ENABLED, BREED_CACHE_REFRESH_SECONDS, run_periodic_refresh, not_modified
+)
+from services.breed_search import BreedSearchIndex
+from services.breed_import import BreedImportError, read_breed_file
+from services.dogapi_sync import DogApiSync, DOGAPI_SYNC_INTERVAL_SECONDS, DOGAPI_SYNC_BATCH_SIZE, run_periodic_sync
+from models.DogApiClient import DogApiClient
+from services.metrics import (
+    METRICS_ENABLED, CONTENT_TYPE as METRICS_CONTENT_TYPE, RequestMetricsMiddleware, db_helper_seconds, registry as metrics
+)
+from services.query_log import query_log
+from services.migrations import MIGRATIONS_CHECK_ON_STARTUP, check_schema
+from services.analytics import (
+    RollupUpdater, ANALYTICS_ROLLUP_INTERVAL_SECONDS, ANALYTICS_ROLLUP_LAG_SECONDS, ANALYTICS_ROLLUP_CHUNK_SIZE,
+    ANALYTICS_ROLLUP_MAX_CHUNKS, run_periodic_rollup
+)
+
+logger = logging.getLogger(__name__)
+
+# Query backend selected by DB_BACKEND; both modules expose the same helper names
+if DB_BACKEND == 'async':
+    import models.database as db
+elif DB_BACKEND == 'sync':
+    db = database
+else:
+    raise ValueError(f"Unknown DB_BACKEND '{DB_BACKEND}'. Use 'sync' or 'async'.")
+
+
+async def call_db(helper, *args):
+    """
+    Await an asyncpg helper directly, or run a psycopg2 helper on the threadpool.
+    The duration (checkout + every statement the helper runs) is recorded in
+    db_helper_duration_seconds under the helper's name; per-statement timings come
+    from the query log (db_query_duration_seconds).
+    """
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        if inspect.iscoroutinefunction(helper):
+            result = await helper(*args)
+        else:
+            result = await run_in_threadpool(helper, *args)
+        outcome = 'ok'
+        return result
+    except PoolTimeoutError:
+        outcome = 'pool_timeout'
+        raise
+    finally:
+        db_helper_seconds.observe((helper.__name__, outcome), time.perf_counter() - started)
+
+
+# In-memory breed table; breed reads are served from here when BREED_CACHE_ENABLED
+breed_catalog = BreedCatalog(
+    load_all=lambda: call_db(db.get_breed_catalog),
+    load_one=lambda field, value: call_db(db.get_breed, field, value),
+)
+
+# Typeahead index over breed names and aliases, kept in step with the catalog
+breed_index = BreedSearchIndex()
+breed_catalog.add_listener(breed_index.apply)
+
+# Submit-response reports (message + food recommendation) per (breed, report type), kept in step with the catalog
+report_cache = ReportRenderCache(report_engine, lambda name: breed_catalog.get('breed_name_AKC', name))
+breed_catalog.add_listener(report_cache.on_breeds_changed)
+
+# Write-behind queue for questionnaire submissions (used unless SUBMIT_WRITE_BEHIND=off)
+submission_queue = SubmissionQueue(
+    insert_batch=lambda items: call_db(db.insert_dog_questionnaires, items),
+    max_size=SUBMIT_QUEUE_MAX_SIZE,
+    batch_size=SUBMIT_BATCH_SIZE,
+    flush_interval_ms=SUBMIT_FLUSH_INTERVAL_MS,
+    enqueue_timeout=SUBMIT_ENQUEUE_TIMEOUT,
+    pending_retention=SUBMIT_PENDING_RETENTION,
+    drain_timeout=SUBMIT_DRAIN_TIMEOUT,
+)
+
+# Incremental upkeep of the analytics rollup tables behind /api/analytics
+analytics_rollup = RollupUpdater(
+    apply_chunk=lambda lag, size: call_db(db.update_questionnaire_rollups, lag, size),
+    lag_seconds=ANALYTICS_ROLLUP_LAG_SECONDS,
+    chunk_size=ANALYTICS_ROLLUP_CHUNK_SIZE,
+    max_chunks=ANALYTICS_ROLLUP_MAX_CHUNKS,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the shared connection pool at startup so the first requests skip the connect cost
+    database_up = False
+    try:
+        if DB_BACKEND == 'async':
+            await db.get_database_pool()
+        else:
+            await run_in_threadpool(database.init_db_pool)
+        database_up = True
+    except Exception as e:
+        # Keep serving non-database routes (e.g. chat); the pool is retried lazily on first use
+        logger.warning("Database pool not initialized at startup: %s", e)
+    if database_up and MIGRATIONS_CHECK_ON_STARTUP:
+        # Warns about pending migrations, missing indexes and queries planned as large sequential scans
+        try:
+            await run_in_threadpool(check_schema)
+        except Exception as e:
+            logger.warning("Schema check skipped: %s", e)
+    refresh_task = None
+    if BREED_CACHE_ENABLED:
+        try:
+            await breed_catalog.ensure_loaded()
+        except Exception as e:
+            logger.warning("Breed catalog not loaded at startup: %s", e)
+    if BREED_CACHE_REFRESH_SECONDS > 0:
+        # Runs whatever BREED_CACHE_ENABLED says: suggest and submit load the catalog lazily either way
+        refresh_task = asyncio.create_task(run_periodic_refresh(breed_catalog, BREED_CACHE_REFRESH_SECONDS))
+    if SUBMIT_WRITE_BEHIND != 'off':
+        await submission_queue.start()
+    rollup_task = None
+    if ANALYTICS_ROLLUP_INTERVAL_SECONDS > 0:
+        rollup_task = asyncio.create_task(run_periodic_rollup(analytics_rollup, ANALYTICS_ROLLUP_INTERVAL_SECONDS))
+    dogapi_client = dogapi_task = None
+    if DOGAPI_SYNC_INTERVAL_SECONDS > 0:
+        # Keep dogapi_id and DogAPI-derived attributes current; one catalog reload per sync that changed rows
+        dogapi_client = DogApiClient()
+        dogapi_sync = DogApiSync(
+            list_breeds=dogapi_client.list_breeds,
+            load_catalog=lambda: call_db(db.get_breed_catalog),
+            apply_batch=lambda batch: call_db(db.apply_dogapi_matches, batch),
+            batch_size=DOGAPI_SYNC_BATCH_SIZE,
+        )
+        dogapi_task = asyncio.create_task(run_periodic_sync(
+            dogapi_sync, DOGAPI_SYNC_INTERVAL_SECONDS, on_updated=breed_catalog.refresh_if_loaded
+        ))
+    yield
+    if dogapi_task:
+        dogapi_task.cancel()
+        await dogapi_client.aclose()
+    if refresh_task:
+        refresh_task.cancel()
+    if rollup_task:
+        rollup_task.cancel()
+    # Write out queued submissions before the pool goes away
+    await submission_queue.stop()
+    # Drain the pool at shutdown
+    if DB_BACKEND == 'async':
+        await db.close_database_pool()
+    else:
+        await run_in_threadpool(database.close_db_pool)
 
-app = FastAPI(title="Dog Diet API", description="API for dog diet recommendations and breed management", version="1.0.0")
+
+app = FastAPI(title="Dog Diet API", description="API for dog diet recommendations and breed management", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,6 +196,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if METRICS_ENABLED:
+    # Outermost, so the recorded latency covers CORS handling and error responses too
+    app.add_middleware(RequestMetricsMiddleware)
+
+# Gauges and counters read from each component's stats() when /metrics is scraped
+metrics.add_stats("db_pool", "Database connection pool", lambda: db.get_pool_stats(),
+                  counters=('checkouts', 'timeouts', 'healthcheck_failures', 'connections_opened'),
+                  gauges=('size', 'idle', 'in_use', 'waiting', 'max_size'))
+metrics.add_stats("db_statements", "Per-statement query log", query_log.stats,
+                  counters=('slow_calls', 'explains', 'explain_failures'), gauges=('fingerprints',))
+metrics.add_stats("breed_catalog", "In-memory breed catalog", breed_catalog.stats,
+                  counters=('hits', 'misses', 'refreshes'), gauges=('breeds',))
+metrics.add_stats("breed_search", "Breed typeahead index", breed_index.stats,
+                  counters=('updates',), gauges=('breeds', 'terms'))
+metrics.add_stats("report_cache", "Submit-response report cache", report_cache.stats,
+                  counters=('hits', 'misses'), gauges=('entries',))
+metrics.add_stats("submission_queue", "Write-behind submission queue", submission_queue.stats,
+                  counters=('enqueued', 'rejected', 'written', 'failed', 'batches'), gauges=('queued', 'max_size'))
+metrics.add_stats("analytics_rollup", "Analytics rollup updater", analytics_rollup.stats,
+                  counters=('runs', 'failures', 'rows_applied'), gauges=('last_run_ms',))
+metrics.add_stats("chat_cache", "Chat answer cache", chat_cache.stats,
+                  counters=('hits', 'misses', 'sets', 'evictions', 'expirations'), gauges=('entries', 'bytes'))
+metrics.add_stats("chat_provider", "Chat provider", chat_provider.stats,
+                  counters=('calls', 'retries', 'failures', 'busy_rejections'), gauges=('in_flight', 'max_concurrency'))
+metrics.add_stats("chat_coalescing", "Identical chat request coalescing", chat_inflight.stats,
+                  counters=('leaders', 'coalesced'), gauges=('in_flight',))
+metrics.add_stats("chat_history", "Chat history compaction", history_compactor.stats,
+                  counters=('requests', 'compacted', 'tokens_in', 'tokens_out', 'summary_cache.hits',
+                            'summary_cache.extends', 'summary_cache.builds'),
+                  gauges=('summary_cache.entries',))
+metrics.add_stats("chat_sessions", "Server-side chat sessions", chat_sessions.stats,
+                  counters=('created', 'hits', 'misses', 'evictions', 'expirations'), gauges=('sessions', 'bytes'))
+
 
 class DogQuestionnaireInput(BaseModel):
     breed_name_AKC: str = Field(..., description="Official AKC breed name")
@@ -28,6 +236,16 @@ class DogQuestionnaireInput(BaseModel):
     status_dietRelat_preReg: List[str] = Field(..., description="List of diet-related health statuses")
 
 
+class ReportRequestItem(BaseModel):
+    breed_name_AKC: str
+    status_dietRelat_preReg: List[str] = Field(..., description="List of diet-related health statuses")
+    age_years_preReg: Optional[float] = Field(None, ge=0, le=30, description="Dog's age in years, if known")
+
+
+class ReportBatchInput(BaseModel):
+    items: List[ReportRequestItem] = Field(..., max_length=REPORT_BATCH_MAX_ITEMS)
+
+
 class BreedCreateInput(BaseModel):
     breed_name_AKC: str
     breed_otherNames: Optional[str] = None
@@ -41,6 +259,12 @@ class BreedCreateInput(BaseModel):
     dogapi_id: Optional[str] = None
 
 
+class BreedLookupInput(BaseModel):
+    breed_name_AKC: List[str] = Field(default_factory=list, description="Breed names to look up")
+    dogapi_id: List[str] = Field(default_factory=list, description="DogAPI IDs to look up")
+    fields: Optional[List[str]] = Field(None, description="Columns to return (default: all)")
+
+
 class BreedUpdateInput(BaseModel):
     breed_otherNames: Optional[str] = None
     breed_group_AKC: Optional[str] = None
@@ -82,6 +306,11 @@ class ChatRequest(BaseModel):
         None,
         description="Optional custom system prompt (overrides default)"
     )
+    session_id: Optional[str] = Field(
+        None,
+        description="Session returned by a previous response; the server supplies the history "
+                    "(conversation_history then only seeds a replacement if the session is unknown)"
+    )
 
 
 class ChatResponse(BaseModel):
@@ -90,163 +319,650 @@ class ChatResponse(BaseModel):
     message: str
     response: Optional[str] = None
     error: Optional[str] = None
+    cached: bool = False
+    coalesced: bool = False
+    history_tokens_saved: int = 0
+    session_id: Optional[str] = None
+    session_reset: bool = False
+
+
+def check_search_field(search_field: str):
+    if search_field not in BREED_SEARCH_FIELDS:
+        raise HTTPException(status_code=400, detail='Invalid search field. Use breed_name_AKC or dogapi_id')
+
+
+def validator_headers(etag: Optional[str]) -> dict:
+    """ETag/Last-Modified for responses served from the breed catalog; clients must revalidate."""
+    headers = {'Cache-Control': 'no-cache'}
+    if etag:
+        headers['ETag'] = etag
+    if breed_catalog.last_modified:
+        headers['Last-Modified'] = breed_catalog.last_modified_http()
+    return headers
+
+
+def is_not_modified(request: Request, etag: Optional[str]) -> bool:
+    return not_modified(
+        etag, breed_catalog.last_modified,
+        request.headers.get('if-none-match'), request.headers.get('if-modified-since')
+    )
 
 
 @app.get("/api/breeds")
-def get_all_breeds():
+async def get_all_breeds(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Last breed_name_AKC of the previous page (from next_cursor)"),
+    limit: int = Query(100, ge=1, le=500, description="Maximum number of breeds to return"),
+    breed_group_AKC: Optional[str] = Query(None, description="Only breeds in this AKC group"),
+    breed_size_categ_AKC: Optional[str] = Query(None, description="Only breeds in this size category"),
+    listed_DogDiet_MVP: Optional[str] = Query(None, max_length=1, description="Only breeds with this MVP flag (Y/N)"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return (default: name, group, size)")
+):
+    if fields:
+        selected = list(dict.fromkeys(f.strip() for f in fields.split(',') if f.strip()))
+        unknown = [f for f in selected if f not in BREED_COLUMNS]
+        if unknown or not selected:
+            raise HTTPException(status_code=400, detail=f"Invalid fields: {', '.join(unknown) or fields}. Allowed: {', '.join(BREED_COLUMNS)}")
+    else:
+        selected = BREED_LIST_DEFAULT_FIELDS
+    filters = {
+        column: value for column, value in (
+            ('breed_group_AKC', breed_group_AKC),
+            ('breed_size_categ_AKC', breed_size_categ_AKC),
+            ('listed_DogDiet_MVP', listed_DogDiet_MVP),
+        ) if value is not None
+    }
+    try:
+        if BREED_CACHE_ENABLED:
+            await breed_catalog.ensure_loaded()
+            headers = validator_headers(breed_catalog.etag)
+            if is_not_modified(request, breed_catalog.etag):
+                return Response(status_code=304, headers=headers)
+            response.headers.update(headers)
+            breeds, next_cursor = breed_catalog.page(selected, filters, cursor, limit)
+        else:
+            breeds, next_cursor = await call_db(db.get_breeds_page, selected, filters, cursor, limit)
+        return {'success': True, 'message': 'Retrieved breeds', 'breeds': breeds, 'next_cursor': next_cursor}
+    except PoolTimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/breeds/suggest")
+async def suggest_breeds(
+    q: str = Query(..., min_length=1, max_length=100, description="Partial breed name or alias, e.g. 'lab' or 'goldn'"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of suggestions")
+):
+    """
+    Typeahead for breed_name_AKC. Matches name and alias prefixes (including
+    later words, e.g. 'retr'), tolerates typos, and ranks exact > prefix >
+    word prefix > fuzzy. Served from memory; the index follows breed edits.
+    """
     try:
-        conn = get_db_connection(); cur = conn.cursor()
-        cur.execute("SELECT breed_name_AKC, breed_group_AKC, breed_size_categ_AKC FROM breeds_AKC_Rsrch_FoodV1 ORDER BY breed_name_AKC")
-        rows = cur.fetchall()
-        cur.close(); conn.close()
-        breeds = [
-            {
-                'breed_name_AKC': r[0],
-                'breed_group_AKC': r[1],
-                'breed_size_categ_AKC': r[2]
-            } for r in rows
-        ]
-        return {'success': True, 'message': 'Retrieved all breeds', 'breeds': breeds}
+        # The index is fed by the catalog, so load it even when BREED_CACHE_ENABLED is off
+        await breed_catalog.ensure_loaded()
+    except PoolTimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    suggestions = breed_index.suggest(q, limit)
+    return {'success': True, 'message': f'Found {len(suggestions)} matching breeds', 'suggestions': suggestions}
 
 
 @app.get("/api/breed/{search_field}/{search_value}")
-def get_breed(
+async def get_breed(
+    request: Request,
+    response: Response,
     search_field: str = Path(..., description="Search by 'breed_name_AKC' or 'dogapi_id'"),
     search_value: str = Path(..., description="The breed name or ID to search for")
 ):
-    if search_field not in ['breed_name_AKC', 'dogapi_id']:
-        raise HTTPException(status_code=400, detail='Invalid search field. Use breed_name_AKC or dogapi_id')
+    check_search_field(search_field)
     try:
-        conn = get_db_connection(); cur = conn.cursor()
-        if search_field == 'breed_name_AKC':
-            cur.execute("SELECT * FROM breeds_AKC_Rsrch_FoodV1 WHERE breed_name_AKC=%s", (search_value,))
+        if BREED_CACHE_ENABLED:
+            await breed_catalog.ensure_loaded()
+            breed = breed_catalog.get(search_field, search_value)
         else:
-            cur.execute("SELECT * FROM breeds_AKC_Rsrch_FoodV1 WHERE dogapi_id=%s", (search_value,))
-        row = cur.fetchone(); cur.close(); conn.close()
-        if not row:
-            raise HTTPException(status_code=404, detail='Breed not found')
-        columns = [
-            'breed_name_AKC','breed_otherNames','breed_group_AKC','breed_size_categ_AKC','breed_life_expect_yrs',
-            'listed_DogDiet_MVP','food_recomm_brand','food_recomm_product','food_recomm_format','food_rec_note_INTERNAL',
-            'size_category','breed_class_AKC','dogapi_id'
-        ]
-        breed = {col: row[i] for i, col in enumerate(columns) if i < len(row)}
-        return {'success': True, 'message': f'Retrieved breed by {search_field}', 'breed': breed}
+            breed = await call_db(db.get_breed, search_field, search_value)
+    except PoolTimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if not breed:
+        raise HTTPException(status_code=404, detail='Breed not found')
+    if BREED_CACHE_ENABLED:
+        etag = breed_catalog.row_etag(breed['breed_name_AKC'])
+        headers = validator_headers(etag)
+        if is_not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+    return {'success': True, 'message': f'Retrieved breed by {search_field}', 'breed': breed}
+
+
+@app.post("/api/breeds/lookup")
+async def lookup_breeds(data: BreedLookupInput):
+    """
+    Many breeds in one call, by breed_name_AKC and/or dogapi_id (e.g. for comparison pages).
+    Served from the breed catalog when BREED_CACHE_ENABLED, otherwise with a single
+    = ANY(...) query. Found records are keyed by search field and input value; keys
+    with no match are listed in missing.
+    """
+    keys = {
+        'breed_name_AKC': list(dict.fromkeys(data.breed_name_AKC)),
+        'dogapi_id': list(dict.fromkeys(data.dogapi_id)),
+    }
+    total = len(keys['breed_name_AKC']) + len(keys['dogapi_id'])
+    if not total:
+        raise HTTPException(status_code=400, detail='Provide at least one breed_name_AKC or dogapi_id')
+    if total > BREED_LOOKUP_MAX_KEYS:
+        raise HTTPException(status_code=400, detail=f'At most {BREED_LOOKUP_MAX_KEYS} keys per lookup')
+    selected = list(dict.fromkeys(data.fields)) if data.fields else BREED_COLUMNS
+    unknown = [f for f in selected if f not in BREED_COLUMNS]
+    if unknown or not selected:
+        raise HTTPException(status_code=400, detail=f"Invalid fields: {', '.join(unknown)}. Allowed: {', '.join(BREED_COLUMNS)}")
+    try:
+        if BREED_CACHE_ENABLED:
+            await breed_catalog.ensure_loaded()
+            lookup = breed_catalog.get
+        else:
+            rows = await call_db(db.get_breeds_by_keys, keys['breed_name_AKC'], keys['dogapi_id'])
+            by_field = {'breed_name_AKC': {}, 'dogapi_id': {}}
+            for row in sorted(rows, key=lambda r: r['breed_name_AKC']):  # First by name wins a shared dogapi_id, as in the catalog
+                by_field['breed_name_AKC'][row['breed_name_AKC']] = row
+                if row['dogapi_id']:
+                    by_field['dogapi_id'].setdefault(row['dogapi_id'], row)
+            lookup = lambda field, value: by_field[field].get(value)
+    except PoolTimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    breeds = {field: {} for field in keys}
+    missing = []
+    for field, values in keys.items():
+        for value in values:
+            row = lookup(field, value)
+            if row is None:
+                missing.append({'search_field': field, 'search_value': value})
+            else:
+                breeds[field][value] = {column: row[column] for column in selected}
+    return {
+        'success': True,
+        'message': f'Found {total - len(missing)} of {total} breeds',
+        'breeds': breeds,
+        'missing': missing
+    }
 
 
 @app.post("/api/submit-dog-info")
-def submit_dog_info(data: DogQuestionnaireInput):
+async def submit_dog_info(data: DogQuestionnaireInput, response: Response):
+    breed_name = data.breed_name_AKC
+    age_years = data.age_years_preReg
+    status_list = data.status_dietRelat_preReg
     try:
-        breed_name = data.breed_name_AKC
-        age_years = data.age_years_preReg
-        status_list = data.status_dietRelat_preReg
-        db_result = insert_dog_questionnaire(breed_name, age_years, status_list)
-        report_message = choose_report(status_list, breed_name)
-        return {
+        # Breed details for the report come from memory, so the only database work is the insert
+        await breed_catalog.ensure_loaded()
+    except Exception as e:
+        logger.warning("Breed catalog unavailable, report sent without food recommendation: %s", e)
+    report = report_cache.render(breed_name, status_list, age_years)
+    pending_id = None
+    try:
+        if SUBMIT_WRITE_BEHIND == 'off':
+            db_result = await call_db(db.insert_dog_questionnaire, breed_name, age_years, status_list)
+            record_id = db_result['id']
+        else:
+            pending_id, written = await submission_queue.submit((breed_name, age_years, status_list))
+            # "flush": acknowledge only once the batch holding this submission has committed
+            record_id = await written if SUBMIT_WRITE_BEHIND == 'flush' else None
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={'Retry-After': '1'})
+    except PoolTimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    result = {
+        'success': True,
+        'message': 'Dog information submitted successfully!',
+        'record_id': record_id,
+        'report': report['report'],
+        'report_name': report['report_name'],
+        'food_recommendation': report['food_recommendation'],
+        'breed_info': report['breed_info'],
+        'breed': breed_name,
+        'age': age_years,
+        'statuses': status_list
+    }
+    if pending_id and record_id is None:
+        # "pending": accepted but not yet written; poll /api/submit-dog-info/pending/{pending_id}
+        response.status_code = 202
+        result['message'] = 'Dog information accepted and queued for saving'
+        result['pending_id'] = pending_id
+    return result
+
+
+@app.get("/api/submit-dog-info/pending/{pending_id}")
+async def get_pending_submission(pending_id: str = Path(..., description="pending_id returned by a queued submission")):
+    state = submission_queue.status(pending_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail='Unknown or expired pending_id')
+    return {'success': True, 'message': f"Submission {state['status']}", 'pending_id': pending_id, **state}
+
+
+@app.get("/api/submit-dog-info/queue")
+async def get_submission_queue_stats():
+    """Write-behind queue depth and counters."""
+    return {'success': True, 'message': f'Write-behind mode: {SUBMIT_WRITE_BEHIND}', 'queue': submission_queue.stats()}
+
+
+@app.post("/api/submit-dog-info/bulk")
+async def submit_dog_info_bulk(request: Request):
+    """
+    Bulk questionnaire ingestion for clinic pre-registrations and import jobs.
+
+    The body is a JSON array of DogQuestionnaireInput records, or NDJSON (one record
+    per line) when Content-Type is application/x-ndjson. Records are validated as
+    the body streams in and saved in chunked transactions; invalid records are
+    rejected individually without aborting the batch. If a chunk cannot be saved
+    (e.g. the pool timed out), its records are reported as failed and the rest of
+    the body is not read; the per-record results always show what was saved.
+    """
+    content_type = request.headers.get('content-type', '')
+    ndjson = 'ndjson' in content_type or 'jsonlines' in content_type
+    try:
+        results = await ingest_records(
+            iter_json_records(request.stream(), ndjson=ndjson),
+            validate=DogQuestionnaireInput.model_validate,
+            insert_batch=lambda items: call_db(db.insert_dog_questionnaires, [
+                (item.breed_name_AKC, item.age_years_preReg, item.status_dietRelat_preReg) for item in items
+            ]),
+            describe=lambda item: {'report': report_cache.render(
+                item.breed_name_AKC, item.status_dietRelat_preReg, item.age_years_preReg)['report']},
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    inserted = sum(1 for r in results if r['success'])
+    truncated = bool(results) and results[-1].get('truncated', False)
+    received = len(results) - truncated
+    return {
+        'success': True,
+        'message': (f'Saved {inserted} of {received} dog questionnaire records'
+                    + (f'; records after the first {received} were not read' if truncated else '')),
+        'received': received,
+        'inserted': inserted,
+        'rejected': received - inserted,
+        'truncated': truncated,
+        'results': results
+    }
+
+
+@app.post("/api/reports/batch")
+async def classify_reports(request: Request):
+    """
+    Classify many submissions at once (e.g. re-scoring imported records or previewing rule edits).
+    Body: {"items": [{"breed_name_AKC", "status_dietRelat_preReg", "age_years_preReg"?}, ...]}.
+    Every item is evaluated against the same rules snapshot; results are in input order.
+    """
+    # Validate the raw body in one pass and serialize the result directly: with thousands of
+    # items, FastAPI's default parse/validate/encode steps cost several times the classification
+    try:
+        batch = ReportBatchInput.model_validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+    def classify():
+        rules_version, results = report_engine.classify_batch([
+            (item.breed_name_AKC, item.status_dietRelat_preReg, item.age_years_preReg) for item in batch.items
+        ])
+        counts = {}
+        for result in results:
+            counts[result['report_name']] = counts.get(result['report_name'], 0) + 1
+        return json.dumps({
             'success': True,
-            'message': 'Dog information submitted successfully!',
-            'record_id': db_result['id'],
-            'report': report_message,
-            'breed': breed_name,
-            'age': age_years,
-            'statuses': status_list
-        }
+            'message': f'Classified {len(results)} submissions',
+            'rules_version': rules_version,
+            'counts': counts,
+            'results': results
+        })
+
+    try:
+        return Response(await run_in_threadpool(classify), media_type='application/json')
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/reports/rules")
+def report_rules():
+    """The report rules currently in effect and their reload status."""
+    return {'success': True, 'message': 'Retrieved report rules', 'rules': report_engine.stats(), 'render_cache': report_cache.stats()}
+
+
+@app.get("/api/questionnaire")
+async def get_questionnaire_responses(
+    status: Optional[List[str]] = Query(None, description="Only responses with all of these statuses (repeatable)"),
+    any_status: Optional[List[str]] = Query(None, description="Only responses with at least one of these statuses (repeatable)")
+):
+    try:
+        responses = await call_db(db.get_all_questionnaire_responses, status, any_status)
+        return {'success': True, 'message': 'Retrieved all questionnaire responses', 'responses': responses}
+    except PoolTimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/analytics/counts")
+async def analytics_counts(
+    by: Optional[str] = Query(None, description="Comma-separated dimensions to group by: breed, size, age_bucket, status"),
+    breed: Optional[str] = Query(None, description="Only this breed_name_AKC"),
+    size: Optional[str] = Query(None, description="Only breeds in this size category"),
+    age_bucket: Optional[str] = Query(None, description="Only this age bucket (see /api/reports/rules), or 'unknown'"),
+    status: Optional[str] = Query(None, description="Only responses with this diet-related status"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum groups to return, largest first")
+):
+    """
+    Questionnaire response counts from the analytics rollups, e.g. seniors with allergies
+    by breed: ?by=breed&age_bucket=senior&status=allergy. Counts trail new submissions by
+    up to ANALYTICS_ROLLUP_INTERVAL_SECONDS + ANALYTICS_ROLLUP_LAG_SECONDS.
+    """
+    dimensions = [d.strip() for d in by.split(',') if d.strip()] if by else []
+    unknown = [d for d in dimensions if d not in ANALYTICS_DIMENSIONS]
+    if unknown or len(set(dimensions)) != len(dimensions):
+        raise HTTPException(status_code=400, detail=f"by must be distinct values from: {', '.join(ANALYTICS_DIMENSIONS)}")
+    filters = {name: value for name, value in
+               (('breed', breed), ('size', size), ('age_bucket', age_bucket), ('status', status.lower() if status else None))
+               if value is not None}
+    try:
+        counts = await call_db(db.get_rollup_counts, dimensions, filters,
+                               report_engine.current().age_bucket_bounds(), limit)
+    except PoolTimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {'success': True, 'message': f'Retrieved {len(counts)} groups', 'by': dimensions, 'filters': filters, 'counts': counts}
+
+
+@app.get("/api/analytics/status")
+async def analytics_status():
+    """How far the rollups have caught up (database watermark) and this worker's updater counters."""
+    try:
+        watermark = await call_db(db.get_rollup_status)
+    except PoolTimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {'success': True, 'message': 'Retrieved analytics rollup status', 'watermark': watermark, 'updater': analytics_rollup.stats()}
+
+
+@app.post("/api/analytics/refresh")
+async def analytics_refresh():
+    """Fold new submissions into the rollups now instead of waiting for the next interval."""
+    try:
+        result = await analytics_rollup.run_once()
+    except PoolTimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {'success': True, 'message': f"Applied {result['rows']} new responses", **result}
+
+
+async def iterate_db(batches):
+    """
+    Async iteration over a streaming query helper: asyncpg helpers are async generators,
+    psycopg2 helpers are plain generators advanced on the threadpool (one hop per batch).
+    Either kind is closed explicitly, so the pooled connection is returned even if the
+    client disconnects.
+    """
+    if inspect.isasyncgen(batches):
+        try:
+            async for batch in batches:
+                yield batch
+        finally:
+            await batches.aclose()
+        return
+    try:
+        while True:
+            batch = await run_in_threadpool(next, batches, None)
+            if batch is None:
+                break
+            yield batch
+    finally:
+        await run_in_threadpool(batches.close)
+
+
+def json_default(value):
+    """json.dumps fallback for database types (DECIMAL ages, TIMESTAMP columns)."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def format_export_batch(rows: list, export_format: str) -> str:
+    if export_format == 'csv':
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+    return ''.join(json.dumps(dict(zip(QUESTIONNAIRE_COLUMNS, row)), default=json_default) + '\n' for row in rows)
+
+
+@app.get("/api/questionnaire/export")
+async def export_questionnaire_responses(
+    format: str = Query('ndjson', pattern='^(ndjson|csv)$', description="ndjson or csv"),
+    since: Optional[datetime] = Query(None, description="Only rows with modified_preReg at or after this time (ISO 8601)")
+):
+    """
+    Stream every questionnaire response (oldest first) as NDJSON or CSV.
+
+    Rows come from a server-side cursor in fixed-size batches, so memory use does not
+    grow with the table. For incremental pulls pass the last modified_preReg seen as
+    `since`; rows at exactly that time are sent again, so de-duplicate on id_preRegister.
+    """
+    if since is not None and since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)  # modified_preReg is stored as UTC without zone
+
+    batches = iterate_db(db.stream_questionnaire_responses(since))
+    try:
+        # Run the query before sending headers so connection errors still map to 503/500
+        first = await batches.__anext__()
+    except StopAsyncIteration:
+        first = []
+    except PoolTimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def body():
+        try:
+            if format == 'csv':
+                yield ','.join(QUESTIONNAIRE_COLUMNS) + '\r\n'
+            yield format_export_batch(first, format)
+            async for batch in batches:
+                yield format_export_batch(batch, format)
+        finally:
+            await batches.aclose()
+
+    media_type = 'text/csv' if format == 'csv' else 'application/x-ndjson'
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename="questionnaire_responses.{format}"'}
+    )
+
+
+@app.get("/api/questionnaire/{record_id}")
+async def get_questionnaire_response(
+    record_id: int = Path(..., description="The id_preRegister of the submission")
+):
+    try:
+        response = await call_db(db.get_questionnaire_response, record_id)
+    except PoolTimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not response:
+        raise HTTPException(status_code=404, detail='Questionnaire response not found')
+    return {'success': True, 'message': 'Retrieved questionnaire response', 'response': response}
+
+
 @app.patch("/api/breed/{search_field}/{search_value}")
-def update_breed_partial(
+async def update_breed_partial(
     search_field: str = Path(..., description="Search by 'breed_name_AKC' or 'dogapi_id'"),
     search_value: str = Path(..., description="The breed name or ID to update"),
     data: BreedUpdateInput = None
 ):
-    if search_field not in ['breed_name_AKC', 'dogapi_id']:
-        raise HTTPException(status_code=400, detail='Invalid search field. Use breed_name_AKC or dogapi_id')
+    check_search_field(search_field)
     if data is None:
         raise HTTPException(status_code=400, detail='Request body is required')
     update_data = data.dict(exclude_unset=True)
     if not update_data:
         raise HTTPException(status_code=400, detail='No update data provided')
     
-    # Whitelist of allowed field names to prevent SQL injection
-    allowed_fields = {
-        'breed_otherNames', 'breed_group_AKC', 'breed_size_categ_AKC',
-        'breed_life_expect_yrs', 'food_recomm_brand', 'food_recomm_product',
-        'food_recomm_format', 'listed_DogDiet_MVP'
-    }
-    
-    # Filter to only include allowed fields
-    filtered_data = {k: v for k, v in update_data.items() if k in allowed_fields}
+    # Only the columns the prepared breed_update_* statements can set
+    filtered_data = {k: v for k, v in update_data.items() if k in BREED_UPDATE_FIELDS}
     if not filtered_data:
         raise HTTPException(status_code=400, detail='No valid fields to update')
     
     try:
-        assignments = ', '.join([f"{field}=%s" for field in filtered_data.keys()])
-        values = list(filtered_data.values())
-        conn = get_db_connection(); cur = conn.cursor()
-        if search_field == 'breed_name_AKC':
-            cur.execute(f"UPDATE breeds_AKC_Rsrch_FoodV1 SET {assignments} WHERE breed_name_AKC=%s", values + [search_value])
-        else:
-            cur.execute(f"UPDATE breeds_AKC_Rsrch_FoodV1 SET {assignments} WHERE dogapi_id=%s", values + [search_value])
-        conn.commit(); cur.close(); conn.close()
+        await call_db(db.update_breed_fields, search_field, search_value, filtered_data)
+        # Also when BREED_CACHE_ENABLED is off: typeahead and submit reports read the catalog
+        await breed_catalog.refresh_breed(search_field, search_value)
         return {
             'success': True,
             'message': f'Breed updated successfully via {search_field}',
             'updated_fields': list(filtered_data.keys()),
             'search_value': search_value
         }
+    except PoolTimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.put("/api/breed/{search_field}/{search_value}")
-def update_breed_full(
+async def update_breed_full(
     search_field: str = Path(..., description="Search by 'breed_name_AKC' or 'dogapi_id'"),
     search_value: str = Path(..., description="The breed name or ID to update"),
     data: BreedFullUpdateInput = None
 ):
-    if search_field not in ['breed_name_AKC', 'dogapi_id']:
-        raise HTTPException(status_code=400, detail='Invalid search field. Use breed_name_AKC or dogapi_id')
+    check_search_field(search_field)
     try:
-        conn = get_db_connection(); cur = conn.cursor()
-        if search_field == 'breed_name_AKC':
-            cur.execute("UPDATE breeds_AKC_Rsrch_FoodV1 SET breed_group_AKC=%s, breed_size_categ_AKC=%s WHERE breed_name_AKC=%s",
-                        (data.breed_group_AKC, data.breed_size_categ_AKC, search_value))
-        else:
-            cur.execute("UPDATE breeds_AKC_Rsrch_FoodV1 SET breed_group_AKC=%s, breed_size_categ_AKC=%s WHERE dogapi_id=%s",
-                        (data.breed_group_AKC, data.breed_size_categ_AKC, search_value))
-        conn.commit(); cur.close(); conn.close()
+        await call_db(db.replace_breed, search_field, search_value, data.breed_group_AKC, data.breed_size_categ_AKC)
+        # Also when BREED_CACHE_ENABLED is off: typeahead and submit reports read the catalog
+        await breed_catalog.refresh_breed(search_field, search_value)
         return {'success': True, 'message': f'Breed fully replaced successfully via {search_field}', 'search_value': search_value}
+    except PoolTimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.delete("/api/breed/{search_field}/{search_value}")
-def delete_breed(
+async def delete_breed(
     search_field: str = Path(..., description="Search by 'breed_name_AKC' or 'dogapi_id'"),
     search_value: str = Path(..., description="The breed name or ID to delete")
 ):
-    if search_field not in ['breed_name_AKC', 'dogapi_id']:
-        raise HTTPException(status_code=400, detail='Invalid search field. Use breed_name_AKC or dogapi_id')
+    check_search_field(search_field)
     try:
-        conn = get_db_connection(); cur = conn.cursor()
-        if search_field == 'breed_name_AKC':
-            cur.execute("DELETE FROM breeds_AKC_Rsrch_FoodV1 WHERE breed_name_AKC=%s", (search_value,))
-        else:
-            cur.execute("DELETE FROM breeds_AKC_Rsrch_FoodV1 WHERE dogapi_id=%s", (search_value,))
-        conn.commit(); cur.close(); conn.close()
+        await call_db(db.delete_breed, search_field, search_value)
+        # Also when BREED_CACHE_ENABLED is off: typeahead and submit reports read the catalog
+        await breed_catalog.refresh_breed(search_field, search_value)
         return {'success': True, 'message': 'Breed deleted successfully', 'deleted': search_value}
+    except PoolTimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/breeds/import")
+async def import_breeds(
+    request: Request,
+    dry_run: bool = Query(False, description="Report what would change without writing anything")
+):
+    """
+    Create or update many breeds in one transaction (e.g. a refreshed AKC research sheet).
+
+    The body is CSV with a header row (Content-Type text/csv), NDJSON (application/x-ndjson)
+    or a JSON array, with records matching BreedCreateInput. Columns the file does not
+    contain keep their stored values; empty cells are stored as NULL. If any row is
+    invalid nothing is written. Returns the inserted and updated breeds (with the
+    fields that changed) and the number left unchanged.
+    """
+    try:
+        items, columns = await read_breed_file(
+            request.stream(), request.headers.get('content-type', ''),
+            validate=BreedCreateInput.model_validate, fields=list(BreedCreateInput.model_fields)
+        )
+    except BreedImportError as e:
+        raise HTTPException(status_code=422, detail={'message': str(e), 'errors': e.errors})
+    rows = [tuple(getattr(item, column) for column in columns) for item in items]
+    try:
+        summary = await call_db(db.import_breeds, columns, rows, dry_run)
+    except BreedImportDataError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except PoolTimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not dry_run and (summary['inserted'] or summary['updated']):
+        # One reload for the whole import; listeners (typeahead, submit reports) get a single diff
+        await breed_catalog.refresh_if_loaded()
+    return {
+        'success': True,
+        'message': (f"{'Would import' if dry_run else 'Imported'} {len(rows)} breeds: {len(summary['inserted'])} new, "
+                    f"{len(summary['updated'])} updated, {summary['unchanged']} unchanged"),
+        'dry_run': dry_run,
+        'columns': columns,
+        'received': len(rows),
+        **summary
+    }
+
+
+@app.get("/api/db/pool")
+def db_pool_stats():
+    """Connection pool statistics for the active DB_BACKEND."""
+    stats = db.get_pool_stats()
+    if stats is None:
+        return {'success': False, 'message': 'Database pool not initialized', 'pool': None}
+    return {'success': True, 'message': f'Retrieved {DB_BACKEND} pool statistics', 'pool': stats}
+
+
+@app.get("/api/db/slow-queries")
+def slow_queries(
+    limit: int = Query(20, ge=1, le=500, description="Number of statements to return"),
+    order_by: str = Query('max', pattern='^(max|total|mean|slow)$',
+                          description="Rank by max_ms, total_ms, mean_ms or slow_calls")
+):
+    """
+    Slowest statement fingerprints seen by this worker since startup (or the last reset):
+    normalized SQL, call counts, timings, the parameter shapes of the last slow run and,
+    when one was sampled, its EXPLAIN plan.
+    """
+    return {
+        'success': True,
+        'message': f'Top {limit} statements by {order_by}',
+        'log': query_log.stats(),
+        'queries': query_log.top(limit, order_by),
+    }
+
+
+@app.delete("/api/db/slow-queries")
+def reset_slow_queries():
+    """Forget the statement statistics collected so far (e.g. before a benchmark run)."""
+    query_log.reset()
+    return {'success': True, 'message': 'Statement statistics reset'}
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Request, database, chat provider and cache metrics of this worker in Prometheus text format."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (METRICS_ENABLED=false)")
+    return Response(content=metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.post("/api/chat", response_model=ChatResponse)
-def chat(request: ChatRequest):
+async def chat(request: ChatRequest):
     """
     Chat endpoint for AI chatbot.
     Accepts user messages and returns AI responses about dog nutrition and diet.
@@ -263,10 +979,11 @@ def chat(request: ChatRequest):
             ])
         
         # Get AI response
-        result = get_chat_response(
+        result = await get_chat_response(
             user_message=request.message,
             conversation_history=history,
-            system_prompt=request.system_prompt
+            system_prompt=request.system_prompt,
+            session_id=request.session_id
         )
         
         if result["error"]:
@@ -281,15 +998,122 @@ def chat(request: ChatRequest):
             success=True,
             message="Chat response generated successfully",
             response=result["response"],
-            error=None
+            error=None,
+            cached=result["cached"],
+            coalesced=result["coalesced"],
+            history_tokens_saved=result["history_tokens_saved"],
+            session_id=result["session_id"],
+            session_reset=result["session_reset"]
         )
     
     except ValueError as e:
         # Configuration errors (missing API key, etc.)
         raise HTTPException(status_code=503, detail=str(e))
+    except ChatBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={'Retry-After': '1'})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
 
 
+@app.get("/api/chat/cache")
+def chat_cache_stats():
+    """Chat response cache hit/miss counters and size."""
+    return {'success': True, 'message': 'Retrieved chat cache statistics', 'cache': chat_cache.stats()}
+
+
+@app.get("/api/chat/provider")
+def chat_provider_stats():
+    """Chat provider concurrency, retry and request-coalescing counters."""
+    return {
+        'success': True,
+        'message': f'Retrieved {chat_provider.name} provider statistics',
+        'provider': chat_provider.stats(),
+        'coalescing': chat_inflight.stats(),
+    }
+
+
+@app.get("/api/chat/history")
+def chat_history_stats():
+    """Conversation history compaction: token budget, tokens saved and summary cache counters."""
+    return {'success': True, 'message': 'Retrieved chat history compaction statistics', 'history': history_compactor.stats()}
+
+
+@app.get("/api/chat/sessions")
+def chat_sessions_stats():
+    """Chat session store counters and size."""
+    return {'success': True, 'message': 'Retrieved chat session statistics', 'sessions': chat_sessions.stats()}
+
+
+@app.get("/api/chat/session/{session_id}")
+def get_chat_session(session_id: str):
+    """Messages stored for a chat session (e.g. to restore the chat after a page reload)."""
+    history = chat_sessions.get(session_id)
+    if history is None:
+        raise HTTPException(status_code=404, detail='Chat session not found or expired')
+    return {'success': True, 'message': f'Retrieved {len(history)} messages', 'session_id': session_id, 'messages': history}
+
+
+@app.delete("/api/chat/session/{session_id}")
+def delete_chat_session(session_id: str):
+    """Forget a chat session (the client's "Clear Chat")."""
+    if not chat_sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail='Chat session not found or expired')
+    return {'success': True, 'message': 'Chat session deleted'}
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/api/chat/stream")
+async def chat_stream(chat_request: ChatRequest, request: Request):
+    """
+    Streaming variant of /api/chat using Server-Sent Events.
+
+    Emits `token` events ({"content": "..."}) as the model generates text, then a
+    final `done` event with token usage, latency and the session_id, or an `error` event. If the
+    client disconnects, the upstream stream is closed so generation stops.
+    """
+    try:
+        check_chat_available()
+    except ValueError as e:
+        # Configuration errors (missing API key, etc.)
+        raise HTTPException(status_code=503, detail=str(e))
+
+    history = None
+    if chat_request.conversation_history:
+        history = format_conversation_history([
+            {"role": msg.role, "content": msg.content}
+            for msg in chat_request.conversation_history
+        ])
+    events = await stream_chat_response(
+        user_message=chat_request.message,
+        conversation_history=history,
+        system_prompt=chat_request.system_prompt,
+        session_id=chat_request.session_id
+    )
+
+    async def body():
+        try:
+            while True:
+                if await request.is_disconnected():
+                    break
+                event = await anext(events, None)
+                if event is None:
+                    break
+                yield sse_event(*event)
+        finally:
+            # Shielded: this may run while the response is being cancelled after a disconnect
+            with anyio.CancelScope(shield=True):
+                await events.aclose()
+
+    return StreamingResponse(
+        body(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}  # Keep proxies from buffering frames
+    )
+
+
 if __name__ == '__main__':
-    uvicorn.run("main:app", host="0.0.0.0", port=5000, reload=True)
\ No newline at end of file
+    uvicorn.run("main:app", host="0.0.0.0", port=5000, reload=True)
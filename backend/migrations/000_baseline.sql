@@ -0,0 +1,29 @@
+-- 000_baseline.sql - The two tables the app was built on, as they existed before any migration
+--
+-- Existing databases already have both tables, so every statement here is a no-op
+-- for them; a new database gets the original schema, which 001 onwards then extend.
+-- Applied by the migration runner: cd backend && python -m jobs.migrate
+
+CREATE TABLE IF NOT EXISTS breeds_AKC_Rsrch_FoodV1 (
+  breed_name_AKC TEXT PRIMARY KEY, -- Equality lookups, and ON CONFLICT in POST /api/breeds/import
+  breed_otherNames TEXT,
+  breed_group_AKC TEXT,
+  breed_size_categ_AKC TEXT,
+  breed_life_expect_yrs DECIMAL(3,1),
+  listed_DogDiet_MVP CHAR(1),
+  food_recomm_brand TEXT,
+  food_recomm_product TEXT,
+  food_recomm_format TEXT,
+  food_rec_note_INTERNAL TEXT,
+  size_category TEXT,
+  breed_class_AKC TEXT,
+  dogapi_id TEXT
+);
+
+CREATE TABLE IF NOT EXISTS questions_dog_initial3 (
+  id_preRegister SERIAL PRIMARY KEY,
+  breed_name_AKC TEXT,
+  age_years_preReg DECIMAL(3,1),
+  status_dietRelat_preReg TEXT, -- Comma-joined statuses as submitted
+  modified_preReg TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
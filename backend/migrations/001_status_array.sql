@@ -0,0 +1,28 @@
+-- 001_status_array.sql - Diet-related statuses as a native TEXT[] with a GIN index
+--
+-- questions_dog_initial3.status_dietRelat_preReg keeps the comma-joined text the app
+-- has always written; statuses_dietRelat_preReg holds the same statuses as an array
+-- (lowercased, trimmed, in submission order) so status filters use the GIN index
+-- instead of scanning and parsing every row.
+--
+-- Applied by the migration runner (cd backend && python -m jobs.migrate), which runs
+-- files with CREATE INDEX CONCURRENTLY statement by statement outside a transaction.
+-- Then backfill existing rows:
+--   cd backend && python -m jobs.backfill_statuses
+
+-- Single definition of "comma-joined text -> status array", used by every insert,
+-- the backfill job and the read fallback for rows not yet backfilled.
+-- NULL or empty text gives '{}', so backfilled rows never stay NULL.
+CREATE OR REPLACE FUNCTION diet_statuses(status_text TEXT) RETURNS TEXT[]
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+  SELECT COALESCE(array_agg(lower(btrim(s)) ORDER BY n), '{}')
+  FROM unnest(string_to_array(status_text, ',')) WITH ORDINALITY AS t(s, n)
+  WHERE btrim(s) <> ''
+$$;
+
+-- Nullable with no default: adding it is a catalog-only change, no table rewrite
+ALTER TABLE questions_dog_initial3 ADD COLUMN IF NOT EXISTS statuses_dietRelat_preReg TEXT[];
+
+-- Serves statuses @> ARRAY[...] (has all) and statuses && ARRAY[...] (has any)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS questions_dog_initial3_statuses_gin
+  ON questions_dog_initial3 USING GIN (statuses_dietRelat_preReg);
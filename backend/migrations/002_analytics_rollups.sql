@@ -0,0 +1,42 @@
+-- 002_analytics_rollups.sql - Rollup tables for GET /api/analytics, maintained incrementally
+--
+-- Counts are keyed by breed and whole years of age; size category comes from the breed
+-- table and age buckets from the report rules at query time, so neither needs a rebuild
+-- when they change. The app folds new questionnaire rows into these tables in
+-- (modified_preReg, id_preRegister) order and records how far it got in analytics_watermark.
+--
+-- Requires 001_status_array.sql (diet_statuses). Applied by the migration runner:
+--   cd backend && python -m jobs.migrate
+
+-- Responses per breed and age
+CREATE TABLE IF NOT EXISTS questionnaire_rollup (
+  breed_name_AKC TEXT NOT NULL, -- '' when the submission had no breed
+  age_year INTEGER NOT NULL, -- floor(age_years_preReg); -1 when no age was given
+  responses BIGINT NOT NULL,
+  PRIMARY KEY (breed_name_AKC, age_year)
+);
+
+-- Responses per breed, age and diet-related status (a response counts once for each of its statuses)
+CREATE TABLE IF NOT EXISTS questionnaire_status_rollup (
+  breed_name_AKC TEXT NOT NULL,
+  age_year INTEGER NOT NULL,
+  status TEXT NOT NULL,
+  responses BIGINT NOT NULL,
+  PRIMARY KEY (breed_name_AKC, age_year, status)
+);
+
+-- Last questionnaire row folded into the rollups; the row is locked while a chunk is applied
+CREATE TABLE IF NOT EXISTS analytics_watermark (
+  name TEXT PRIMARY KEY,
+  modified_preReg TIMESTAMP NOT NULL,
+  id_preRegister INTEGER NOT NULL,
+  rows_applied BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO analytics_watermark (name, modified_preReg, id_preRegister)
+VALUES ('questionnaire', '1970-01-01', 0)
+ON CONFLICT (name) DO NOTHING;
+
+-- Keyset scans past the watermark (also serves the ordered export)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS questions_dog_initial3_modified
+  ON questions_dog_initial3 (modified_preReg, id_preRegister);
@@ -0,0 +1,14 @@
+-- 003_breed_lookup_indexes.sql - Indexes behind the remaining breed lookups
+--
+-- breed_name_AKC equality lookups use the primary key. Built concurrently, so the
+-- table stays readable and writable while they build. Applied by the migration
+-- runner: cd backend && python -m jobs.migrate
+
+-- GET /api/breeds pages: ORDER BY breed_name_AKC COLLATE "C" with a "> cursor" condition.
+-- The primary key uses the database collation, so it cannot serve the byte-order sort.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS breeds_AKC_Rsrch_FoodV1_name_c
+  ON breeds_AKC_Rsrch_FoodV1 (breed_name_AKC COLLATE "C");
+
+-- /api/breed/dogapi_id/{id} reads, updates and deletes, POST /api/breeds/lookup and the DogAPI sync
+CREATE INDEX CONCURRENTLY IF NOT EXISTS breeds_AKC_Rsrch_FoodV1_dogapi_id
+  ON breeds_AKC_Rsrch_FoodV1 (dogapi_id);
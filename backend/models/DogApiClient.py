@@ -0,0 +1,242 @@
+# backend/models/DogApiClient.py - Client for the DogAPI breeds endpoint (https://dogapi.dog/api/v2)
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DOGAPI_BASE_URL = os.getenv("DOGAPI_BASE_URL", "https://dogapi.dog/api/v2").rstrip("/")
+DOGAPI_CACHE_DIR = os.getenv("DOGAPI_CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), ".dogapi_cache"))
+DOGAPI_CACHE_TTL_SECONDS = float(os.getenv("DOGAPI_CACHE_TTL_SECONDS", "86400"))  # Served from disk without asking; revalidated after
+DOGAPI_MAX_CONNECTIONS = int(os.getenv("DOGAPI_MAX_CONNECTIONS", "4"))  # Keep-alive pool size = concurrent page fetches
+DOGAPI_RATE_LIMIT_PER_SECOND = float(os.getenv("DOGAPI_RATE_LIMIT_PER_SECOND", "5"))  # Request starts per second (0 = unlimited)
+DOGAPI_TIMEOUT = float(os.getenv("DOGAPI_TIMEOUT", "10"))
+DOGAPI_MAX_RETRIES = int(os.getenv("DOGAPI_MAX_RETRIES", "3"))  # For 429, 5xx and connection errors
+
+
+class DogApiError(Exception):
+    """DogAPI request failed after retries, or returned something unusable."""
+
+
+class RateLimiter:
+    """Spaces request starts at least 1/rate seconds apart across all concurrent callers."""
+
+    def __init__(self, rate_per_second: float):
+        self.interval = 1 / rate_per_second if rate_per_second > 0 else 0
+        self._next_start = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        start = max(now, self._next_start)
+        self._next_start = start + self.interval  # Reserved before sleeping, so callers queue in order
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class ResponseCache:
+    """
+    On-disk cache of JSON responses, one file per URL.
+
+    Entries younger than ttl_seconds are served without a request; older
+    ones keep their ETag / Last-Modified validators so the next request can
+    be conditional and a 304 only refreshes the timestamp.
+    """
+
+    def __init__(self, directory: str, ttl_seconds: float):
+        self.directory = directory
+        self.ttl = ttl_seconds
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(url.encode()).hexdigest() + ".json")
+
+    def get(self, url: str) -> Optional[dict]:
+        """The cached entry {'url', 'etag', 'last_modified', 'fetched_at', 'body'}, or None."""
+        try:
+            with open(self._path(url), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get("url") == url else None
+
+    def fresh(self, entry: dict) -> bool:
+        return time.time() - entry["fetched_at"] < self.ttl
+
+    def put(self, url: str, body, etag: Optional[str], last_modified: Optional[str]) -> dict:
+        entry = {"url": url, "etag": etag, "last_modified": last_modified, "fetched_at": time.time(), "body": body}
+        # Write to a temp file and rename, so readers in other workers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp, self._path(url))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return entry
+
+
+def parse_breed(item: dict) -> dict:
+    """Flatten one JSON:API breed resource to {'dogapi_id', 'name', 'life_expectancy', ...}."""
+    attributes = item.get("attributes") or {}
+    life = attributes.get("life") or {}
+    bounds = [v for v in (life.get("min"), life.get("max")) if isinstance(v, (int, float))]
+    return {
+        "dogapi_id": item.get("id"),
+        "name": attributes.get("name"),
+        "life_expectancy": round(sum(bounds) / len(bounds), 1) if bounds else None,
+        "hypoallergenic": attributes.get("hypoallergenic"),
+        "description": attributes.get("description"),
+    }
+
+
+class DogApiClient:
+    """
+    Async DogAPI client.
+
+    One httpx.AsyncClient (keep-alive pool of max_connections) is shared by
+    every request. Responses go through ResponseCache: fresh entries are
+    served from disk, stale ones are revalidated with If-None-Match /
+    If-Modified-Since. Requests are spaced by a RateLimiter and retried with
+    jittered backoff on 429 (honouring Retry-After), 5xx and connection errors.
+
+    Use as an async context manager, or call aclose() when done. Pass
+    base_url (or DOGAPI_BASE_URL) to point it at a local stub server, or an
+    httpx transport (e.g. httpx.MockTransport) to skip the network entirely.
+    """
+
+    def __init__(self, base_url: str = DOGAPI_BASE_URL, cache_dir: str = DOGAPI_CACHE_DIR,
+                 cache_ttl_seconds: float = DOGAPI_CACHE_TTL_SECONDS, max_connections: int = DOGAPI_MAX_CONNECTIONS,
+                 rate_per_second: float = DOGAPI_RATE_LIMIT_PER_SECOND, timeout: float = DOGAPI_TIMEOUT,
+                 max_retries: int = DOGAPI_MAX_RETRIES, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = base_url.rstrip("/")
+        self.cache = ResponseCache(cache_dir, cache_ttl_seconds)
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.rate_limiter = RateLimiter(rate_per_second)
+        self._http = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            headers={"Accept": "application/json"},
+            transport=transport,
+        )
+
+        self.requests = 0
+        self.cache_hits = 0
+        self.not_modified = 0
+        self.downloads = 0
+        self.retries = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._http.aclose()
+
+    async def get_json(self, path: str, params: Optional[Dict[str, str]] = None):
+        """GET base_url + path as JSON, through the disk cache (read and written on a worker thread)."""
+        url = str(httpx.URL(self.base_url + path, params=params))
+        entry = await asyncio.to_thread(self.cache.get, url)
+        if entry is not None and self.cache.fresh(entry):
+            self.cache_hits += 1
+            return entry["body"]
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = await self._request(url, headers)
+        if response.status_code == 304 and entry is not None:
+            self.not_modified += 1
+            await asyncio.to_thread(self.cache.put, url, entry["body"], entry.get("etag"), entry.get("last_modified"))
+            return entry["body"]
+        try:
+            body = response.json()
+        except ValueError:
+            raise DogApiError(f"DogAPI returned invalid JSON for {url}")
+        self.downloads += 1
+        await asyncio.to_thread(self.cache.put, url, body, response.headers.get("etag"), response.headers.get("last-modified"))
+        return body
+
+    async def _request(self, url: str, headers: Dict[str, str]) -> httpx.Response:
+        attempt = 0
+        while True:
+            await self.rate_limiter.wait()
+            self.requests += 1
+            retry_after = None
+            try:
+                response = await self._http.get(url, headers=headers)
+                if response.status_code < 400 or response.status_code == 304:
+                    return response
+                if response.status_code != 429 and response.status_code < 500:
+                    raise DogApiError(f"DogAPI returned {response.status_code} for {url}")
+                error = DogApiError(f"DogAPI returned {response.status_code} for {url}")
+                retry_after = _retry_after_seconds(response.headers.get("retry-after"))
+            except httpx.TransportError as e:
+                error = DogApiError(f"DogAPI request failed for {url}: {e}")
+            if attempt >= self.max_retries:
+                raise error
+            attempt += 1
+            self.retries += 1
+            # Full jitter, or the server's Retry-After when it gives one
+            delay = retry_after if retry_after is not None else random.uniform(0, min(8.0, 0.5 * 2 ** attempt))
+            logger.info("Retrying DogAPI request in %.2fs (%s)", delay, error)
+            await asyncio.sleep(delay)
+
+    async def list_breeds(self) -> List[dict]:
+        """
+        Every breed, as parse_breed() dicts. Page 1 gives the page count; the
+        remaining pages are fetched concurrently (bounded by the connection pool
+        and the rate limiter).
+        """
+        first = await self._breeds_page(1)
+        pagination = (first.get("meta") or {}).get("pagination") or {}
+        last = int(pagination.get("last") or 1)
+        semaphore = asyncio.Semaphore(self.max_connections)
+
+        async def fetch(number: int):
+            async with semaphore:
+                return await self._breeds_page(number)
+
+        pages = [first] + list(await asyncio.gather(*(fetch(n) for n in range(2, last + 1))))
+        breeds = []
+        for page in pages:
+            breeds.extend(parse_breed(item) for item in page.get("data") or [])
+        return breeds
+
+    async def _breeds_page(self, number: int) -> dict:
+        return await self.get_json("/breeds", {"page[number]": str(number)})
+
+    def stats(self) -> dict:
+        return {
+            'base_url': self.base_url,
+            'requests': self.requests,
+            'cache_hits': self.cache_hits,
+            'not_modified': self.not_modified,
+            'downloads': self.downloads,
+            'retries': self.retries,
+        }
+
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    try:
+        return min(max(float(value), 0.0), 60.0) if value is not None else None
+    except ValueError:
+        return None  # HTTP-date form; fall back to backoff
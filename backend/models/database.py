@@ -1,9 +1,22 @@
-# backend/database.py - Database connection configuration for Neon PostgreSQL
+# backend/models/database.py - Async (asyncpg) database access for Neon PostgreSQL
+# Used by main.py when DB_BACKEND=async; mirrors the query helpers in backend/database.py
 
+import asyncio
 import os
+import time
 from dotenv import load_dotenv  # Loads environment variables from .env file
 import asyncpg  # Async PostgreSQL driver for FastAPI
 from typing import Optional
+from database import (  # Shared with the sync backend
+    BREED_COLUMNS, BREED_UPDATE_FIELDS, DB_PREPARED_STATEMENTS, PREPARED_STATEMENTS, QUESTIONNAIRE_COLUMNS,
+    QUESTIONNAIRE_EXPORT_FETCH_SIZE, ROLLUP_PENDING_CAP, ROLLUP_STATUS_FIELDS, ROLLUP_STATUS_SQL, ROLLUP_UPDATE_SQL,
+    ROLLUP_WATERMARK_SQL,
+    BreedImportDataError, PoolTimeoutError, breed_import_summary, build_breed_import_sql, build_breed_page_query,
+    breed_key_statement, breed_page_statement, breed_update_params, build_questionnaire_query,
+    build_rollup_counts_query, page_from_rows
+)
+from services.metrics import db_checkout_seconds, db_connect_seconds
+from services.query_log import query_log, SLOW_QUERY_EXPLAIN_TIMEOUT_MS
 
 # Load environment variables from .env file
 load_dotenv()  # Automatically finds and loads .env in same directory
@@ -15,12 +28,78 @@ DATABASE_URL = os.getenv("DATABASE_URL")  # Retrieves DATABASE_URL from .env fil
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL not found in environment variables. Check your .env file.")
 
+# Pool settings shared with the sync backend (see .env.example)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # Seconds to wait for a free connection
+
+# asyncpg prepares every statement it runs and keeps the most recent ones per connection, keyed by
+# SQL text; PREPARED_STATEMENTS gives the hot paths one fixed text each so they always hit this cache.
+# DB_PREPARED_STATEMENTS=false turns the cache off (needed behind a transaction-mode pooler).
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100")) if DB_PREPARED_STATEMENTS else 0
+
 
 # ==================== Database Connection Pool ====================
 
 # Global variable to store connection pool
 db_pool: Optional[asyncpg.Pool] = None
 
+# Running EXPLAIN captures (kept referenced until they finish)
+_explain_tasks = set()
+
+# Usage counters reported by get_pool_stats (same keys as the sync pool). Only touched on the event loop.
+_pool_counters = {
+    'waiting': 0,
+    'checkouts': 0,
+    'timeouts': 0,
+    'healthcheck_failures': 0,  # asyncpg replaces closed connections itself; there is no health query to fail
+    'connections_opened': 0,
+    'wait_time_total': 0.0,
+}
+
+
+# Registry name per statement text, so per-statement metrics use the same names as the sync backend
+_PREPARED_BY_SQL = {statement.sql: statement.name for statement in PREPARED_STATEMENTS.values()}
+
+
+def _log_query(record):
+    """asyncpg query logger: feeds query_log, and starts an EXPLAIN capture when it asks for one."""
+    if query_log.record(record.query, record.args, record.elapsed, record.exception is not None,
+                        _PREPARED_BY_SQL.get(record.query)):
+        task = asyncio.get_running_loop().create_task(_capture_explain(record.query, record.args))
+        _explain_tasks.add(task)
+        task.add_done_callback(_explain_tasks.discard)
+
+
+async def _capture_explain(query: str, args: tuple):
+    sql, analyzed = query_log.explain_sql(query)
+    started = time.perf_counter()
+    try:
+        with query_log.capturing():
+            async with acquire() as connection:
+                transaction = connection.transaction()
+                await transaction.start()
+                try:
+                    await connection.execute(f"SET LOCAL statement_timeout = {SLOW_QUERY_EXPLAIN_TIMEOUT_MS:d}")
+                    rows = await connection.fetch(sql, *args)
+                finally:
+                    await transaction.rollback()  # EXPLAIN ANALYZE only runs reads, but never keep anything it did
+        query_log.save_explain(query, [row[0] for row in rows], analyzed, time.perf_counter() - started)
+    except Exception as e:
+        query_log.explain_failed(e)
+
+
+async def _connect(*args, **kwargs) -> asyncpg.Connection:
+    """Pool connect hook: times each new connection (TLS + auth) like the sync pool does."""
+    with db_connect_seconds.time(('async',)):
+        connection = await asyncpg.connect(*args, **kwargs)
+    _pool_counters['connections_opened'] += 1
+    return connection
+
+
+async def _init_connection(connection):
+    connection.add_query_logger(_log_query)
+
 
 async def get_database_pool() -> asyncpg.Pool:
     """
@@ -32,9 +111,12 @@ async def get_database_pool() -> asyncpg.Pool:
     if db_pool is None:  # Only create pool if it doesn't exist
         db_pool = await asyncpg.create_pool(
             DATABASE_URL,  # Connection string from .env
-            min_size=2,  # Minimum number of connections in pool
-            max_size=10,  # Maximum number of connections in pool
-            command_timeout=60  # Timeout for queries in seconds
+            min_size=DB_POOL_MIN_SIZE,  # Minimum number of connections in pool
+            max_size=DB_POOL_MAX_SIZE,  # Maximum number of connections in pool
+            command_timeout=60,  # Timeout for queries in seconds
+            statement_cache_size=DB_STATEMENT_CACHE_SIZE,  # Prepared statements kept per connection
+            connect=_connect,  # Connect timing for /metrics
+            init=_init_connection  # Per-statement timing for the slow-query log
         )
     
     return db_pool
@@ -52,6 +134,61 @@ async def close_database_pool():
         db_pool = None
 
 
+def get_pool_stats() -> Optional[dict]:
+    """Statistics for the asyncpg pool, or None if it has not been created."""
+    if db_pool is None:
+        return None
+    size = db_pool.get_size()
+    idle = db_pool.get_idle_size()
+    checkouts = _pool_counters['checkouts']
+    return {
+        'min_size': db_pool.get_min_size(),
+        'max_size': db_pool.get_max_size(),
+        'size': size,
+        'idle': idle,
+        'in_use': size - idle,
+        'waiting': _pool_counters['waiting'],
+        'checkouts': checkouts,
+        'timeouts': _pool_counters['timeouts'],
+        'healthcheck_failures': _pool_counters['healthcheck_failures'],
+        'connections_opened': _pool_counters['connections_opened'],
+        'avg_wait_ms': round(1000 * _pool_counters['wait_time_total'] / checkouts, 3) if checkouts else 0.0,
+    }
+
+
+class _Acquire:
+    """pool.acquire() with DB_POOL_TIMEOUT, raising PoolTimeoutError like the sync pool."""
+
+    def __init__(self):
+        self._pool = None
+        self._connection = None
+
+    async def __aenter__(self):
+        self._pool = await get_database_pool()
+        started = time.perf_counter()
+        _pool_counters['waiting'] += 1
+        try:
+            self._connection = await self._pool.acquire(timeout=DB_POOL_TIMEOUT)
+        except asyncio.TimeoutError:
+            _pool_counters['timeouts'] += 1
+            raise PoolTimeoutError(f"Timed out after {DB_POOL_TIMEOUT}s waiting for a database connection")
+        finally:
+            _pool_counters['waiting'] -= 1
+            waited = time.perf_counter() - started
+            db_checkout_seconds.observe(('async',), waited)
+        _pool_counters['checkouts'] += 1
+        _pool_counters['wait_time_total'] += waited
+        return self._connection
+
+    async def __aexit__(self, *exc):
+        await self._pool.release(self._connection)
+
+
+def acquire() -> _Acquire:
+    """Borrow a connection from the pool: `async with acquire() as connection:`"""
+    return _Acquire()
+
+
 # ==================== Database Query Helper Functions ====================
 
 async def execute_query(query: str, *args):
@@ -65,9 +202,7 @@ async def execute_query(query: str, *args):
     Returns:
         Result of the query execution
     """
-    pool = await get_database_pool()
-    
-    async with pool.acquire() as connection:  # Get connection from pool
+    async with acquire() as connection:  # Get connection from pool
         result = await connection.execute(query, *args)  # Execute query with parameters
         return result
 
@@ -83,9 +218,7 @@ async def fetch_one(query: str, *args):
     Returns:
         Single row as a Record object, or None if no results
     """
-    pool = await get_database_pool()
-    
-    async with pool.acquire() as connection:
+    async with acquire() as connection:
         row = await connection.fetchrow(query, *args)  # Fetch one row
         return dict(row) if row else None  # Convert to dict for easier use
 
@@ -101,13 +234,293 @@ async def fetch_all(query: str, *args):
     Returns:
         List of rows as dictionaries
     """
-    pool = await get_database_pool()
-    
-    async with pool.acquire() as connection:
+    async with acquire() as connection:
         rows = await connection.fetch(query, *args)  # Fetch all rows
         return [dict(row) for row in rows]  # Convert each row to dict
 
 
+# ==================== Breed Queries ====================
+# Same names, arguments and return values as the psycopg2 helpers in backend/database.py
+
+async def get_breeds_page(fields: list, filters: dict, cursor: Optional[str], limit: int) -> tuple:
+    """One keyset page of breeds with only the requested columns; returns (breeds, next_cursor)."""
+    if filters:
+        sql, params = build_breed_page_query(fields, filters, cursor, limit, numbered_params=True)
+        columns = None
+    else:
+        name, params = breed_page_statement(cursor, limit)
+        sql, columns = PREPARED_STATEMENTS[name].sql, BREED_COLUMNS
+    try:
+        async with acquire() as connection:
+            rows = await connection.fetch(sql, *params)
+    except asyncpg.PostgresError as e:
+        raise Exception(f"Database error: {str(e)}")
+    return page_from_rows(rows, fields, limit, columns)
+
+
+async def get_breed_catalog() -> list:
+    """Every breed record keyed by BREED_COLUMNS, ordered by name."""
+    try:
+        async with acquire() as connection:
+            rows = await connection.fetch(PREPARED_STATEMENTS['breed_catalog'].sql)
+    except asyncpg.PostgresError as e:
+        raise Exception(f"Database error: {str(e)}")
+    return [dict(zip(BREED_COLUMNS, row)) for row in rows]
+
+
+async def get_breed(search_field: str, search_value: str) -> Optional[dict]:
+    """Single breed record keyed by BREED_COLUMNS, or None if no breed matches."""
+    statement = PREPARED_STATEMENTS[breed_key_statement('breed_by', search_field)]
+    try:
+        async with acquire() as connection:
+            row = await connection.fetchrow(statement.sql, search_value)
+    except asyncpg.PostgresError as e:
+        raise Exception(f"Database error: {str(e)}")
+    return dict(zip(BREED_COLUMNS, row)) if row else None
+
+
+async def get_breeds_by_keys(breed_names: list, dogapi_ids: list) -> list:
+    """Every breed matching any of the names or DogAPI IDs, in one query; dicts keyed by BREED_COLUMNS."""
+    try:
+        rows = await fetch_all(PREPARED_STATEMENTS['breeds_by_keys'].sql, list(breed_names), list(dogapi_ids))
+    except asyncpg.PostgresError as e:
+        raise Exception(f"Database error: {str(e)}")
+    return [dict(zip(BREED_COLUMNS, row.values())) for row in rows]
+
+
+async def apply_dogapi_matches(matches: list) -> list:
+    """Set dogapi_id (and a missing breed_life_expect_yrs) per (name, dogapi_id, life) tuple; returns changed names."""
+    if not matches:
+        return []
+    try:
+        rows = await fetch_all(
+            "UPDATE breeds_AKC_Rsrch_FoodV1 AS b "
+            "SET dogapi_id = v.dogapi_id, breed_life_expect_yrs = COALESCE(b.breed_life_expect_yrs, v.life) "
+            "FROM unnest($1::text[], $2::text[], $3::float8[]) AS v (breed_name_AKC, dogapi_id, life) "
+            "WHERE b.breed_name_AKC = v.breed_name_AKC AND (b.dogapi_id IS DISTINCT FROM v.dogapi_id "
+            "OR (b.breed_life_expect_yrs IS NULL AND v.life IS NOT NULL)) "
+            "RETURNING b.breed_name_AKC",
+            [m[0] for m in matches], [m[1] for m in matches], [m[2] for m in matches]
+        )
+    except asyncpg.PostgresError as e:
+        raise Exception(f"Database error: {str(e)}")
+    return [row['breed_name_akc'] for row in rows]
+
+
+def _rowcount(status: str) -> int:
+    # asyncpg returns the command tag, e.g. "UPDATE 1" / "DELETE 0"
+    return int(status.split()[-1]) if status else 0
+
+
+async def update_breed_fields(search_field: str, search_value: str, fields: dict) -> int:
+    """Update the given BREED_UPDATE_FIELDS columns of one breed (one statement for any subset); returns rows updated."""
+    unknown = set(fields) - set(BREED_UPDATE_FIELDS)
+    if unknown:
+        raise ValueError(f"Cannot update {', '.join(sorted(unknown))}")
+    statement = PREPARED_STATEMENTS[breed_key_statement('breed_update_by', search_field)]
+    try:
+        status = await execute_query(statement.sql, *breed_update_params(fields, search_value))
+    except asyncpg.PostgresError as e:
+        raise Exception(f"Database error: {str(e)}")
+    return _rowcount(status)
+
+
+async def replace_breed(search_field: str, search_value: str, breed_group: str, breed_size_categ: str) -> int:
+    """Replace the required columns of one breed (PUT); returns rows updated."""
+    statement = PREPARED_STATEMENTS[breed_key_statement('breed_replace_by', search_field)]
+    try:
+        status = await execute_query(statement.sql, breed_group, breed_size_categ, search_value)
+    except asyncpg.PostgresError as e:
+        raise Exception(f"Database error: {str(e)}")
+    return _rowcount(status)
+
+
+async def delete_breed(search_field: str, search_value: str) -> int:
+    """Delete one breed; returns rows deleted."""
+    statement = PREPARED_STATEMENTS[breed_key_statement('breed_delete_by', search_field)]
+    try:
+        status = await execute_query(statement.sql, search_value)
+    except asyncpg.PostgresError as e:
+        raise Exception(f"Database error: {str(e)}")
+    return _rowcount(status)
+
+
+async def import_breeds(columns: list, rows: list, dry_run: bool = False) -> dict:
+    """
+    Upsert many breeds in one transaction (COPY into a temp table, diff, INSERT ... ON CONFLICT).
+    Returns the diff summary like the sync helper; raises BreedImportDataError on bad values.
+    """
+    diff_sql, upsert_sql = build_breed_import_sql(columns)
+    try:
+        async with acquire() as connection:
+            transaction = connection.transaction()
+            await transaction.start()
+            try:
+                await connection.execute("CREATE TEMP TABLE breed_import (LIKE breeds_AKC_Rsrch_FoodV1) ON COMMIT DROP")
+                # Binary COPY; unquoted identifiers are stored lowercase
+                await connection.copy_records_to_table('breed_import', records=rows, columns=[c.lower() for c in columns])
+                summary = breed_import_summary(await connection.fetch(diff_sql))
+                await connection.execute(upsert_sql)
+            except BaseException:
+                await transaction.rollback()
+                raise
+            if dry_run:
+                await transaction.rollback()
+            else:
+                await transaction.commit()
+    except (asyncpg.DataError, asyncpg.IntegrityConstraintViolationError) as e:
+        raise BreedImportDataError(f"Invalid breed data: {str(e)}")
+    except asyncpg.PostgresError as e:
+        raise Exception(f"Database error: {str(e)}")
+    return summary
+
+
+# ==================== Questionnaire Queries ====================
+
+async def insert_dog_questionnaire(breed_name: str, age_years: float, status_list: list) -> dict:
+    """Insert a questionnaire response; returns {'success', 'id', 'message'} like the sync helper."""
+    status_string = ', '.join(status_list) if status_list else None
+    try:
+        async with acquire() as connection:
+            record_id = await connection.fetchval(
+                PREPARED_STATEMENTS['questionnaire_insert'].sql, breed_name, age_years, status_string
+            )
+    except asyncpg.PostgresError as e:
+        raise Exception(f"Database error: {str(e)}")
+    return {
+        'success': True,
+        'id': record_id,
+        'message': f'Successfully saved dog questionnaire response (ID: {record_id})'
+    }
+
+
+async def insert_dog_questionnaires(records: list) -> list:
+    """
+    Insert many (breed_name, age_years, status_list) records in one transaction.
+    Falls back to per-row savepoints if the set-based insert fails, so a bad row is
+    rejected alone. Returns {'id': ...} or {'error': ...} per record, in order.
+    """
+    if not records:
+        return []
+    breeds = [breed for breed, _, _ in records]
+    ages = [age for _, age, _ in records]
+    statuses = [', '.join(s) if s else None for _, _, s in records]
+    try:
+        async with acquire() as connection:
+            try:
+                async with connection.transaction():
+                    # unnest() keeps array order, and RETURNING follows it
+                    rows = await connection.fetch(
+                        "INSERT INTO questions_dog_initial3 "
+                        "(breed_name_AKC, age_years_preReg, status_dietRelat_preReg, statuses_dietRelat_preReg) "
+                        "SELECT breed, age, statuses, diet_statuses(statuses) "
+                        "FROM unnest($1::text[], $2::numeric[], $3::text[]) AS u (breed, age, statuses) "
+                        "RETURNING id_preRegister",
+                        breeds, ages, statuses
+                    )
+                return [{'id': r[0]} for r in rows]
+            except (asyncpg.PostgresError, asyncpg.DataError):
+                pass
+
+            outcomes = []
+            async with connection.transaction():
+                for row in zip(breeds, ages, statuses):
+                    try:
+                        async with connection.transaction():  # Nested transaction = savepoint
+                            record_id = await connection.fetchval(
+                                "INSERT INTO questions_dog_initial3 "
+                                "(breed_name_AKC, age_years_preReg, status_dietRelat_preReg, statuses_dietRelat_preReg) "
+                                "VALUES ($1, $2, $3, diet_statuses($3)) RETURNING id_preRegister",
+                                *row
+                            )
+                        outcomes.append({'id': record_id})
+                    except (asyncpg.PostgresError, asyncpg.DataError) as e:
+                        outcomes.append({'error': f"Database error: {str(e)}"})
+            return outcomes
+    except asyncpg.PostgresError as e:
+        raise Exception(f"Database error: {str(e)}")
+
+
+async def get_all_questionnaire_responses(statuses_all: Optional[list] = None, statuses_any: Optional[list] = None) -> list:
+    """Questionnaire responses, newest first, statuses as a list; optionally filtered by status (GIN index)."""
+    sql, params = build_questionnaire_query(statuses_all, statuses_any, numbered_params=True)
+    try:
+        return await fetch_all(sql, *params)
+    except asyncpg.PostgresError as e:
+        raise Exception(f"Database error: {str(e)}")
+
+
+async def stream_questionnaire_responses(since=None, fetch_size: int = QUESTIONNAIRE_EXPORT_FETCH_SIZE):
+    """
+    Async generator over questionnaire responses, oldest first, in batches of fetch_size
+    rows read through a server-side cursor. Yields lists of records in QUESTIONNAIRE_COLUMNS order.
+    """
+    query = f"SELECT {', '.join(QUESTIONNAIRE_COLUMNS)} FROM questions_dog_initial3"
+    args = []
+    if since is not None:
+        query += " WHERE modified_preReg >= $1"
+        args.append(since)
+    query += " ORDER BY modified_preReg, id_preRegister"
+    try:
+        async with acquire() as connection:
+            async with connection.transaction():  # Cursors only live inside a transaction
+                cursor = await connection.cursor(query, *args)
+                while True:
+                    rows = await cursor.fetch(fetch_size)
+                    if not rows:
+                        break
+                    yield rows
+    except asyncpg.PostgresError as e:
+        raise Exception(f"Database error: {str(e)}")
+
+
+async def get_questionnaire_response(record_id: int) -> Optional[dict]:
+    """One questionnaire response by id_preRegister (statuses as a list), or None."""
+    try:
+        return await fetch_one(PREPARED_STATEMENTS['questionnaire_by_id'].sql, record_id)
+    except asyncpg.PostgresError as e:
+        raise Exception(f"Database error: {str(e)}")
+
+
+# ==================== Analytics Rollups ====================
+
+async def update_questionnaire_rollups(lag_seconds: float, chunk_size: int) -> dict:
+    """Fold the next chunk of new questionnaire rows into the rollups; returns {'rows', 'watermark'}."""
+    try:
+        async with acquire() as connection:
+            async with connection.transaction():
+                mark = await connection.fetchrow(ROLLUP_WATERMARK_SQL)
+                if mark is None:
+                    raise Exception("analytics_watermark has no 'questionnaire' row; apply migrations/002_analytics_rollups.sql")
+                rows, watermark = await connection.fetchrow(
+                    ROLLUP_UPDATE_SQL.format(since='$1', after_id='$2', lag='$3', limit='$4'),
+                    mark[0], mark[1], float(lag_seconds), chunk_size
+                )
+    except asyncpg.PostgresError as e:
+        raise Exception(f"Database error: {str(e)}")
+    return {'rows': rows, 'watermark': watermark or mark[0]}
+
+
+async def get_rollup_status() -> Optional[dict]:
+    """The analytics watermark and pending row count, or None if the rollups are not set up."""
+    try:
+        row = await fetch_one(ROLLUP_STATUS_SQL.format(cap=ROLLUP_PENDING_CAP))
+    except asyncpg.PostgresError as e:
+        raise Exception(f"Database error: {str(e)}")
+    return dict(zip(ROLLUP_STATUS_FIELDS, row.values())) if row else None
+
+
+async def get_rollup_counts(by: list, filters: dict, age_buckets: list, limit: int) -> list:
+    """Grouped response counts from the rollups; one key per dimension in by, plus 'responses'."""
+    sql, params = build_rollup_counts_query(by, filters, age_buckets, limit, numbered_params=True)
+    try:
+        async with acquire() as connection:
+            rows = await connection.fetch(sql, *params)
+    except asyncpg.PostgresError as e:
+        raise Exception(f"Database error: {str(e)}")
+    return [dict(zip(list(by) + ['responses'], row)) for row in rows]
+
+
 # ==================== Example Usage ====================
 
 # Example 1: Insert data
@@ -35,6 +35,7 @@ CREATE TABLE questions_dog_initial3 (
   breed_name_AKC TEXT,  -- see questions_dog_initial3 table's "Breed (name)" field
   age_years_preReg DECIMAL(3,1), -- 3 = total digits allowed, 1 = digits after decimal; -- see questions_dog_initial3 table's "Age (years)" field
   status_dietRelat_preReg TEXT, -- none, puppy, elderly, pregnant, allergy, "Other health issues"
+  statuses_dietRelat_preReg TEXT[], -- Same statuses as an array for GIN-indexed filters; see migrations/001_status_array.sql
   modified_preReg TIMESTAMP DEFAULT CURRENT_TIMESTAMP  -- Automated current date/time when record created (to handle dups from registration; not modified, since User updates in different form/table)
   );  
  
@@ -0,0 +1,99 @@
+# backend/services/analytics.py - Background upkeep of the questionnaire analytics rollups
+
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_ROLLUP_INTERVAL_SECONDS = float(os.getenv("ANALYTICS_ROLLUP_INTERVAL_SECONDS", "30"))  # 0 disables the background task
+ANALYTICS_ROLLUP_LAG_SECONDS = float(os.getenv("ANALYTICS_ROLLUP_LAG_SECONDS", "5"))  # Rows newer than this wait for the next run
+ANALYTICS_ROLLUP_CHUNK_SIZE = int(os.getenv("ANALYTICS_ROLLUP_CHUNK_SIZE", "5000"))  # Rows folded in per transaction
+ANALYTICS_ROLLUP_MAX_CHUNKS = int(os.getenv("ANALYTICS_ROLLUP_MAX_CHUNKS", "100"))  # Per run, so catching up never hogs a connection
+
+
+class RollupUpdater:
+    """
+    Folds new questionnaire rows into the analytics rollup tables.
+
+    Each run applies chunks of up to chunk_size rows past the stored
+    watermark until it catches up (or max_chunks is reached). Every chunk
+    is one transaction that updates the counts and the watermark together,
+    and locks the watermark row, so several workers can run this safely
+    and an interrupted run loses nothing.
+    """
+
+    def __init__(self, apply_chunk: Callable[[float, int], Awaitable[dict]],
+                 lag_seconds: float = 5, chunk_size: int = 5000, max_chunks: int = 100):
+        """
+        Args:
+            apply_chunk: Coroutine (lag_seconds, chunk_size) -> {'rows', 'watermark'}
+        """
+        self._apply_chunk = apply_chunk
+        self.lag_seconds = lag_seconds
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+        self._lock: Optional[asyncio.Lock] = None
+
+        self.runs = 0
+        self.failures = 0
+        self.rows_applied = 0
+        self.watermark = None
+        self.last_run_at: Optional[float] = None
+        self.last_run_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    async def run_once(self) -> dict:
+        """Apply chunks until caught up; returns {'rows', 'chunks', 'watermark', 'caught_up'}."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()  # Created lazily inside the running event loop
+        async with self._lock:  # One run at a time per process; the row lock covers other workers
+            started = time.perf_counter()
+            rows = chunks = 0
+            caught_up = False
+            try:
+                while chunks < self.max_chunks:
+                    result = await self._apply_chunk(self.lag_seconds, self.chunk_size)
+                    chunks += 1
+                    rows += result['rows']
+                    self.watermark = result['watermark']
+                    if result['rows'] < self.chunk_size:
+                        caught_up = True
+                        break
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                raise
+            finally:
+                self.runs += 1
+                self.rows_applied += rows
+                self.last_run_at = time.time()
+                self.last_run_ms = round((time.perf_counter() - started) * 1000, 1)
+            self.last_error = None
+            return {'rows': rows, 'chunks': chunks, 'watermark': self.watermark, 'caught_up': caught_up}
+
+    def stats(self) -> dict:
+        return {
+            'lag_seconds': self.lag_seconds,
+            'chunk_size': self.chunk_size,
+            'runs': self.runs,
+            'failures': self.failures,
+            'rows_applied': self.rows_applied,
+            'watermark': self.watermark,
+            'last_run_at': self.last_run_at,
+            'last_run_ms': self.last_run_ms,
+            'last_error': self.last_error,
+        }
+
+
+async def run_periodic_rollup(updater: RollupUpdater, interval_seconds: float):
+    """Background task: fold new submissions into the rollups every interval."""
+    while True:
+        try:
+            await updater.run_once()
+        except Exception as e:
+            # Counts stay at the last watermark; try again next interval
+            logger.warning("Analytics rollup update failed: %s", e)
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,286 @@
+# backend/services/breed_cache.py - Process-local snapshot of breeds_AKC_Rsrch_FoodV1 for breed reads
+
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Serve breed reads from memory (set to "false" to query the database on every request)
+BREED_CACHE_ENABLED = os.getenv("BREED_CACHE_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+# Full reload interval to pick up edits made outside the API (0 disables periodic refresh)
+BREED_CACHE_REFRESH_SECONDS = float(os.getenv("BREED_CACHE_REFRESH_SECONDS", "300"))
+
+
+def _row_etag(row: dict) -> str:
+    """Weak validator derived from a row's content."""
+    payload = json.dumps(row, sort_keys=True, default=str).encode()
+    return 'W/"' + hashlib.sha1(payload).hexdigest()[:20] + '"'
+
+
+class BreedCatalog:
+    """
+    In-memory copy of the breed table, indexed by breed_name_AKC and dogapi_id.
+
+    The table only changes through our own PATCH/PUT/DELETE routes, which call
+    refresh_breed() after committing, so reads are served from memory. A full
+    refresh() also runs periodically (see run_periodic_refresh) to pick up
+    edits made directly in the database.
+
+    Listeners registered with add_listener() are called with
+    (upserted_rows, removed_names) whenever the snapshot changes, so derived
+    structures can update incrementally.
+    """
+
+    def __init__(self, load_all: Callable[[], Awaitable[List[dict]]],
+                 load_one: Callable[[str, str], Awaitable[Optional[dict]]]):
+        """
+        Args:
+            load_all: Coroutine returning every breed record ordered by breed_name_AKC
+            load_one: Coroutine (search_field, search_value) returning one breed record or None
+        """
+        self._load_all = load_all
+        self._load_one = load_one
+        self._lock = asyncio.Lock()
+        self._listeners = []
+
+        self._by_name: Dict[str, dict] = {}
+        self._by_dogapi_id: Dict[str, dict] = {}  # First row by name for each dogapi_id
+        self._names_by_dogapi_id: Dict[str, List[str]] = {}  # Every row sharing a dogapi_id
+        self._rows: List[dict] = []  # Sorted by breed_name_AKC (code point order, like COLLATE "C")
+        self._names: List[str] = []  # breed_name_AKC of each row in _rows, for bisecting cursors
+        self._row_etags: Dict[str, str] = {}
+        self.loaded = False
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[datetime] = None  # When the content last changed
+        self.loaded_at: Optional[float] = None  # time.time() of the last successful full load
+
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    # ---------- Reads ----------
+
+    async def ensure_loaded(self):
+        """Load the snapshot on first use; later calls return immediately."""
+        if not self.loaded:
+            async with self._lock:
+                if not self.loaded:
+                    self.misses += 1
+                    await self._reload()
+                    return
+        self.hits += 1
+
+    def all(self) -> List[dict]:
+        """Every breed record, ordered by breed_name_AKC."""
+        return self._rows
+
+    def page(self, fields: List[str], filters: Dict[str, str], cursor: Optional[str], limit: int):
+        """
+        Keyset page over the snapshot, with the same semantics as database.get_breeds_page.
+
+        Returns:
+            (breeds, next_cursor) where next_cursor is None on the last page
+        """
+        rows, names = self._rows, self._names
+        start = bisect.bisect_right(names, cursor) if cursor is not None else 0
+        matched = []
+        last_name = None
+        for i in range(start, len(rows)):
+            row = rows[i]
+            if all(row.get(column) == value for column, value in filters.items()):
+                if len(matched) == limit:
+                    return matched, last_name  # A further match exists, so there is a next page
+                matched.append({field: row[field] for field in fields})
+                last_name = row['breed_name_AKC']
+        return matched, None
+
+    def get(self, search_field: str, search_value: str) -> Optional[dict]:
+        """One breed by 'breed_name_AKC' or 'dogapi_id', or None."""
+        index = self._by_name if search_field == 'breed_name_AKC' else self._by_dogapi_id
+        return index.get(search_value)
+
+    def row_etag(self, breed_name: str) -> Optional[str]:
+        return self._row_etags.get(breed_name)
+
+    def last_modified_http(self) -> Optional[str]:
+        return format_datetime(self.last_modified, usegmt=True) if self.last_modified else None
+
+    # ---------- Writes ----------
+
+    def add_listener(self, listener: Callable[[List[dict], List[str]], None]):
+        """Register a callback(upserted_rows, removed_names) fired after each snapshot change."""
+        self._listeners.append(listener)
+
+    async def refresh(self):
+        """Reload the whole table, keeping the previous snapshot if the load fails."""
+        async with self._lock:
+            await self._reload()
+
+    async def refresh_breed(self, search_field: str, search_value: str):
+        """
+        Write-through after a PATCH/PUT/DELETE: re-read the affected rows and
+        patch them into the snapshot (dropping those that no longer exist). A
+        dogapi_id can be shared by several rows, and the write touched all of them.
+        """
+        if not self.loaded:
+            return  # Nothing cached yet; the first read loads fresh data
+        async with self._lock:
+            if search_field == 'breed_name_AKC':
+                names = [search_value]
+            else:
+                names = self._names_by_dogapi_id.get(search_value, [])
+            upserted, removed = [], []
+            try:
+                if names:
+                    for name in names:
+                        row = await self._load_one('breed_name_AKC', name)
+                        if row is None:
+                            removed.append(name)
+                        else:
+                            upserted.append(row)
+                else:
+                    # Not in the snapshot yet: pick up the row the write matched, if any
+                    row = await self._load_one(search_field, search_value)
+                    if row is not None:
+                        upserted.append(row)
+            except Exception as e:
+                # The write already committed; fall back to a full reload on the next read
+                logger.warning("Breed catalog write-through failed, invalidating: %s", e)
+                self.invalidate()
+                return
+            self._apply(upserted=upserted, removed=removed)
+
+    async def refresh_if_loaded(self):
+        """
+        After a bulk change (import, DogAPI sync): reload if anything has loaded the
+        catalog, so listeners such as the typeahead index and the submit report cache
+        see the new rows. Invalidates instead if the reload fails.
+        """
+        if not self.loaded:
+            return
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.warning("Breed catalog refresh failed, invalidating: %s", e)
+            self.invalidate()
+
+    def invalidate(self):
+        """Drop the snapshot; the next read reloads it from the database."""
+        self.loaded = False
+
+    # ---------- Internals ----------
+
+    async def _reload(self):
+        rows = sorted(await self._load_all(), key=lambda row: row['breed_name_AKC'])
+        old_etags = self._row_etags
+        new_names = {row['breed_name_AKC'] for row in rows}
+        upserted = [row for row in rows if old_etags.get(row['breed_name_AKC']) != _row_etag(row)]
+        removed = [name for name in old_etags if name not in new_names]
+        self._set_rows(rows, changed=bool(upserted or removed) or not self.loaded)
+        self.loaded = True
+        self.loaded_at = time.time()
+        self.refreshes += 1
+        if upserted or removed:
+            self._notify(upserted, removed)
+
+    def _apply(self, upserted: List[dict], removed: List[str]):
+        upserted = [row for row in upserted if self._row_etags.get(row['breed_name_AKC']) != _row_etag(row)]
+        removed = [name for name in removed if name in self._by_name]
+        if not upserted and not removed:
+            return  # Write was a no-op; keep validators so clients still get 304s
+        by_name = dict(self._by_name)
+        for name in removed:
+            by_name.pop(name, None)
+        for row in upserted:
+            by_name[row['breed_name_AKC']] = row
+        self._set_rows([by_name[name] for name in sorted(by_name)], changed=True)
+        self._notify(upserted, removed)
+
+    def _set_rows(self, rows: List[dict], changed: bool):
+        # Build new indexes, then swap them in so readers never see a half-built snapshot
+        by_name = {}
+        by_dogapi_id = {}
+        names_by_dogapi_id = {}
+        row_etags = {}
+        for row in rows:
+            by_name[row['breed_name_AKC']] = row
+            if row.get('dogapi_id'):
+                by_dogapi_id.setdefault(row['dogapi_id'], row)
+                names_by_dogapi_id.setdefault(row['dogapi_id'], []).append(row['breed_name_AKC'])
+            row_etags[row['breed_name_AKC']] = _row_etag(row)
+        names = [row['breed_name_AKC'] for row in rows]
+        self._rows, self._names, self._by_name, self._by_dogapi_id, self._row_etags = rows, names, by_name, by_dogapi_id, row_etags
+        self._names_by_dogapi_id = names_by_dogapi_id
+        if changed:
+            digest = hashlib.sha1(''.join(row_etags[r['breed_name_AKC']] for r in rows).encode()).hexdigest()[:20]
+            self.etag = f'W/"{digest}"'
+            self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+
+    def _notify(self, upserted: List[dict], removed: List[str]):
+        for listener in self._listeners:
+            try:
+                listener(upserted, removed)
+            except Exception:
+                logger.exception("Breed catalog listener failed")
+
+    def stats(self) -> dict:
+        return {
+            'loaded': self.loaded,
+            'breeds': len(self._rows),
+            'etag': self.etag,
+            'last_modified': self.last_modified_http(),
+            'loaded_at': self.loaded_at,
+            'hits': self.hits,
+            'misses': self.misses,
+            'refreshes': self.refreshes,
+        }
+
+
+async def run_periodic_refresh(catalog: BreedCatalog, interval_seconds: float):
+    """
+    Background task: refresh the catalog every interval to pick up out-of-band edits.
+    Skipped while the catalog is not loaded (nothing has read it yet, or it was invalidated).
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+        if not catalog.loaded:
+            continue
+        try:
+            await catalog.refresh()
+        except Exception as e:
+            # Keep serving the previous snapshot; try again next interval
+            logger.warning("Breed catalog refresh failed: %s", e)
+
+
+def not_modified(etag: Optional[str], last_modified: Optional[datetime],
+                 if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+    """
+    Evaluate conditional request headers (RFC 9110): If-None-Match takes
+    precedence, If-Modified-Since is only consulted when it is absent.
+    """
+    if if_none_match:
+        if not etag:
+            return False
+        candidates = [tag.strip() for tag in if_none_match.split(',')]
+        # Weak comparison: W/"x" matches "x"
+        bare = etag[2:] if etag.startswith('W/') else etag
+        return '*' in candidates or any(
+            (tag[2:] if tag.startswith('W/') else tag) == bare for tag in candidates
+        )
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified <= since
+    return False
@@ -0,0 +1,121 @@
+# backend/services/breed_import.py - Parses and validates breed catalog files for POST /api/breeds/import
+
+import codecs
+import csv
+import os
+from typing import Any, AsyncIterator, Callable, List, Tuple
+
+from services.bulk_ingest import RecordParseError, iter_json_records, validation_message
+
+# Rows accepted per import; breed catalogs are a few hundred rows
+BREED_IMPORT_MAX_ROWS = int(os.getenv("BREED_IMPORT_MAX_ROWS", "5000"))
+
+
+class BreedImportError(Exception):
+    """The import file cannot be applied; errors lists the problems per row."""
+
+    def __init__(self, message: str, errors: List[dict]):
+        super().__init__(message)
+        self.errors = errors
+
+
+async def iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """
+    Decode CSV rows as dictionaries keyed by the header row, without buffering the body.
+    Empty cells become None; a UTF-8 byte order mark (spreadsheet exports) is ignored.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer = ''
+    header = None
+
+    def rows(lines: List[str]):
+        nonlocal header
+        for row in csv.reader(lines):
+            if not any(cell.strip() for cell in row):
+                continue
+            if header is None:
+                header = [cell.strip() for cell in row]
+                continue
+            if len(row) > len(header):
+                yield RecordParseError(f"Row has {len(row)} cells but the header has {len(header)}")
+                continue
+            yield {name: (value if value.strip() else None) for name, value in zip(header, row)}
+
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        # Only split on line ends outside quotes, so quoted cells may contain newlines
+        cut = _last_complete_line(buffer)
+        if cut:
+            for record in rows(buffer[:cut].splitlines(keepends=True)):
+                yield record
+            buffer = buffer[cut:]
+    buffer += decoder.decode(b'', final=True)
+    for record in rows(buffer.splitlines(keepends=True)):
+        yield record
+
+
+def _last_complete_line(text: str) -> int:
+    # Offset just past the last newline that is not inside a quoted cell (0 if none)
+    in_quotes = False
+    cut = 0
+    for i, char in enumerate(text):
+        if char == '"':
+            in_quotes = not in_quotes
+        elif char == '\n' and not in_quotes:
+            cut = i + 1
+    return cut
+
+
+async def read_breed_file(chunks: AsyncIterator[bytes], content_type: str, validate: Callable[[Any], Any],
+                          fields: List[str], max_rows: int = BREED_IMPORT_MAX_ROWS) -> Tuple[List[Any], List[str]]:
+    """
+    Read and validate a whole breed import file (CSV, NDJSON or a JSON array).
+
+    Args:
+        chunks: Raw body chunks
+        content_type: Request Content-Type; text/csv selects CSV, *ndjson* NDJSON, anything else a JSON array
+        validate: Turns a raw record into a validated object (e.g. BreedCreateInput.model_validate)
+        fields: Columns the file may set; others are ignored
+
+    Returns:
+        (items, columns): validated objects in file order, and the columns the file sets
+        (breed_name_AKC first). Columns absent from the file are left unchanged by the import.
+
+    Raises:
+        BreedImportError: Any row failed to parse or validate, a breed appears twice,
+            or the file exceeds max_rows. Nothing should be applied in that case.
+    """
+    if 'csv' in content_type:
+        records = iter_csv_records(chunks)
+    else:
+        records = iter_json_records(chunks, ndjson='ndjson' in content_type or 'jsonlines' in content_type)
+
+    items, errors = [], []
+    columns = {'breed_name_AKC'}
+    seen = {}
+    index = -1
+    async for raw in records:
+        index += 1
+        if index >= max_rows:
+            errors.append({'index': index, 'error': f'Import limit of {max_rows} rows exceeded'})
+            break
+        if isinstance(raw, RecordParseError):
+            errors.append({'index': index, 'error': str(raw)})
+            continue
+        try:
+            item = validate(raw)
+        except Exception as e:
+            errors.append({'index': index, 'error': validation_message(e)})
+            continue
+        name = item.breed_name_AKC
+        if name in seen:
+            errors.append({'index': index, 'error': f"Duplicate breed_name_AKC '{name}' (first at row {seen[name]})"})
+            continue
+        seen[name] = index
+        columns.update(raw.keys() if isinstance(raw, dict) else ())
+        items.append(item)
+    if errors:
+        raise BreedImportError(f'{len(errors)} invalid rows; nothing was imported', errors)
+    if not items:
+        raise BreedImportError('The import file has no rows', [])
+    return items, ['breed_name_AKC'] + [f for f in fields if f in columns and f != 'breed_name_AKC']
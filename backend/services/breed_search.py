@@ -0,0 +1,191 @@
+# backend/services/breed_search.py - In-memory typeahead index over breed names and aliases
+
+import bisect
+import heapq
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, List, Set, Tuple
+
+# Minimum trigram similarity (Dice coefficient) for a typo-tolerant match
+FUZZY_MIN_SIMILARITY = 0.45
+
+# Base score per match kind; aliases rank just below the same kind of match on the official name.
+# Fuzzy scores stay below 500, so any prefix match outranks every fuzzy one.
+_SCORES = {'exact': 1000, 'prefix': 800, 'word_prefix': 600, 'fuzzy': 0}
+_ALIAS_PENALTY = 50
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text: str) -> str:
+    """Casefold, strip accents and punctuation: "Löwchen (Little Lion-Dog)" -> "lowchen little lion dog"."""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    ascii_text = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(' ', ascii_text).strip()
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of each word, padded like pg_trgm ("lab" -> "  l", " la", "lab", "ab ")."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class BreedSearchIndex:
+    """
+    Typeahead index over breed_name_AKC and the semicolon-separated
+    breed_otherNames aliases.
+
+    Every name and alias is a "term". Terms are kept in a sorted list of
+    normalized keys (one key per word start, so "retr" finds "Golden
+    Retriever") for prefix lookups by bisection, and in a trigram posting
+    map for typo-tolerant matching. Multi-word terms are also matched word
+    by word, so "retreiver" still finds "Golden Retriever".
+
+    apply() takes the same (upserted_rows, removed_names) arguments as
+    BreedCatalog listeners, so the index updates incrementally as breeds
+    change.
+    """
+
+    def __init__(self):
+        self._terms: Dict[int, Tuple[str, str, bool, str]] = {}  # term id -> (breed name, term text, is_alias, normalized)
+        self._breed_terms: Dict[str, List[int]] = {}  # breed name -> its term ids
+        self._keys: List[Tuple[str, int, int]] = []  # sorted (key, term id, word position)
+        self._postings: Dict[str, Set[int]] = defaultdict(set)  # trigram -> unit ids
+        self._units: Dict[int, Tuple[int, int]] = {}  # unit id (whole term or one word) -> (term id, trigram count)
+        self._term_units: Dict[int, List[int]] = {}
+        self._next_id = 0
+        self._next_unit = 0
+        self.updates = 0
+
+    # ---------- Maintenance ----------
+
+    def apply(self, upserted: List[dict], removed: List[str]):
+        """Index changed breeds and drop removed ones (BreedCatalog listener signature)."""
+        for name in removed:
+            self._remove(name)
+        for row in upserted:
+            self._remove(row['breed_name_AKC'])
+            self._add(row)
+        self.updates += 1
+
+    def _add(self, row: dict):
+        name = row['breed_name_AKC']
+        aliases = [a.strip() for a in (row.get('breed_otherNames') or '').split(';') if a.strip()]
+        ids = []
+        seen = set()
+        for text, is_alias in [(name, False)] + [(alias, True) for alias in aliases]:
+            norm = normalize(text)
+            if not norm or norm in seen:
+                continue
+            seen.add(norm)
+            term_id = self._next_id
+            self._next_id += 1
+            self._terms[term_id] = (name, text, is_alias, norm)
+            ids.append(term_id)
+            words = norm.split(' ')
+            offset = 0
+            for position, word in enumerate(words):
+                bisect.insort(self._keys, (norm[offset:], term_id, position))
+                offset += len(word) + 1
+            units = []
+            for text_unit in [norm] + (words if len(words) > 1 else []):
+                grams = trigrams(text_unit)
+                unit_id = self._next_unit
+                self._next_unit += 1
+                self._units[unit_id] = (term_id, len(grams))
+                units.append(unit_id)
+                for gram in grams:
+                    self._postings[gram].add(unit_id)
+            self._term_units[term_id] = units
+        self._breed_terms[name] = ids
+
+    def _remove(self, name: str):
+        ids = self._breed_terms.pop(name, None)
+        if not ids:
+            return
+        dropped = set(ids)
+        self._keys = [entry for entry in self._keys if entry[1] not in dropped]
+        for term_id in ids:
+            _, _, _, norm = self._terms.pop(term_id)
+            units = set(self._term_units.pop(term_id))
+            for gram in trigrams(norm):  # Word trigrams are a subset of the term's
+                postings = self._postings.get(gram)
+                if postings is not None:
+                    postings -= units
+                    if not postings:
+                        del self._postings[gram]
+            for unit_id in units:
+                del self._units[unit_id]
+
+    # ---------- Queries ----------
+
+    def suggest(self, query: str, limit: int = 10) -> List[dict]:
+        """
+        Ranked suggestions for a partial breed name or alias.
+
+        Returns:
+            [{'breed_name_AKC', 'matched', 'match', 'score'}, ...] - one entry per breed,
+            best first; match is exact, prefix, word_prefix or fuzzy
+        """
+        q = normalize(query)
+        if not q:
+            return []
+        best: Dict[str, Tuple[float, str, str]] = {}  # breed -> (score, term text, match kind)
+
+        def offer(term_id: int, kind: str, bonus: float):
+            name, text, is_alias, norm = self._terms[term_id]
+            score = _SCORES[kind] + bonus - (_ALIAS_PENALTY if is_alias else 0)
+            current = best.get(name)
+            if current is None or score > current[0]:
+                best[name] = (score, text, kind)
+
+        # Prefix matches on any word start; shorter terms rank higher (closer to what was typed)
+        start = bisect.bisect_left(self._keys, (q,))
+        for i in range(start, len(self._keys)):
+            key, term_id, position = self._keys[i]
+            if not key.startswith(q):
+                break
+            norm = self._terms[term_id][3]
+            if position == 0:
+                kind = 'exact' if norm == q else 'prefix'
+            else:
+                kind = 'word_prefix'
+            offer(term_id, kind, 100 * len(q) / len(norm))
+
+        # Typo-tolerant matches by trigram similarity; skipped when prefix matches already fill the page
+        grams = trigrams(q) if len(best) < limit else ()
+        if grams:
+            shared = Counter()
+            for gram in grams:
+                shared.update(self._postings.get(gram, ()))  # Counts in C rather than a Python loop
+            # Dice >= m needs count >= m * (len(grams) + count) / 2, i.e. count >= m * len(grams) / (2 - m)
+            min_shared = FUZZY_MIN_SIMILARITY * len(grams) / (2 - FUZZY_MIN_SIMILARITY)
+            for unit_id, count in shared.most_common():  # Sorted in C; stop at the first unit below the bound
+                if count < min_shared:
+                    break
+                term_id, unit_grams = self._units[unit_id]
+                if self._terms[term_id][0] in best and best[self._terms[term_id][0]][2] != 'fuzzy':
+                    continue
+                similarity = 2 * count / (len(grams) + unit_grams)
+                if similarity >= FUZZY_MIN_SIMILARITY:
+                    offer(term_id, 'fuzzy', 500 * similarity)
+
+        ranked = heapq.nsmallest(limit, best.items(), key=lambda item: (-item[1][0], len(item[0]), item[0]))
+        return [
+            {'breed_name_AKC': name, 'matched': text, 'match': kind, 'score': round(score, 1)}
+            for name, (score, text, kind) in ranked
+        ]
+
+    def stats(self) -> dict:
+        return {
+            'breeds': len(self._breed_terms),
+            'terms': len(self._terms),
+            'keys': len(self._keys),
+            'trigrams': len(self._postings),
+            'trigram_units': len(self._units),
+            'updates': self.updates,
+        }
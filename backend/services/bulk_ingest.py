@@ -0,0 +1,233 @@
+# backend/services/bulk_ingest.py - Streaming parser and chunked loader for bulk questionnaire submissions
+
+import codecs
+import json
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional
+
+# Records inserted per transaction
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+# Records accepted per request; the body is not read past this
+BULK_MAX_RECORDS = int(os.getenv("BULK_MAX_RECORDS", "10000"))
+# Largest single record (decoded characters); bounds the parser's buffer
+BULK_MAX_RECORD_BYTES = int(os.getenv("BULK_MAX_RECORD_BYTES", str(64 * 1024)))
+
+# A decode error this close to the end of the buffer may just be a token cut off by the
+# chunk boundary ("tr", "1.", "\u12"); anything further back is a real syntax error
+_PARTIAL_TOKEN_CHARS = 8
+_NUMBER_CHARS = frozenset('0123456789.eE+-')
+
+
+class RecordParseError(Exception):
+    """A record in the request body that is not valid JSON."""
+
+
+async def iter_json_records(chunks: AsyncIterator[bytes], ndjson: bool,
+                            max_record_size: int = BULK_MAX_RECORD_BYTES) -> AsyncIterator[Any]:
+    """
+    Incrementally decode records from a request body without buffering it whole.
+
+    Args:
+        chunks: Raw body chunks (e.g. Starlette's request.stream())
+        ndjson: True for one JSON document per line, False for a single JSON array
+        max_record_size: Longest record accepted, in decoded characters
+
+    Yields:
+        Each decoded record, or a RecordParseError in its place. An NDJSON parse
+        error (or oversized line) only affects its own line; in a JSON array the
+        rest of the body cannot be resynchronised, so parsing stops after the error.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    if ndjson:
+        skipping = False  # Discarding the rest of an oversized line
+        async for chunk in chunks:
+            buffer += decoder.decode(chunk)
+            *lines, buffer = buffer.split('\n')
+            for line in lines:
+                if skipping:
+                    skipping = False  # This was the oversized line's tail
+                elif line.strip():
+                    yield _loads(line, max_record_size)
+            if len(buffer) > max_record_size:
+                if not skipping:
+                    yield RecordParseError(f"Record exceeds {max_record_size} characters")
+                skipping = True
+                buffer = ''
+        buffer += decoder.decode(b'', final=True)
+        if buffer.strip() and not skipping:
+            yield _loads(buffer, max_record_size)
+        return
+
+    json_decoder = json.JSONDecoder()
+    pos = 0
+    started = False
+    expect_value = True  # False right after an element: next must be ',' or ']'
+    finished = False
+    stream = chunks.__aiter__()
+    eof = False
+    while not finished:
+        # Consume everything decodable in the current buffer
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if not started:
+                if buffer[pos] != '[':
+                    yield RecordParseError("Request body must be a JSON array (or NDJSON with Content-Type application/x-ndjson)")
+                    return
+                started = True
+                pos += 1
+                continue
+            char = buffer[pos]
+            if char == ']':
+                finished = True
+                break
+            if not expect_value:
+                if char != ',':
+                    yield RecordParseError(f"Expected ',' or ']' at offset {pos}")
+                    return
+                expect_value = True
+                pos += 1
+                continue
+            try:
+                value, end = json_decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                if eof or not _maybe_incomplete(e, len(buffer)):
+                    yield RecordParseError(f"Invalid JSON: {e.msg}")
+                    return
+                break  # An element split across chunks; read more
+            if not eof and _number_may_continue(value, buffer, end):
+                break  # A trailing number may continue in the next chunk; decode it again later
+            if end - pos > max_record_size:
+                yield RecordParseError(f"Record exceeds {max_record_size} characters")
+                return
+            yield value
+            pos = end
+            expect_value = False
+        if finished:
+            break
+        if eof:
+            yield RecordParseError("Unexpected end of JSON array")
+            return
+        # Drop consumed text so the buffer stays bounded by one element
+        buffer, pos = buffer[pos:], 0
+        if len(buffer) > max_record_size:
+            yield RecordParseError(f"Record exceeds {max_record_size} characters")
+            return
+        try:
+            buffer += decoder.decode(await stream.__anext__())
+        except StopAsyncIteration:
+            buffer += decoder.decode(b'', final=True)
+            eof = True
+
+
+def _number_may_continue(value: Any, buffer: str, end: int) -> bool:
+    """Whether a number decoded at the end of the buffer could be cut short ("12" of "123", "1" of "1.5")."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+    return all(c in _NUMBER_CHARS for c in buffer[end:])
+
+
+def _maybe_incomplete(error: json.JSONDecodeError, buffer_length: int) -> bool:
+    """Whether a decode error could go away once more of the body arrives."""
+    if error.msg.startswith('Unterminated string'):
+        return True  # Reported at the opening quote, however long the string is so far
+    return buffer_length - error.pos <= _PARTIAL_TOKEN_CHARS
+
+
+def _loads(text: str, max_record_size: int):
+    if len(text) > max_record_size:
+        return RecordParseError(f"Record exceeds {max_record_size} characters")
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        return RecordParseError(f"Invalid JSON: {e.msg}")
+
+
+async def ingest_records(
+    records: AsyncIterator[Any],
+    validate: Callable[[Any], Any],
+    insert_batch: Callable[[List[Any]], Awaitable[List[dict]]],
+    describe: Callable[[Any], dict],
+    chunk_size: int = BULK_CHUNK_SIZE,
+    max_records: int = BULK_MAX_RECORDS,
+) -> List[dict]:
+    """
+    Validate records as they stream in and load the valid ones in chunks.
+
+    Args:
+        records: Decoded records (RecordParseError marks an undecodable one)
+        validate: Turns a raw record into a validated object; raises on bad input
+        insert_batch: Inserts a list of validated objects in one transaction and returns,
+            per object in order, {'id': ...} or {'error': ...}
+        describe: Extra per-record result fields for an inserted object (e.g. its report)
+        chunk_size: Records per insert_batch call
+        max_records: Records accepted; parsing stops at the next one
+
+    Returns:
+        One result dict per input record, in input order: {'index', 'success', ...}. If a
+        chunk's insert fails (pool timeout, lost connection), its records are marked failed
+        with that error and ingestion stops; earlier chunks stay committed. When ingestion
+        stops early (that, or more than max_records records), a final {'index', 'success': False,
+        'truncated': True, 'error': ...} entry stands for the records that were not read.
+    """
+    results: List[dict] = []
+    pending = []  # (result dict, validated object) awaiting insert
+
+    async def flush() -> Optional[str]:
+        """Insert the pending chunk; returns the error if the whole chunk failed."""
+        try:
+            outcomes = await insert_batch([item for _, item in pending])
+        except Exception as e:
+            error = f'Not saved: {e}'
+            for result, _ in pending:
+                result.update({'success': False, 'error': error})
+            pending.clear()
+            return error
+        for (result, item), outcome in zip(pending, outcomes):
+            if outcome.get('error'):
+                result.update({'success': False, 'error': outcome['error']})
+            else:
+                result.update({'success': True, 'record_id': outcome['id'], **describe(item)})
+        pending.clear()
+        return None
+
+    def stop(index: int, error: str):
+        results.append({'index': index, 'success': False, 'truncated': True, 'error': error})
+
+    index = 0
+    async for raw in records:
+        if index >= max_records:
+            stop(index, f'Batch limit of {max_records} records exceeded; this and any later records were not read')
+            break
+        result = {'index': index}
+        results.append(result)
+        index += 1
+        if isinstance(raw, RecordParseError):
+            result.update({'success': False, 'error': str(raw)})
+            continue
+        try:
+            item = validate(raw)
+        except Exception as e:
+            result.update({'success': False, 'error': validation_message(e)})
+            continue
+        pending.append((result, item))
+        if len(pending) >= chunk_size and await flush() is not None:
+            stop(index, 'Ingestion stopped after a failed insert; records from this index on were not read')
+            break
+    if pending:
+        await flush()
+    await records.aclose()
+    return results
+
+
+def validation_message(error: Exception) -> str:
+    # Pydantic ValidationError: summarise as "field: message; ..."
+    errors = getattr(error, 'errors', None)
+    if callable(errors):
+        return '; '.join(
+            f"{'.'.join(str(p) for p in e.get('loc', ())) or 'record'}: {e.get('msg')}" for e in errors()
+        )
+    return str(error)
@@ -0,0 +1,263 @@
+# backend/services/chat_cache.py - Response cache for repeated chat questions
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# "memory" (per process), "sqlite" (shared by all workers on this host) or "off"
+CHAT_CACHE_BACKEND = os.getenv("CHAT_CACHE_BACKEND", "memory").strip().lower()
+CHAT_CACHE_TTL_SECONDS = float(os.getenv("CHAT_CACHE_TTL_SECONDS", "86400"))
+CHAT_CACHE_MAX_BYTES = int(os.getenv("CHAT_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+CHAT_CACHE_PATH = os.getenv("CHAT_CACHE_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), ".chat_cache.sqlite3"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    # Case and spacing differences should not defeat the cache ("Is grain-free safe?" vs "is  grain-free safe?")
+    return _WHITESPACE.sub(" ", text).strip().casefold()
+
+
+def cache_key(model: str, system_prompt: str, history: Optional[List[Dict[str, str]]],
+              message: str, temperature: float) -> str:
+    """Stable hash of everything that determines the provider's answer."""
+    canonical = json.dumps(
+        {
+            "model": model,
+            "system": system_prompt,
+            "history": [[m["role"], _normalize(m["content"])] for m in (history or [])],
+            "message": _normalize(message),
+            "temperature": temperature,
+        },
+        separators=(",", ":"),
+        sort_keys=True,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class ChatCache(ABC):
+    """
+    Interface for chat response caches. Implementations must be thread-safe:
+    backends that set blocking are called from the threadpool, the others
+    directly on the event loop.
+    """
+
+    name = "base"
+    blocking = False  # True when get/set do file I/O and must stay off the event loop
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: str):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    @abstractmethod
+    def size(self) -> dict:
+        """{'entries': ..., 'bytes': ...} currently stored."""
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'backend': self.name,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'sets': self.sets,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            **self.size(),
+        }
+
+
+class NullChatCache(ChatCache):
+    """Caching disabled."""
+
+    name = "off"
+
+    def get(self, key):
+        self.misses += 1
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def clear(self):
+        pass
+
+    def size(self):
+        return {'entries': 0, 'bytes': 0}
+
+
+class InMemoryChatCache(ChatCache):
+    """Per-process LRU cache with a TTL and a cap on the total size of cached answers."""
+
+    name = "memory"
+
+    def __init__(self, ttl_seconds: float, max_bytes: int):
+        super().__init__()
+        self.ttl = ttl_seconds
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, size = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        size = len(value.encode())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old:
+                self._bytes -= old[2]
+            self._entries[key] = (value, time.monotonic() + self.ttl, size)
+            self._bytes += size
+            self.sets += 1
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def size(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes}
+
+
+class SqliteChatCache(ChatCache):
+    """
+    Cache in a local SQLite file, shared by every uvicorn worker on the host.
+    LRU order is tracked with a last-access timestamp; hit/miss counters are per process.
+    """
+
+    name = "sqlite"
+    blocking = True
+
+    def __init__(self, path: str, ttl_seconds: float, max_bytes: int):
+        super().__init__()
+        self.path = path
+        self.ttl = ttl_seconds
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS chat_cache_lru ON chat_cache (last_access)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets readers in other workers proceed during writes
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute("SELECT value, expires_at FROM chat_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        if row[1] <= now:
+            conn.execute("DELETE FROM chat_cache WHERE key = ?", (key,))
+            self.expirations += 1
+            self.misses += 1
+            return None
+        conn.execute("UPDATE chat_cache SET last_access = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return row[0]
+
+    def set(self, key, value):
+        size = len(value.encode())
+        if size > self.max_bytes:
+            return
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO chat_cache (key, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now + self.ttl, now)
+            )
+            conn.execute("DELETE FROM chat_cache WHERE expires_at <= ?", (now,))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM chat_cache").fetchone()[0]
+            if total > self.max_bytes:
+                # Evict least recently used entries until back under the cap
+                evicted = 0
+                for old_key, old_size in conn.execute(
+                        "SELECT key, size FROM chat_cache ORDER BY last_access").fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM chat_cache WHERE key = ?", (old_key,))
+                    total -= old_size
+                    evicted += 1
+                self.evictions += evicted
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self.sets += 1
+
+    def clear(self):
+        self._conn().execute("DELETE FROM chat_cache")
+
+    def size(self):
+        entries, total = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM chat_cache").fetchone()
+        return {'entries': entries, 'bytes': total}
+
+
+def create_chat_cache(backend: str = CHAT_CACHE_BACKEND) -> ChatCache:
+    """Build the cache selected by CHAT_CACHE_BACKEND."""
+    if backend == "memory":
+        return InMemoryChatCache(CHAT_CACHE_TTL_SECONDS, CHAT_CACHE_MAX_BYTES)
+    if backend == "sqlite":
+        return SqliteChatCache(CHAT_CACHE_PATH, CHAT_CACHE_TTL_SECONDS, CHAT_CACHE_MAX_BYTES)
+    if backend == "off":
+        return NullChatCache()
+    raise ValueError(f"Unknown CHAT_CACHE_BACKEND '{backend}'. Use 'memory', 'sqlite' or 'off'.")
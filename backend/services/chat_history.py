@@ -0,0 +1,210 @@
+# backend/services/chat_history.py - Token-budgeted compaction of chat conversation history
+
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Prompt tokens allowed for system prompt + history + new message (0 disables compaction)
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "2000"))
+# Upper bound on the rolling summary of folded turns; the oldest summary lines are dropped first
+CHAT_SUMMARY_MAX_TOKENS = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", "300"))
+# Words kept from each folded message in the summary
+CHAT_SUMMARY_WORDS_PER_MESSAGE = int(os.getenv("CHAT_SUMMARY_WORDS_PER_MESSAGE", "30"))
+# Conversations whose summary is remembered between turns
+CHAT_SUMMARY_CACHE_SIZE = int(os.getenv("CHAT_SUMMARY_CACHE_SIZE", "1000"))
+
+# Try to import tiktoken for exact counts, fall back to an estimate if not installed
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+MESSAGE_OVERHEAD_TOKENS = 4  # Role and delimiters the chat format adds around each message
+REPLY_PRIMING_TOKENS = 3  # Every reply is primed with <|start|>assistant<|message|>
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough BPE token count: words and punctuation, or ~4 characters per token, whichever is larger."""
+    return max(len(_TOKEN_PATTERN.findall(text)), math.ceil(len(text) / 4))
+
+
+def get_token_counter(model: str) -> Callable[[str], int]:
+    """Token counter for model: tiktoken's encoding if available, otherwise estimate_tokens."""
+    if TIKTOKEN_AVAILABLE:
+        try:
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding("cl100k_base")
+            return lambda text: len(encoding.encode(text, disallowed_special=()))
+        except Exception as e:
+            # The encoding files are downloaded on first use; offline hosts fall back to estimates
+            logger.warning("tiktoken encoding unavailable, estimating token counts: %s", e)
+    return estimate_tokens
+
+
+class HistoryCompactor:
+    """
+    Keeps prompts within a token budget.
+
+    The system prompt and the new user message are always sent. Prior turns
+    are kept verbatim from the newest backwards while they fit; older turns
+    are folded into a short extractive summary (the opening words of each
+    message) sent as a second system message.
+
+    Summaries are cached by a hash chain over the folded messages. A
+    conversation's next turn usually folds the same messages plus a few
+    more, so its summary extends the cached one instead of re-reading the
+    whole transcript.
+    """
+
+    def __init__(self, count_tokens: Callable[[str], int], token_budget: int = 2000,
+                 summary_max_tokens: int = 300, words_per_message: int = 30, cache_size: int = 1000):
+        self.count_tokens = count_tokens
+        self.token_budget = token_budget
+        self.summary_max_tokens = summary_max_tokens
+        self.words_per_message = words_per_message
+        self.cache_size = cache_size
+        self._summaries: "OrderedDict[str, List[str]]" = OrderedDict()  # chain hash -> summary lines
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.compacted = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.summary_hits = 0
+        self.summary_extends = 0
+        self.summary_builds = 0
+
+    def message_tokens(self, message: Dict[str, str]) -> int:
+        return self.count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+    def compact(self, system_message: Dict[str, str], history: List[Dict[str, str]],
+                user_message: Dict[str, str]) -> Tuple[List[Dict[str, str]], dict]:
+        """
+        Build the messages list for one request within the token budget.
+
+        Returns:
+            (messages, usage) where usage is {'tokens_before', 'tokens_after', 'tokens_saved', 'folded_messages'}
+        """
+        fixed = self.message_tokens(system_message) + self.message_tokens(user_message) + REPLY_PRIMING_TOKENS
+        history_tokens = [self.message_tokens(m) for m in history]
+        before = fixed + sum(history_tokens)
+        self.requests += 1
+
+        if not self.token_budget or before <= self.token_budget:
+            return [system_message, *history, user_message], self._record(before, before, 0)
+
+        # Newest turns first, leaving room for the summary of whatever is folded
+        available = self.token_budget - fixed - self.summary_max_tokens - MESSAGE_OVERHEAD_TOKENS
+        split = len(history)
+        used = 0
+        while split > 0 and used + history_tokens[split - 1] <= available:
+            split -= 1
+            used += history_tokens[split]
+
+        messages = [system_message]
+        if split:
+            summary = {"role": "system", "content": self._summary(history[:split])}
+            messages.append(summary)
+            used += self.message_tokens(summary)
+        messages.extend(history[split:])
+        messages.append(user_message)
+        after = fixed + used
+        self.compacted += 1
+        return messages, self._record(before, after, split)
+
+    def _record(self, before: int, after: int, folded: int) -> dict:
+        self.tokens_in += before
+        self.tokens_out += after
+        return {
+            'tokens_before': before,
+            'tokens_after': after,
+            'tokens_saved': before - after,
+            'folded_messages': folded,
+        }
+
+    def _summary(self, folded: List[Dict[str, str]]) -> str:
+        chain = []
+        digest = b""
+        for message in folded:
+            digest = hashlib.sha1(digest + message["role"].encode() + b"\0" + message["content"].encode()).digest()
+            chain.append(digest.hex())
+
+        with self._lock:
+            # Longest folded prefix we already summarised (usually the previous turn's)
+            start, lines = 0, []
+            for i in range(len(chain), 0, -1):
+                cached = self._summaries.get(chain[i - 1])
+                if cached is not None:
+                    self._summaries.move_to_end(chain[i - 1])
+                    start, lines = i, list(cached)
+                    break
+
+        if start == len(chain):
+            self.summary_hits += 1
+        else:
+            if start:
+                self.summary_extends += 1
+            else:
+                self.summary_builds += 1
+            lines.extend(self._extract(message) for message in folded[start:])
+            # Rolling: drop the oldest lines until the summary fits its budget
+            while len(lines) > 1 and self._summary_tokens(lines) > self.summary_max_tokens:
+                lines.pop(0)
+            with self._lock:
+                self._summaries[chain[-1]] = lines
+                while len(self._summaries) > self.cache_size:
+                    self._summaries.popitem(last=False)
+        return "Summary of the earlier conversation:\n" + "\n".join(lines)
+
+    def _extract(self, message: Dict[str, str]) -> str:
+        # First sentence of the message, cut to words_per_message words
+        text = _SENTENCE_END.split(message["content"].strip(), 1)[0]
+        words = text.split()
+        if len(words) > self.words_per_message:
+            text = " ".join(words[:self.words_per_message]) + " ..."
+        speaker = "User" if message["role"] == "user" else "Assistant"
+        return f"- {speaker}: {text}"
+
+    def _summary_tokens(self, lines: List[str]) -> int:
+        return self.count_tokens("\n".join(lines))
+
+    def stats(self) -> dict:
+        return {
+            'token_budget': self.token_budget,
+            'tokenizer': 'tiktoken' if self.count_tokens is not estimate_tokens else 'estimate',
+            'requests': self.requests,
+            'compacted': self.compacted,
+            'tokens_in': self.tokens_in,
+            'tokens_out': self.tokens_out,
+            'tokens_saved': self.tokens_in - self.tokens_out,
+            'summary_cache': {
+                'entries': len(self._summaries),
+                'hits': self.summary_hits,
+                'extends': self.summary_extends,
+                'builds': self.summary_builds,
+            },
+        }
+
+
+def create_history_compactor(model: str) -> HistoryCompactor:
+    """Build the compactor configured by the CHAT_HISTORY_* / CHAT_SUMMARY_* settings."""
+    return HistoryCompactor(
+        get_token_counter(model),
+        token_budget=CHAT_HISTORY_TOKEN_BUDGET,
+        summary_max_tokens=CHAT_SUMMARY_MAX_TOKENS,
+        words_per_message=CHAT_SUMMARY_WORDS_PER_MESSAGE,
+        cache_size=CHAT_SUMMARY_CACHE_SIZE,
+    )
@@ -0,0 +1,401 @@
+# backend/services/chat_provider.py - Async chat completion providers with concurrency limits, retries and coalescing
+
+import asyncio
+import logging
+import os
+import random
+import time
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import anyio
+
+from services.metrics import provider_request_seconds, record_usage
+
+logger = logging.getLogger(__name__)
+
+# "openai" (AsyncOpenAI) or "fake" (canned local replies for offline development and load tests)
+CHAT_PROVIDER = os.getenv("CHAT_PROVIDER", "openai").strip().lower()
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "8"))  # Upstream calls in flight per worker
+CHAT_QUEUE_TIMEOUT = float(os.getenv("CHAT_QUEUE_TIMEOUT", "10"))  # Seconds to wait for a free slot before 503
+CHAT_REQUEST_TIMEOUT = float(os.getenv("CHAT_REQUEST_TIMEOUT", "30"))  # Seconds per upstream attempt
+CHAT_MAX_RETRIES = int(os.getenv("CHAT_MAX_RETRIES", "2"))  # Extra attempts after a 429/5xx/timeout
+CHAT_RETRY_BASE_DELAY = float(os.getenv("CHAT_RETRY_BASE_DELAY", "0.5"))  # Backoff before the first retry
+CHAT_RETRY_MAX_DELAY = float(os.getenv("CHAT_RETRY_MAX_DELAY", "8"))  # Backoff ceiling
+CHAT_FAKE_LATENCY_MS = float(os.getenv("CHAT_FAKE_LATENCY_MS", "200"))  # Simulated round trip for CHAT_PROVIDER=fake
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")  # Default to gpt-3.5-turbo for cost efficiency
+
+# Try to import OpenAI, handle gracefully if not installed
+try:
+    import openai
+    from openai import AsyncOpenAI
+    OPENAI_AVAILABLE = True
+except ImportError:
+    OPENAI_AVAILABLE = False
+    print("Warning: OpenAI library not installed. Install with: pip install openai")
+
+
+class ChatProviderError(Exception):
+    """An upstream failure. retryable is True for rate limits, 5xx responses, timeouts and connection errors."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None,
+                 retryable: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class ChatBusyError(Exception):
+    """Every provider slot stayed busy for the whole queue timeout."""
+
+
+class ChatProvider(ABC):
+    """
+    Base class for async chat completion providers.
+
+    At most max_concurrency upstream calls run at once per process; callers
+    wait up to queue_timeout for a slot and then get ChatBusyError. Each
+    attempt is bounded by timeout, and retryable failures (429, 5xx,
+    timeouts) are retried up to max_retries times with full-jitter
+    exponential backoff, honouring Retry-After when the provider sends one.
+    The slot is released while backing off.
+
+    Subclasses implement _complete() and _open_stream().
+    """
+
+    name = "base"
+
+    def __init__(self, model: str, max_concurrency: int = 8, queue_timeout: float = 10,
+                 timeout: float = 30, max_retries: int = 2,
+                 retry_base_delay: float = 0.5, retry_max_delay: float = 8):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight = 0
+
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.busy_rejections = 0
+
+    def configured(self) -> Optional[str]:
+        """None when ready, otherwise why the provider cannot be used."""
+        return None
+
+    # ---------- Public API ----------
+
+    async def complete(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> dict:
+        """
+        One chat completion.
+
+        Returns:
+            {'content': str, 'usage': {...} or None}
+
+        Raises:
+            ChatBusyError: No slot became free within queue_timeout
+            ChatProviderError: The upstream call failed (after retries, if retryable)
+        """
+        attempt = 0
+        while True:
+            await self._acquire()
+            started = time.perf_counter()
+            outcome = 'error'
+            try:
+                self.calls += 1
+                result = await asyncio.wait_for(self._complete(messages, temperature, max_tokens), self.timeout)
+                outcome = 'ok'
+                record_usage(self.name, result.get('usage'))
+                return result
+            except asyncio.TimeoutError:
+                outcome = 'timeout'
+                error = ChatProviderError(f"Upstream timed out after {self.timeout:g}s", retryable=True)
+            except ChatProviderError as e:
+                error = e
+            finally:
+                self._release()
+                provider_request_seconds.observe((self.name, 'complete', outcome), time.perf_counter() - started)
+            attempt = await self._backoff(error, attempt)
+
+    async def stream(self, messages: List[Dict[str, str]], temperature: float,
+                     max_tokens: int) -> AsyncIterator[Tuple[str, object]]:
+        """
+        Stream one chat completion, yielding ('token', str) for each text delta and
+        ('usage', {...}) if the provider reports usage. The slot is held until the
+        stream finishes or is closed. Opening the stream is retried like complete();
+        once tokens have been sent a failure is raised as-is.
+        """
+        attempt = 0
+        while True:
+            await self._acquire()
+            started = time.perf_counter()
+            outcome = 'error'
+            try:
+                self.calls += 1
+                upstream = await asyncio.wait_for(self._open_stream(messages, temperature, max_tokens), self.timeout)
+                outcome = 'ok'
+                break
+            except asyncio.TimeoutError:
+                outcome = 'timeout'
+                error = ChatProviderError(f"Upstream timed out after {self.timeout:g}s", retryable=True)
+            except ChatProviderError as e:
+                error = e
+            except BaseException:
+                self._release()
+                raise
+            finally:
+                provider_request_seconds.observe((self.name, 'stream', outcome), time.perf_counter() - started)
+            self._release()
+            attempt = await self._backoff(error, attempt)
+
+        try:
+            async for event in upstream:
+                if event[0] == 'usage':
+                    record_usage(self.name, event[1])
+                yield event
+        finally:
+            self._release()
+            # Closing the HTTP response stops generation upstream; shielded so it
+            # still runs when the consumer is being cancelled (client disconnect)
+            with anyio.CancelScope(shield=True):
+                await upstream.aclose()
+
+    def stats(self) -> dict:
+        return {
+            'provider': self.name,
+            'model': self.model,
+            'max_concurrency': self.max_concurrency,
+            'in_flight': self._in_flight,
+            'calls': self.calls,
+            'retries': self.retries,
+            'failures': self.failures,
+            'busy_rejections': self.busy_rejections,
+        }
+
+    # ---------- Internals ----------
+
+    async def _acquire(self):
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.busy_rejections += 1
+            raise ChatBusyError("Chat assistant is busy, please retry shortly")
+        self._in_flight += 1
+
+    def _release(self):
+        # Synchronous so it also runs from finally blocks during cancellation
+        self._in_flight -= 1
+        self._semaphore.release()
+
+    async def _backoff(self, error: ChatProviderError, attempt: int) -> int:
+        """Sleep before the next attempt, or raise error if it should not be retried."""
+        if not error.retryable or attempt >= self.max_retries:
+            self.failures += 1
+            raise error
+        delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+        if error.retry_after is not None:
+            delay = min(self.retry_max_delay, error.retry_after) + delay / 2
+        logger.warning("Chat provider error (%s), retrying in %.2fs", error, delay)
+        self.retries += 1
+        await asyncio.sleep(delay)
+        return attempt + 1
+
+    @abstractmethod
+    async def _complete(self, messages, temperature, max_tokens) -> dict:
+        ...
+
+    @abstractmethod
+    async def _open_stream(self, messages, temperature, max_tokens) -> AsyncIterator[Tuple[str, object]]:
+        """Start a streaming completion; returns an async generator of events once the upstream accepted it."""
+
+
+class OpenAIChatProvider(ChatProvider):
+    """OpenAI chat completions through AsyncOpenAI (the SDK's own retries are disabled in favour of ours)."""
+
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str], model: str, **kwargs):
+        super().__init__(model, **kwargs)
+        self.client = None
+        if OPENAI_AVAILABLE and api_key:
+            self.client = AsyncOpenAI(api_key=api_key, timeout=self.timeout, max_retries=0)
+
+    def configured(self):
+        if not OPENAI_AVAILABLE:
+            return "OpenAI library not available. Please install it with: pip install openai"
+        if not self.client:
+            return "OpenAI API key not configured. Please set OPENAI_API_KEY in your .env file"
+        return None
+
+    async def _complete(self, messages, temperature, max_tokens):
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+            )
+        except openai.OpenAIError as e:
+            raise _provider_error(e) from e
+        return {'content': response.choices[0].message.content, 'usage': _usage(response.usage)}
+
+    async def _open_stream(self, messages, temperature, max_tokens):
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                stream_options={"include_usage": True},  # Final chunk carries token usage
+            )
+        except openai.OpenAIError as e:
+            raise _provider_error(e) from e
+        return self._events(response)
+
+    @staticmethod
+    async def _events(response):
+        try:
+            async for chunk in response:
+                if chunk.usage:
+                    yield 'usage', _usage(chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield 'token', chunk.choices[0].delta.content
+        except openai.OpenAIError as e:
+            raise _provider_error(e) from e
+        finally:
+            await response.close()
+
+
+def _usage(usage) -> Optional[dict]:
+    if not usage:
+        return None
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens,
+    }
+
+
+def _provider_error(error: Exception) -> ChatProviderError:
+    """Classify an OpenAI SDK exception as retryable or not."""
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return ChatProviderError(str(error), retryable=True)
+    if isinstance(error, openai.APIStatusError):
+        status = error.status_code
+        retry_after = None
+        try:
+            retry_after = float(error.response.headers.get('retry-after'))
+        except (TypeError, ValueError):
+            pass
+        return ChatProviderError(str(error), status_code=status,
+                                 retryable=status == 429 or status >= 500, retry_after=retry_after)
+    return ChatProviderError(str(error))
+
+
+class FakeChatProvider(ChatProvider):
+    """
+    Local stand-in that answers every message with a canned reply after a fixed
+    delay. Use fail_next() to make upcoming calls fail with a given status.
+    """
+
+    name = "fake"
+
+    def __init__(self, model: str = "fake", latency_ms: float = 200, **kwargs):
+        super().__init__(model, **kwargs)
+        self.latency = latency_ms / 1000
+        self.upstream_calls = 0
+        self._failures: List[int] = []
+
+    def fail_next(self, count: int = 1, status_code: int = 503):
+        """Make the next count upstream calls fail with status_code."""
+        self._failures.extend([status_code] * count)
+
+    @staticmethod
+    def reply_for(messages: List[Dict[str, str]]) -> str:
+        return f"(fake) You asked: {messages[-1]['content']}. Please consult your veterinarian for specific advice."
+
+    def _start(self):
+        self.upstream_calls += 1
+        if self._failures:
+            status = self._failures.pop(0)
+            raise ChatProviderError(f"Fake provider error {status}", status_code=status,
+                                    retryable=status == 429 or status >= 500)
+
+    async def _complete(self, messages, temperature, max_tokens):
+        self._start()
+        await asyncio.sleep(self.latency)
+        content = self.reply_for(messages)
+        return {'content': content, 'usage': None}
+
+    async def _open_stream(self, messages, temperature, max_tokens):
+        self._start()
+        return self._events(messages)
+
+    async def _events(self, messages):
+        words = self.reply_for(messages).split(' ')
+        for i, word in enumerate(words):
+            await asyncio.sleep(self.latency / len(words))
+            yield 'token', word if i == 0 else ' ' + word
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls: while a call for a key is running,
+    later callers with the same key await its result instead of starting
+    their own. The shared call is shielded, so one caller going away does
+    not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        """
+        Returns:
+            (result, shared) - shared is True when another caller's call was reused
+        """
+        call = self._calls.get(key)
+        if call is not None:
+            self.coalesced += 1
+            return await asyncio.shield(call), True
+        call = asyncio.ensure_future(fn())
+        self._calls[key] = call
+        self.leaders += 1
+        call.add_done_callback(lambda f: self._done(key, f))
+        return await asyncio.shield(call), False
+
+    def _done(self, key: str, call: asyncio.Future):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.cancelled():
+            call.exception()  # Mark as retrieved when every caller has gone away
+
+    def stats(self) -> dict:
+        return {'in_flight': len(self._calls), 'leaders': self.leaders, 'coalesced': self.coalesced}
+
+
+def create_chat_provider(provider: str = CHAT_PROVIDER) -> ChatProvider:
+    """Build the provider selected by CHAT_PROVIDER."""
+    limits = dict(
+        max_concurrency=CHAT_MAX_CONCURRENCY,
+        queue_timeout=CHAT_QUEUE_TIMEOUT,
+        timeout=CHAT_REQUEST_TIMEOUT,
+        max_retries=CHAT_MAX_RETRIES,
+        retry_base_delay=CHAT_RETRY_BASE_DELAY,
+        retry_max_delay=CHAT_RETRY_MAX_DELAY,
+    )
+    if provider == "openai":
+        return OpenAIChatProvider(OPENAI_API_KEY, OPENAI_MODEL, **limits)
+    if provider == "fake":
+        return FakeChatProvider(latency_ms=CHAT_FAKE_LATENCY_MS, **limits)
+    raise ValueError(f"Unknown CHAT_PROVIDER '{provider}'. Use 'openai' or 'fake'.")
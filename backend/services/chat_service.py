@@ -3,107 +3,301 @@ Chat service for AI chatbot integration.
 Supports OpenAI GPT models by default, can be extended for other providers.
 """
 
-import os
-from typing import List, Dict, Optional
+import time
+from typing import Any, Callable, List, Dict, AsyncIterator, Optional, Tuple
 from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
 
 # Load environment variables
 load_dotenv()
 
-# Try to import OpenAI, handle gracefully if not installed
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-    print("Warning: OpenAI library not installed. Install with: pip install openai")
+from services.chat_cache import cache_key, create_chat_cache
+from services.chat_history import create_history_compactor
+from services.chat_sessions import create_session_store
+from services.chat_provider import ChatBusyError, ChatProviderError, SingleFlight, create_chat_provider
 
-# Get API key from environment
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")  # Default to gpt-3.5-turbo for cost efficiency
+# Async upstream client (CHAT_PROVIDER selects openai/fake); limits concurrency and retries 429/5xx
+provider = create_chat_provider()
 
-# Initialize OpenAI client if available
-client = None
-if OPENAI_AVAILABLE and OPENAI_API_KEY:
-    client = OpenAI(api_key=OPENAI_API_KEY)
+# Identical questions asked concurrently share one upstream call
+inflight = SingleFlight()
 
+# Keeps long conversations within CHAT_HISTORY_TOKEN_BUDGET by summarising older turns
+history_compactor = create_history_compactor(provider.model)
 
-def get_chat_response(
+# Conversations kept server-side (CHAT_SESSION_BACKEND selects memory/sqlite) so clients send only the new message
+sessions = create_session_store()
+
+
+# Default system prompt for dog nutrition assistant
+DEFAULT_SYSTEM_PROMPT = """You are a helpful assistant for WhiskerWorthy, a dog nutrition and diet recommendation app. 
+    You help users with questions about:
+    - Dog breeds and their nutritional needs
+    - Dog food recommendations
+    - Feeding guidelines
+    - Diet-related health concerns for dogs
+    - General dog nutrition advice
+    
+    Be friendly, informative, and professional. Always emphasize consulting with a veterinarian for serious health concerns.
+    If you don't know something, it's okay to say so and suggest consulting a vet."""
+
+CHAT_TEMPERATURE = 0.7  # Controls randomness: 0 = deterministic, 1 = creative
+CHAT_MAX_TOKENS = 500   # Limit response length
+
+# Cache of answers to repeated questions (CHAT_CACHE_BACKEND selects memory/sqlite/off)
+chat_cache = create_chat_cache()
+
+
+def response_cache_key(messages: List[Dict[str, str]]) -> str:
+    """Cache key for a built messages list (system prompt, history, new user message)."""
+    return cache_key(provider.model, messages[0]["content"], messages[1:-1], messages[-1]["content"], CHAT_TEMPERATURE)
+
+
+async def call_store(store, method: Callable[..., Any], *args) -> Any:
+    """Call a cache or session store method, on the threadpool when the backend does blocking I/O."""
+    if store.blocking:
+        return await run_in_threadpool(method, *args)
+    return method(*args)
+
+
+def check_chat_available():
+    """
+    Raises:
+        ValueError: If the chat provider is not configured or available
+    """
+    problem = provider.configured()
+    if problem:
+        raise ValueError(problem)
+
+
+def build_messages(
     user_message: str,
     conversation_history: Optional[List[Dict[str, str]]] = None,
     system_prompt: Optional[str] = None
+) -> Tuple[List[Dict[str, str]], dict]:
+    """
+    Assemble the system prompt, prior turns and the new user message for the API.
+    
+    Returns:
+        (messages, history_usage) - turns beyond the token budget are folded into a
+        summary; history_usage reports tokens before/after and tokens saved
+    """
+    system_message = system_prompt if system_prompt else DEFAULT_SYSTEM_PROMPT
+    return history_compactor.compact(
+        {"role": "system", "content": system_message},
+        conversation_history or [],
+        {"role": "user", "content": user_message},
+    )
+
+
+async def resume_session(
+    session_id: Optional[str],
+    conversation_history: Optional[List[Dict[str, str]]] = None
+) -> Tuple[str, List[Dict[str, str]], bool]:
+    """
+    Look up a chat session's stored history.
+    
+    Args:
+        session_id: Session from an earlier response, or None to start one
+        conversation_history: Client-sent history, used only to seed a new session
+    
+    Returns:
+        (session_id, history, session_reset) - a new session_id when the given one is
+        unknown or expired (another worker's memory store, a restart, the TTL), in which
+        case session_reset is True and the history is the client-sent seed
+    """
+    if session_id:
+        history = await call_store(sessions, sessions.get, session_id)
+        if history is not None:
+            return session_id, history, False
+    history = conversation_history or []
+    return await call_store(sessions, sessions.create, history), history, bool(session_id)
+
+
+def exchange(user_message: str, reply: str) -> List[Dict[str, str]]:
+    """The two messages one completed turn adds to a session."""
+    return [{"role": "user", "content": user_message}, {"role": "assistant", "content": reply}]
+
+
+async def get_chat_response(
+    user_message: str,
+    conversation_history: Optional[List[Dict[str, str]]] = None,
+    system_prompt: Optional[str] = None,
+    session_id: Optional[str] = None
 ) -> Dict[str, str]:
     """
-    Get AI chat response from OpenAI.
+    Get AI chat response from the configured provider.
     
     Args:
         user_message: The user's message/input
-        conversation_history: List of previous messages in format [{"role": "user", "content": "..."}, ...]
+        conversation_history: List of previous messages in format [{"role": "user", "content": "..."}, ...];
+            ignored when session_id refers to a live session
         system_prompt: Optional system prompt to set AI behavior (defaults to dog nutrition assistant)
+        session_id: Chat session to continue; the exchange is appended to it
     
     Returns:
-        Dictionary with 'response' (AI's reply) and 'error' (if any)
+        Dictionary with 'response' (AI's reply), 'error' (if any), 'cached'
+        (True when the answer came from the response cache), 'coalesced'
+        (True when an identical in-flight request's answer was reused),
+        'history_tokens_saved' (prompt tokens removed by history compaction),
+        'session_id' (pass it with the next message instead of the history) and
+        'session_reset' (True when the given session_id was unknown and a new session was started)
     
     Raises:
-        ValueError: If OpenAI is not configured or available
+        ValueError: If the chat provider is not configured or available
+        ChatBusyError: If no provider slot became free in time
     """
-    if not OPENAI_AVAILABLE:
-        raise ValueError(
-            "OpenAI library not available. Please install it with: pip install openai"
-        )
-    
-    if not client:
-        raise ValueError(
-            "OpenAI API key not configured. Please set OPENAI_API_KEY in your .env file"
-        )
-    
-    # Default system prompt for dog nutrition assistant
-    default_system_prompt = """You are a helpful assistant for WhiskerWorthy, a dog nutrition and diet recommendation app. 
-    You help users with questions about:
-    - Dog breeds and their nutritional needs
-    - Dog food recommendations
-    - Feeding guidelines
-    - Diet-related health concerns for dogs
-    - General dog nutrition advice
-    
-    Be friendly, informative, and professional. Always emphasize consulting with a veterinarian for serious health concerns.
-    If you don't know something, it's okay to say so and suggest consulting a vet."""
+    check_chat_available()
+    session_id, conversation_history, session_reset = await resume_session(session_id, conversation_history)
+    messages, history_usage = build_messages(user_message, conversation_history, system_prompt)
     
-    system_message = system_prompt if system_prompt else default_system_prompt
-    
-    # Build messages array
-    messages = [{"role": "system", "content": system_message}]
-    
-    # Add conversation history if provided
-    if conversation_history:
-        messages.extend(conversation_history)
+    # Repeated questions (same prompt, history and wording) are answered from the cache
+    key = response_cache_key(messages)
+    cached = await call_store(chat_cache, chat_cache.get, key)
+    if cached is not None:
+        await call_store(sessions, sessions.append, session_id, exchange(user_message, cached))
+        return {
+            "response": cached,
+            "error": None,
+            "cached": True,
+            "coalesced": False,
+            "history_tokens_saved": history_usage["tokens_saved"],
+            "session_id": session_id,
+            "session_reset": session_reset
+        }
     
-    # Add current user message
-    messages.append({"role": "user", "content": user_message})
+    async def fetch():
+        result = await provider.complete(messages, CHAT_TEMPERATURE, CHAT_MAX_TOKENS)
+        if result["content"]:
+            await call_store(chat_cache, chat_cache.set, key, result["content"])
+        return result["content"]
     
     try:
-        # Call OpenAI API
-        response = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=messages,
-            temperature=0.7,  # Controls randomness: 0 = deterministic, 1 = creative
-            max_tokens=500,   # Limit response length
-        )
-        
-        ai_response = response.choices[0].message.content
-        
+        ai_response, coalesced = await inflight.do(key, fetch)
+        if ai_response:
+            await call_store(sessions, sessions.append, session_id, exchange(user_message, ai_response))
         return {
             "response": ai_response,
-            "error": None
+            "error": None,
+            "cached": False,
+            "coalesced": coalesced,
+            "history_tokens_saved": history_usage["tokens_saved"],
+            "session_id": session_id,
+            "session_reset": session_reset
         }
     
-    except Exception as e:
+    except ChatProviderError as e:
         return {
             "response": None,
-            "error": f"Failed to get AI response: {str(e)}"
+            "error": f"Failed to get AI response: {str(e)}",
+            "cached": False,
+            "coalesced": False,
+            "history_tokens_saved": history_usage["tokens_saved"],
+            "session_id": session_id,
+            "session_reset": session_reset
+        }
+
+
+class ChatStream:
+    """
+    Async iterator over the events of one streaming chat completion.
+    
+    Yields ("token", {"content": "..."}) for each text delta, then exactly one of
+    ("done", {"usage": {...} or None, "latency_ms": ..., "first_token_ms": ..., "cached": bool,
+    "history_tokens_saved": ..., "session_id": "...", "session_reset": bool}) or
+    ("error", {"error": "..."}). A cached answer arrives as a single token.
+    
+    aclose() closes the upstream HTTP stream, which stops generation so abandoned
+    requests stop consuming tokens, and frees the provider slot.
+    """
+
+    def __init__(self, messages: List[Dict[str, str]], history_usage: dict, session_id: str,
+                 session_reset: bool = False):
+        self._messages = messages
+        self._history_usage = history_usage
+        self.session_id = session_id
+        self.session_reset = session_reset
+        self._events = self._generate()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Tuple[str, dict]:
+        return await self._events.__anext__()
+
+    async def aclose(self):
+        await self._events.aclose()
+
+    async def _generate(self) -> AsyncIterator[Tuple[str, dict]]:
+        started = time.monotonic()
+        key = response_cache_key(self._messages)
+        cached = await call_store(chat_cache, chat_cache.get, key)
+        if cached is not None:
+            yield "token", {"content": cached}
+            await call_store(sessions, sessions.append, self.session_id, exchange(self._messages[-1]["content"], cached))
+            elapsed = round((time.monotonic() - started) * 1000, 3)
+            yield "done", {"usage": None, "latency_ms": elapsed, "first_token_ms": elapsed, "cached": True,
+                           "history_tokens_saved": self._history_usage["tokens_saved"], "session_id": self.session_id,
+                           "session_reset": self.session_reset}
+            return
+
+        first_token_ms = None
+        usage = None
+        parts = []
+        upstream = provider.stream(self._messages, CHAT_TEMPERATURE, CHAT_MAX_TOKENS)
+        try:
+            async for kind, value in upstream:
+                if kind == "usage":
+                    usage = value
+                    continue
+                if first_token_ms is None:
+                    first_token_ms = round((time.monotonic() - started) * 1000, 1)
+                parts.append(value)
+                yield "token", {"content": value}
+        except (ChatProviderError, ChatBusyError) as e:
+            yield "error", {"error": f"Failed to get AI response: {str(e)}"}
+            return
+        finally:
+            await upstream.aclose()
+
+        if parts:
+            reply = "".join(parts)
+            await call_store(chat_cache, chat_cache.set, key, reply)
+            await call_store(sessions, sessions.append, self.session_id, exchange(self._messages[-1]["content"], reply))
+        yield "done", {
+            "usage": usage,
+            "latency_ms": round((time.monotonic() - started) * 1000, 1),
+            "first_token_ms": first_token_ms,
+            "cached": False,
+            "history_tokens_saved": self._history_usage["tokens_saved"],
+            "session_id": self.session_id,
+            "session_reset": self.session_reset,
         }
 
 
+async def stream_chat_response(
+    user_message: str,
+    conversation_history: Optional[List[Dict[str, str]]] = None,
+    system_prompt: Optional[str] = None,
+    session_id: Optional[str] = None
+) -> ChatStream:
+    """
+    Stream an AI chat response from the configured provider token by token.
+    
+    Args:
+        Same as get_chat_response
+    
+    Returns:
+        ChatStream async iterator of (event, data) pairs; call aclose() to abandon it
+    
+    Raises:
+        ValueError: If the chat provider is not configured or available
+    """
+    check_chat_available()
+    session_id, conversation_history, session_reset = await resume_session(session_id, conversation_history)
+    return ChatStream(*build_messages(user_message, conversation_history, system_prompt), session_id, session_reset)
+
+
 def format_conversation_history(
     messages: List[Dict[str, str]]
 ) -> List[Dict[str, str]]:
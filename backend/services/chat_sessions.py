@@ -0,0 +1,269 @@
+# backend/services/chat_sessions.py - Server-side chat sessions so clients only send the new message
+
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# "memory" (per process) or "sqlite" (shared by all workers on this host; required when running more than one worker)
+CHAT_SESSION_BACKEND = os.getenv("CHAT_SESSION_BACKEND", "memory").strip().lower()
+CHAT_SESSION_TTL_SECONDS = float(os.getenv("CHAT_SESSION_TTL_SECONDS", "7200"))  # Idle time before a session expires
+CHAT_SESSION_MAX_SESSIONS = int(os.getenv("CHAT_SESSION_MAX_SESSIONS", "10000"))  # Least recently used beyond this are evicted
+CHAT_SESSION_MAX_BYTES = int(os.getenv("CHAT_SESSION_MAX_BYTES", str(64 * 1024)))  # Per session; oldest messages dropped first
+CHAT_SESSION_PATH = os.getenv("CHAT_SESSION_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), ".chat_sessions.sqlite3"))
+
+
+def new_session_id() -> str:
+    return secrets.token_urlsafe(16)
+
+
+def _trim(messages: List[Dict[str, str]], max_bytes: int) -> Tuple[List[Dict[str, str]], int]:
+    """Drop the oldest messages until the transcript fits max_bytes; returns (messages, size)."""
+    sizes = [len(m["content"].encode()) for m in messages]
+    total = sum(sizes)
+    start = 0
+    while total > max_bytes and start < len(messages):
+        total -= sizes[start]
+        start += 1
+    return messages[start:], total
+
+
+class ChatSessionStore(ABC):
+    """
+    Interface for chat session stores. A session is the list of
+    {"role", "content"} messages exchanged so far. Sessions expire after
+    ttl_seconds without use, and the least recently used are evicted beyond
+    max_sessions. Implementations must be thread-safe: backends that set
+    blocking are called from the threadpool, the others on the event loop.
+    """
+
+    name = "base"
+    blocking = False  # True when get/create/append do file I/O and must stay off the event loop
+
+    def __init__(self, ttl_seconds: float, max_sessions: int, max_bytes: int):
+        self.ttl = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.created = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def create(self, messages: Optional[List[Dict[str, str]]] = None) -> str:
+        """Start a session, optionally seeded with earlier messages; returns its id."""
+        session_id = new_session_id()
+        self._save(session_id, list(messages or []))
+        self.created += 1
+        return session_id
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[List[Dict[str, str]]]:
+        """The session's messages, or None if it does not exist or has expired."""
+
+    @abstractmethod
+    def append(self, session_id: str, messages: List[Dict[str, str]]):
+        """Add messages to a session (recreating it if it expired in the meantime)."""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def _save(self, session_id: str, messages: List[Dict[str, str]]):
+        ...
+
+    @abstractmethod
+    def size(self) -> dict:
+        """{'sessions': ..., 'bytes': ...} currently stored."""
+
+    def stats(self) -> dict:
+        return {
+            'backend': self.name,
+            'created': self.created,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            **self.size(),
+        }
+
+
+class InMemoryChatSessionStore(ChatSessionStore):
+    """Per-process LRU of sessions; a session is only visible to the worker that created it."""
+
+    name = "memory"
+
+    def __init__(self, ttl_seconds: float, max_sessions: int, max_bytes: int):
+        super().__init__(ttl_seconds, max_sessions, max_bytes)
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()  # id -> (messages, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._lookup(session_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return list(entry[0])
+
+    def append(self, session_id, messages):
+        with self._lock:
+            entry = self._lookup(session_id)
+            self._store(session_id, (entry[0] if entry else []) + list(messages))
+
+    def delete(self, session_id):
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            if entry:
+                self._bytes -= entry[1]
+            return entry is not None
+
+    def _save(self, session_id, messages):
+        with self._lock:
+            self._store(session_id, messages)
+
+    def _lookup(self, session_id):
+        # Caller holds the lock; using a session extends its TTL
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        now = time.monotonic()
+        if entry[2] <= now:
+            del self._sessions[session_id]
+            self._bytes -= entry[1]
+            self.expirations += 1
+            return None
+        entry = (entry[0], entry[1], now + self.ttl)
+        self._sessions[session_id] = entry
+        self._sessions.move_to_end(session_id)
+        return entry
+
+    def _store(self, session_id, messages):
+        # Caller holds the lock
+        messages, size = _trim(messages, self.max_bytes)
+        old = self._sessions.pop(session_id, None)
+        if old:
+            self._bytes -= old[1]
+        self._sessions[session_id] = (messages, size, time.monotonic() + self.ttl)
+        self._bytes += size
+        while len(self._sessions) > self.max_sessions:
+            _, (_, evicted_size, _) = self._sessions.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def size(self):
+        with self._lock:
+            return {'sessions': len(self._sessions), 'bytes': self._bytes}
+
+
+class SqliteChatSessionStore(ChatSessionStore):
+    """
+    Sessions in a local SQLite file, so any uvicorn worker on the host can
+    continue a conversation. Counters are per process.
+    """
+
+    name = "sqlite"
+    blocking = True
+
+    def __init__(self, path: str, ttl_seconds: float, max_sessions: int, max_bytes: int):
+        super().__init__(ttl_seconds, max_sessions, max_bytes)
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_sessions ("
+            " id TEXT PRIMARY KEY, messages TEXT NOT NULL, size INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS chat_sessions_lru ON chat_sessions (last_access)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets readers in other workers proceed during writes
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id):
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute("SELECT messages, expires_at FROM chat_sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        if row[1] <= now:
+            conn.execute("DELETE FROM chat_sessions WHERE id = ?", (session_id,))
+            self.expirations += 1
+            self.misses += 1
+            return None
+        conn.execute("UPDATE chat_sessions SET last_access = ?, expires_at = ? WHERE id = ?",
+                     (now, now + self.ttl, session_id))
+        self.hits += 1
+        return json.loads(row[0])
+
+    def append(self, session_id, messages):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT messages FROM chat_sessions WHERE id = ? AND expires_at > ?",
+                               (session_id, now)).fetchone()
+            self._write(conn, session_id, (json.loads(row[0]) if row else []) + list(messages), now)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, session_id):
+        return self._conn().execute("DELETE FROM chat_sessions WHERE id = ?", (session_id,)).rowcount > 0
+
+    def _save(self, session_id, messages):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._write(conn, session_id, messages, time.time())
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _write(self, conn: sqlite3.Connection, session_id: str, messages: List[Dict[str, str]], now: float):
+        # Caller holds the write transaction
+        messages, size = _trim(messages, self.max_bytes)
+        conn.execute(
+            "INSERT OR REPLACE INTO chat_sessions (id, messages, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+            (session_id, json.dumps(messages), size, now + self.ttl, now)
+        )
+        self.expirations += conn.execute("DELETE FROM chat_sessions WHERE expires_at <= ?", (now,)).rowcount
+        excess = conn.execute("SELECT COUNT(*) FROM chat_sessions").fetchone()[0] - self.max_sessions
+        if excess > 0:
+            # Evict the least recently used sessions
+            self.evictions += conn.execute(
+                "DELETE FROM chat_sessions WHERE id IN (SELECT id FROM chat_sessions ORDER BY last_access LIMIT ?)",
+                (excess,)
+            ).rowcount
+
+    def size(self):
+        sessions, total = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM chat_sessions").fetchone()
+        return {'sessions': sessions, 'bytes': total}
+
+
+def create_session_store(backend: str = CHAT_SESSION_BACKEND) -> ChatSessionStore:
+    """Build the store selected by CHAT_SESSION_BACKEND."""
+    if backend == "memory":
+        return InMemoryChatSessionStore(CHAT_SESSION_TTL_SECONDS, CHAT_SESSION_MAX_SESSIONS, CHAT_SESSION_MAX_BYTES)
+    if backend == "sqlite":
+        return SqliteChatSessionStore(CHAT_SESSION_PATH, CHAT_SESSION_TTL_SECONDS,
+                                      CHAT_SESSION_MAX_SESSIONS, CHAT_SESSION_MAX_BYTES)
+    raise ValueError(f"Unknown CHAT_SESSION_BACKEND '{backend}'. Use 'memory' or 'sqlite'.")
@@ -0,0 +1,125 @@
+# backend/services/dogapi_sync.py - Reconciles DogAPI breeds into breeds_AKC_Rsrch_FoodV1
+
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from services.breed_search import normalize
+
+logger = logging.getLogger(__name__)
+
+DOGAPI_SYNC_INTERVAL_SECONDS = float(os.getenv("DOGAPI_SYNC_INTERVAL_SECONDS", "0"))  # 0 disables the background sync
+DOGAPI_SYNC_BATCH_SIZE = int(os.getenv("DOGAPI_SYNC_BATCH_SIZE", "100"))  # Breeds updated per transaction
+
+
+def match_breeds(catalog: List[dict], api_breeds: List[dict]) -> Tuple[List[tuple], List[str]]:
+    """
+    Pair DogAPI breeds with catalog rows.
+
+    A row that already has a dogapi_id keeps its DogAPI breed. Others are
+    matched by normalized name, then by their breed_otherNames aliases;
+    each DogAPI breed is assigned to at most one row.
+
+    Returns:
+        (matches, unmatched): (breed_name_AKC, dogapi_id, life_expectancy) tuples,
+        and the names of DogAPI breeds with no catalog row
+    """
+    api_by_id = {b['dogapi_id']: b for b in api_breeds if b.get('dogapi_id')}
+    api_by_name = {}
+    for breed in api_by_id.values():
+        api_by_name.setdefault(normalize(breed.get('name') or ''), breed)
+
+    assigned = {}  # dogapi_id -> breed_name_AKC
+    for row in catalog:
+        if row.get('dogapi_id') in api_by_id:
+            assigned.setdefault(row['dogapi_id'], row['breed_name_AKC'])
+    matched_rows = set(assigned.values())
+    # Official names first, so an alias never takes a breed another row is named after
+    for use_aliases in (False, True):
+        for row in catalog:
+            if row['breed_name_AKC'] in matched_rows:
+                continue
+            if use_aliases:
+                names = [a for a in (row.get('breed_otherNames') or '').split(';') if a.strip()]
+            else:
+                names = [row['breed_name_AKC']]
+            for name in names:
+                breed = api_by_name.get(normalize(name))
+                if breed and breed['dogapi_id'] not in assigned:
+                    assigned[breed['dogapi_id']] = row['breed_name_AKC']
+                    matched_rows.add(row['breed_name_AKC'])
+                    break
+
+    matches = [(name, dogapi_id, api_by_id[dogapi_id].get('life_expectancy')) for dogapi_id, name in assigned.items()]
+    unmatched = sorted(b.get('name') or b['dogapi_id'] for i, b in api_by_id.items() if i not in assigned)
+    return sorted(matches), unmatched
+
+
+class DogApiSync:
+    """
+    Fetches every DogAPI breed and writes dogapi_id (and a missing
+    breed_life_expect_yrs) onto the matching catalog rows in batches.
+    Researched values already in the table are never overwritten.
+    """
+
+    def __init__(self, list_breeds: Callable[[], Awaitable[List[dict]]],
+                 load_catalog: Callable[[], Awaitable[List[dict]]],
+                 apply_batch: Callable[[List[tuple]], Awaitable[List[str]]],
+                 batch_size: int = 100):
+        """
+        Args:
+            list_breeds: Coroutine returning DogAPI breeds (DogApiClient.list_breeds)
+            load_catalog: Coroutine returning the current breed rows
+            apply_batch: Coroutine writing (breed_name_AKC, dogapi_id, life_expectancy) tuples
+                in one transaction and returning the names of rows it changed
+        """
+        self._list_breeds = list_breeds
+        self._load_catalog = load_catalog
+        self._apply_batch = apply_batch
+        self.batch_size = batch_size
+        self.runs = 0
+        self.failures = 0
+        self.last_result: Optional[dict] = None
+        self.last_error: Optional[str] = None
+
+    async def run_once(self) -> dict:
+        """One reconciliation; returns {'fetched', 'matched', 'updated', 'unmatched', 'duration_ms'}."""
+        started = time.perf_counter()
+        self.runs += 1
+        try:
+            api_breeds = await self._list_breeds()
+            matches, unmatched = match_breeds(await self._load_catalog(), api_breeds)
+            updated = []
+            for i in range(0, len(matches), self.batch_size):
+                updated.extend(await self._apply_batch(matches[i:i + self.batch_size]))
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            raise
+        self.last_error = None
+        self.last_result = {
+            'fetched': len(api_breeds),
+            'matched': len(matches),
+            'updated': updated,
+            'unmatched': unmatched,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+        }
+        return self.last_result
+
+    def stats(self) -> dict:
+        return {'runs': self.runs, 'failures': self.failures, 'last_error': self.last_error, 'last_result': self.last_result}
+
+
+async def run_periodic_sync(sync: DogApiSync, interval_seconds: float,
+                            on_updated: Optional[Callable[[], Awaitable[None]]] = None):
+    """Background task: reconcile every interval; on_updated runs after a sync that changed rows."""
+    while True:
+        try:
+            result = await sync.run_once()
+            if result['updated'] and on_updated is not None:
+                await on_updated()
+        except Exception as e:
+            logger.warning("DogAPI sync failed: %s", e)
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,291 @@
+# backend/services/metrics.py - In-process metrics exposed at GET /metrics in Prometheus text format
+
+import bisect
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+
+# Upper bounds in seconds; covers cache hits (sub-ms) up to slow chat completions
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4"  # Response adds "; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric(ABC):
+    """A named metric family; samples are keyed by a tuple of label values in label_names order."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.enabled = METRICS_ENABLED  # When off, recording is a no-op
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.type}"]
+
+    @abstractmethod
+    def render(self) -> List[str]:
+        """Exposition lines for this family: the header, then one line per sample."""
+
+
+class Counter(_Metric):
+    """Monotonic count; the exposed name should end in _total."""
+
+    type = "counter"
+
+    def __init__(self, name, documentation, label_names=()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}" for k, v in values]
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values (seconds) in fixed buckets. observe() is
+    one bisect and a few additions under a lock, cheap enough for every request.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[tuple, list] = {}  # labels -> [per-bucket counts (+Inf last), sum]
+
+    def observe(self, labels: tuple, value: float):
+        if not self.enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)  # First bound >= value, as "le" is inclusive
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def time(self, labels: tuple = ()) -> "_Timer":
+        """Context manager observing the elapsed wall time of its block."""
+        return _Timer(self, labels)
+
+    def render(self):
+        with self._lock:
+            values = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+        lines = self.header()
+        bounds = [_format_value(b) for b in self.buckets] + ["+Inf"]
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            label_text = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(self.labels, time.perf_counter() - self.started)
+
+
+class _StatsCollector:
+    """
+    Exposes selected numeric fields of a component's existing stats() dict,
+    read at scrape time so the component itself does no extra work.
+    """
+
+    def __init__(self, prefix: str, documentation: str, stats: Callable[[], Optional[dict]],
+                 counters: Iterable[str], gauges: Iterable[str]):
+        self.prefix = prefix
+        self.documentation = documentation
+        self.stats = stats
+        self.counters = tuple(counters)
+        self.gauges = tuple(gauges)
+
+    def render(self) -> List[str]:
+        try:
+            stats = self.stats()
+        except Exception:
+            return []  # A component that cannot report (e.g. pool not created yet) is left out of the scrape
+        if not stats:
+            return []
+        lines = []
+        for fields, kind, suffix in ((self.counters, "counter", "_total"), (self.gauges, "gauge", "")):
+            for field in fields:
+                value = stats
+                for part in field.split("."):  # "summary_cache.hits" reads a nested dict
+                    value = value.get(part) if isinstance(value, dict) else None
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{self.prefix}_{field.replace('.', '_')}{suffix}"
+                lines.append(f"# HELP {name} {self.documentation}: {field}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """All metric families and stats collectors of this process, rendered together by render()."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[_StatsCollector] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def add_stats(self, prefix: str, documentation: str, stats: Callable[[], Optional[dict]],
+                  counters: Iterable[str] = (), gauges: Iterable[str] = ()):
+        """Export stats()[field] as {prefix}_{field}_total (counters) or {prefix}_{field} (gauges)."""
+        with self._lock:
+            self._collectors.append(_StatsCollector(prefix, documentation, stats, counters, gauges))
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics, collectors = list(self._metrics), list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector in collectors:
+            lines.extend(collector.render())
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry; with several uvicorn workers each worker is scraped (or reports) separately
+registry = MetricsRegistry()
+
+# Shared metric families, recorded from the modules that own the timed code
+http_request_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response completed", ("method", "route", "status"))
+db_checkout_seconds = registry.histogram(
+    "db_pool_checkout_seconds", "Time spent waiting for a pooled database connection", ("backend",))
+db_connect_seconds = registry.histogram(
+    "db_connect_seconds", "Time to open a new database connection (TLS + auth)", ("backend",))
+db_query_seconds = registry.histogram(
+    "db_query_duration_seconds",
+    "Server round trip per SQL statement (statement: PREPARED_STATEMENTS name, else query-log fingerprint)",
+    ("statement", "outcome"))
+db_helper_seconds = registry.histogram(
+    "db_helper_duration_seconds", "Database helper call (one or more statements), including connection checkout",
+    ("helper", "outcome"))
+provider_request_seconds = registry.histogram(
+    "chat_provider_request_seconds",
+    "Chat provider round trip per attempt (call=complete: whole reply; call=stream: until the stream opened)",
+    ("provider", "call", "outcome"))
+provider_tokens = registry.counter(
+    "chat_provider_tokens_total", "Tokens reported by the chat provider", ("provider", "type"))
+
+
+def record_usage(provider: str, usage: Optional[dict]):
+    """Count prompt/completion tokens from a provider usage dict (None when the provider does not report it)."""
+    if not usage:
+        return
+    for kind in ("prompt", "completion"):
+        tokens = usage.get(f"{kind}_tokens")
+        if tokens:
+            provider_tokens.inc((provider, kind), tokens)
+
+
+class RequestMetricsMiddleware:
+    """
+    Pure ASGI middleware recording http_request_duration_seconds by method,
+    route template (not the raw path, so /api/breed/{search_field}/{search_value}
+    stays one series) and response status. Requests that match no route are
+    labelled route="unmatched".
+    """
+
+    def __init__(self, app, histogram: Histogram = http_request_seconds):
+        self.app = app
+        self.histogram = histogram
+        self._routes: Dict[object, str] = {}  # endpoint function -> path template
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500  # Reported if the app raises before starting a response
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.histogram.observe((scope["method"], self._route(scope), str(status)), time.perf_counter() - started)
+
+    def _route(self, scope) -> str:
+        # The router stores the matched endpoint in the (shared) scope; map it back to its path template
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        route = self._routes.get(endpoint)
+        if route is None:
+            app = scope.get("app")
+            for candidate in getattr(app, "routes", ()):
+                if getattr(candidate, "endpoint", None) is endpoint:
+                    route = candidate.path
+                    break
+            else:
+                route = getattr(endpoint, "__name__", "unknown")
+            self._routes[endpoint] = route
+        return route
@@ -0,0 +1,430 @@
+# backend/services/migrations.py - Versioned schema migrations and the startup index check
+#
+# Migrations are the numbered .sql files in backend/migrations/, applied in order and
+# recorded in schema_migrations. Apply them with: cd backend && python -m jobs.migrate
+
+import hashlib
+import logging
+import os
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import psycopg2
+from psycopg2 import sql as pgsql
+
+import database
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+MIGRATIONS_CHECK_ON_STARTUP = os.getenv("MIGRATIONS_CHECK_ON_STARTUP", "true").strip().lower() in ("1", "true", "yes")
+MIGRATIONS_LOCK_TIMEOUT_MS = int(os.getenv("MIGRATIONS_LOCK_TIMEOUT_MS", "5000"))  # Give up rather than queue traffic behind DDL
+MIGRATIONS_SEQSCAN_MIN_ROWS = int(os.getenv("MIGRATIONS_SEQSCAN_MIN_ROWS", "1000"))  # Smaller tables are fine to scan
+MIGRATIONS_CONNECT_TIMEOUT = int(os.getenv("MIGRATIONS_CONNECT_TIMEOUT", "5"))
+
+# Session advisory lock held while migrating, so two runners never interleave
+MIGRATIONS_LOCK_KEY = 0x646F67  # "dog"
+
+_FILE_NAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+_CONCURRENTLY = re.compile(r"\bCONCURRENTLY\b", re.IGNORECASE)
+_CREATE_INDEX_CONCURRENTLY = re.compile(
+    r"^\s*CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE
+)
+_DOLLAR_TAG = re.compile(r"\$(?:[A-Za-z_]\w*)?\$")
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+
+SCHEMA_MIGRATIONS_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        checksum TEXT NOT NULL,
+        applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        duration_ms INTEGER
+    )
+"""
+
+# Indexes the queries in database.py and models/database.py rely on:
+# (table, access method, leading key as pg_get_indexdef prints it, what needs it)
+EXPECTED_INDEXES = (
+    ('breeds_AKC_Rsrch_FoodV1', 'btree', 'breed_name_akc', "breed reads, updates and deletes by name"),
+    ('breeds_AKC_Rsrch_FoodV1', 'btree', 'breed_name_akc COLLATE "C"', "GET /api/breeds keyset pages"),
+    ('breeds_AKC_Rsrch_FoodV1', 'btree', 'dogapi_id', "breed lookups by dogapi_id and the DogAPI sync"),
+    ('questions_dog_initial3', 'btree', 'modified_prereg', "questionnaire export and analytics rollups"),
+    ('questions_dog_initial3', 'gin', 'statuses_dietrelat_prereg', "questionnaire status filters"),
+)
+
+
+class MigrationError(Exception):
+    """Raised when a migration statement fails; earlier migrations stay applied."""
+
+
+class Migration:
+    """One numbered .sql file from the migrations directory."""
+
+    def __init__(self, path: str):
+        match = _FILE_NAME.match(os.path.basename(path))
+        if not match:
+            raise ValueError(f"Migration file names must look like 001_name.sql: {path}")
+        self.version = int(match.group(1))
+        self.name = match.group(2)
+        self.path = path
+        with open(path, encoding="utf-8") as f:
+            self.sql = f.read()
+        self.checksum = hashlib.sha256(self.sql.encode()).hexdigest()
+        self.statements = split_statements(self.sql)
+        # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block, so such files
+        # run one autocommitted statement at a time and must be safe to rerun after a failure
+        self.transactional = not any(_CONCURRENTLY.search(s) for s in self.statements)
+
+    def __repr__(self):
+        return f"Migration({self.version:03d}_{self.name})"
+
+
+def split_statements(text: str) -> List[str]:
+    """
+    Split a SQL script into statements on top-level semicolons, skipping
+    those inside quotes, comments and $$-quoted function bodies.
+    Comment-only fragments are dropped.
+    """
+    statements = []
+    start = i = 0
+    length = len(text)
+    while i < length:
+        char = text[i]
+        if char == '-' and text.startswith('--', i):
+            end = text.find('\n', i)
+            i = length if end < 0 else end + 1
+        elif char == '/' and text.startswith('/*', i):
+            end = text.find('*/', i + 2)
+            i = length if end < 0 else end + 2
+        elif char in ("'", '"'):
+            end = i + 1
+            while end < length:
+                if text[end] == char:
+                    if end + 1 < length and text[end + 1] == char:  # Doubled quote
+                        end += 2
+                        continue
+                    break
+                end += 1
+            i = end + 1
+        elif char == '$' and _DOLLAR_TAG.match(text, i):
+            tag = _DOLLAR_TAG.match(text, i).group(0)
+            end = text.find(tag, i + len(tag))
+            i = length if end < 0 else end + len(tag)
+        elif char == ';':
+            statements.append(text[start:i])
+            i += 1
+            start = i
+        else:
+            i += 1
+    statements.append(text[start:])
+    return [s.strip() for s in statements if _COMMENTS.sub("", s).strip()]
+
+
+def discover(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """Migrations in version order; two files with the same version is an error."""
+    migrations = [Migration(os.path.join(directory, name)) for name in sorted(os.listdir(directory))
+                  if _FILE_NAME.match(name)]
+    migrations.sort(key=lambda m: m.version)
+    for previous, current in zip(migrations, migrations[1:]):
+        if previous.version == current.version:
+            raise ValueError(f"Duplicate migration version {current.version}: {previous.path}, {current.path}")
+    return migrations
+
+
+def _connect(dsn: Optional[str] = None):
+    # A plain connection rather than the pool: DDL wants its own session settings, and
+    # the slow-query log should not count the runner's statements
+    dsn = dsn or database.DATABASE_URL
+    if not dsn:
+        raise ValueError("DATABASE_URL environment variable not set. Please add it to your .env file.")
+    try:
+        conn = psycopg2.connect(dsn, connect_timeout=MIGRATIONS_CONNECT_TIMEOUT)
+    except psycopg2.Error as e:
+        raise Exception(f"Failed to connect to database: {str(e)}")
+    conn.autocommit = True
+    return conn
+
+
+def _applied(cursor) -> Dict[int, dict]:
+    cursor.execute("SELECT to_regclass('schema_migrations') IS NOT NULL")
+    if not cursor.fetchone()[0]:
+        return {}
+    cursor.execute("SELECT version, name, checksum, applied_at, duration_ms FROM schema_migrations")
+    return {row[0]: {'name': row[1], 'checksum': row[2], 'applied_at': row[3], 'duration_ms': row[4]}
+            for row in cursor.fetchall()}
+
+
+def _status(migrations: List[Migration], applied: Dict[int, dict]) -> List[dict]:
+    rows = []
+    for migration in migrations:
+        record = applied.get(migration.version)
+        if record is None:
+            state = 'pending'
+        elif record['checksum'] != migration.checksum:
+            state = 'changed'  # Edited after it was applied; the edit has not run
+        else:
+            state = 'applied'
+        rows.append({
+            'version': migration.version,
+            'name': migration.name,
+            'state': state,
+            'transactional': migration.transactional,
+            'applied_at': record['applied_at'].isoformat() if record else None,
+            'duration_ms': record['duration_ms'] if record else None,
+        })
+    known = {m.version for m in migrations}
+    for version, record in sorted(applied.items()):
+        if version not in known:
+            rows.append({'version': version, 'name': record['name'], 'state': 'missing file', 'transactional': None,
+                         'applied_at': record['applied_at'].isoformat(), 'duration_ms': record['duration_ms']})
+    return rows
+
+
+def migration_status(dsn: Optional[str] = None, directory: str = MIGRATIONS_DIR) -> List[dict]:
+    """Every migration file and database record with its state: applied, pending, changed or missing file."""
+    migrations = discover(directory)
+    conn = _connect(dsn)
+    try:
+        return _status(migrations, _applied(conn.cursor()))
+    except psycopg2.Error as e:
+        raise Exception(f"Database error: {str(e)}")
+    finally:
+        conn.close()
+
+
+def _rebuild_if_invalid(cursor, statement: str):
+    # A failed or cancelled CREATE INDEX CONCURRENTLY leaves an INVALID index behind, which
+    # IF NOT EXISTS would then silently accept; drop it so the statement builds it again
+    match = _CREATE_INDEX_CONCURRENTLY.match(_COMMENTS.sub("", statement))
+    if not match:
+        return
+    name = match.group(1).lower()
+    cursor.execute("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)", (name,))
+    row = cursor.fetchone()
+    if row is not None and not row[0]:
+        logger.warning("Dropping invalid index %s left by an earlier failed build", name)
+        cursor.execute(pgsql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {}").format(pgsql.Identifier(name)))
+
+
+def _apply(conn, migration: Migration) -> int:
+    """Run one migration and record it; returns its duration in milliseconds."""
+    started = time.perf_counter()
+    statement = None
+    conn.autocommit = not migration.transactional
+    cursor = conn.cursor()
+    try:
+        if migration.transactional:
+            # All or nothing; lock_timeout makes DDL that would wait on a busy table fail fast
+            # instead of holding every query on that table in the lock queue behind it
+            cursor.execute("SET LOCAL lock_timeout = %s", (MIGRATIONS_LOCK_TIMEOUT_MS,))
+        for statement in migration.statements:
+            if not migration.transactional:
+                _rebuild_if_invalid(cursor, statement)
+                # Concurrent builds only take a lock that lets reads and writes through, and
+                # must wait out older transactions rather than fail half-built
+                timeout = 0 if _CONCURRENTLY.search(statement) else MIGRATIONS_LOCK_TIMEOUT_MS
+                cursor.execute("SET lock_timeout = %s", (timeout,))
+            cursor.execute(statement)
+        statement = None
+        duration_ms = round(1000 * (time.perf_counter() - started))
+        cursor.execute(
+            "INSERT INTO schema_migrations (version, name, checksum, duration_ms) VALUES (%s, %s, %s, %s) "
+            "ON CONFLICT (version) DO UPDATE SET name = EXCLUDED.name, checksum = EXCLUDED.checksum, "
+            "applied_at = CURRENT_TIMESTAMP, duration_ms = EXCLUDED.duration_ms",
+            (migration.version, migration.name, migration.checksum, duration_ms)
+        )
+        if migration.transactional:
+            conn.commit()
+        return duration_ms
+    except psycopg2.Error as e:
+        if migration.transactional:
+            conn.rollback()
+        failed = f" in statement: {statement[:200]}" if statement else ""
+        raise MigrationError(f"Migration {migration.version:03d}_{migration.name} failed{failed}: {str(e).strip()}")
+    finally:
+        cursor.close()
+        conn.autocommit = True
+
+
+def migrate(dsn: Optional[str] = None, target: Optional[int] = None, dry_run: bool = False,
+            directory: str = MIGRATIONS_DIR) -> List[dict]:
+    """
+    Apply pending migrations in version order, up to and including target.
+
+    Files without CONCURRENTLY statements run in one transaction together with
+    their schema_migrations row. Files with them run statement by statement in
+    autocommit mode (required by CREATE INDEX CONCURRENTLY), so every statement
+    in such a file must be idempotent: a failed run is fixed by rerunning.
+    A session advisory lock keeps concurrent runners from interleaving.
+
+    Args:
+        dsn: Database to migrate (default: DATABASE_URL)
+        target: Highest version to apply, or None for all
+        dry_run: Only report what would run
+
+    Returns:
+        [{'version', 'name', 'transactional', 'statements', 'duration_ms'}] for each migration run
+        (duration_ms is None on a dry run)
+
+    Raises:
+        MigrationError: A statement failed; migrations before it remain applied
+    """
+    migrations = [m for m in discover(directory) if target is None or m.version <= target]
+    conn = _connect(dsn)
+    results = []
+    try:
+        cursor = conn.cursor()
+        if not dry_run:
+            cursor.execute("SELECT pg_advisory_lock(%s)", (MIGRATIONS_LOCK_KEY,))
+            cursor.execute(SCHEMA_MIGRATIONS_SQL)
+        applied = _applied(cursor)  # Read under the lock, so a runner that just finished is seen
+        for row in _status(migrations, applied):
+            if row['state'] == 'changed':
+                logger.warning("Migration %03d_%s was edited after it was applied; the edit will not run",
+                               row['version'], row['name'])
+        for migration in migrations:
+            if migration.version in applied:
+                continue
+            result = {'version': migration.version, 'name': migration.name,
+                      'transactional': migration.transactional, 'statements': len(migration.statements),
+                      'duration_ms': None}
+            if not dry_run:
+                logger.info("Applying %03d_%s (%d statements%s)", migration.version, migration.name,
+                            len(migration.statements), "" if migration.transactional else ", autocommit")
+                result['duration_ms'] = _apply(conn, migration)
+            results.append(result)
+        if not dry_run:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATIONS_LOCK_KEY,))
+        cursor.close()
+    except psycopg2.Error as e:
+        raise Exception(f"Database error: {str(e)}")
+    finally:
+        conn.close()  # Also releases the advisory lock if a migration failed
+    return results
+
+
+# ==================== Schema Check ====================
+
+def _plan_checks() -> List[tuple]:
+    """(name, sql, params) for the hot queries that should never scan a large table."""
+    since = datetime.now() - timedelta(days=1)
+    status_sql, status_params = database.build_questionnaire_query(statuses_all=['pregnant', 'allergy'])
+
+    def prepared(name, *params):
+        statement = database.PREPARED_STATEMENTS[name]
+        return statement.pyformat_sql, statement.named_params(params)
+
+    return [
+        ("breed by name", *prepared('breed_by_name', 'Labrador Retriever')),
+        ("breed by dogapi_id", *prepared('breed_by_dogapi_id', 'dogapi-id')),
+        ("breed page", *prepared('breed_page_after', 'M', 51)),
+        ("questionnaire by status", status_sql, status_params),
+        ("questionnaire export since", "SELECT * FROM questions_dog_initial3 WHERE modified_preReg >= %s "
+                                       "ORDER BY modified_preReg, id_preRegister", (since,)),
+        ("analytics rollup chunk",
+         database.ROLLUP_UPDATE_SQL.format(since='%s', after_id='%s', lag='%s', limit='%s'), (since, 0, 5, 5000)),
+    ]
+
+
+def _seq_scans(plan: dict) -> List[str]:
+    found = [plan['Relation Name']] if plan.get('Node Type') == 'Seq Scan' else []
+    for child in plan.get('Plans', []):
+        found += _seq_scans(child)
+    return found
+
+
+def check_indexes(cursor) -> dict:
+    """Expected indexes that are missing, or present but INVALID (a failed concurrent build)."""
+    # The per-column form of pg_get_indexdef leaves out COLLATE, so it is added back when
+    # the index collation differs from the column's
+    cursor.execute("""
+        SELECT t.relname, c.relname, am.amname,
+               pg_get_indexdef(i.indexrelid, 1, true)
+                 || CASE WHEN i.indcollation[0] <> 0 AND i.indcollation[0] IS DISTINCT FROM a.attcollation
+                         THEN ' COLLATE ' || quote_ident(coll.collname) ELSE '' END,
+               i.indisvalid
+        FROM pg_index AS i
+        JOIN pg_class AS c ON c.oid = i.indexrelid
+        JOIN pg_class AS t ON t.oid = i.indrelid
+        JOIN pg_am AS am ON am.oid = c.relam
+        LEFT JOIN pg_attribute AS a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+        LEFT JOIN pg_collation AS coll ON coll.oid = i.indcollation[0]
+        WHERE i.indrelid = ANY(ARRAY[to_regclass('breeds_AKC_Rsrch_FoodV1'), to_regclass('questions_dog_initial3')])
+    """)
+    indexes = cursor.fetchall()
+    missing, invalid = [], []
+    for table, method, key, used_by in EXPECTED_INDEXES:
+        matches = [row for row in indexes if row[0] == table.lower() and row[2] == method and row[3] == key]
+        if not any(row[4] for row in matches):
+            entry = {'table': table, 'method': method, 'key': key, 'used_by': used_by}
+            if matches:
+                invalid.append({**entry, 'index': matches[0][1]})
+            else:
+                missing.append(entry)
+    return {'missing': missing, 'invalid': invalid}
+
+
+def check_plans(cursor, min_rows: int = MIGRATIONS_SEQSCAN_MIN_ROWS) -> List[dict]:
+    """
+    EXPLAIN (without running) each hot query and report sequential scans on tables
+    with at least min_rows rows (by the planner's estimate; small tables are
+    legitimately scanned). A query that cannot be planned, e.g. because a
+    migration is pending, is reported with its error.
+    """
+    findings = []
+    for name, query, params in _plan_checks():
+        try:
+            cursor.execute("EXPLAIN (FORMAT JSON) " + query, params)
+            tables = sorted(set(_seq_scans(cursor.fetchone()[0][0]['Plan'])))
+        except psycopg2.Error as e:
+            findings.append({'query': name, 'error': str(e).strip().splitlines()[0]})
+            continue
+        for table in tables:
+            cursor.execute("SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+            rows = cursor.fetchone()[0]
+            if rows >= min_rows:
+                findings.append({'query': name, 'table': table, 'estimated_rows': rows})
+    return findings
+
+
+def check_schema(dsn: Optional[str] = None, directory: str = MIGRATIONS_DIR) -> dict:
+    """
+    Startup check: pending or edited migrations, missing or invalid indexes and
+    sequential-scan-prone queries, each logged as a warning. Never changes anything.
+
+    Returns:
+        {'migrations': [non-applied status rows], 'missing_indexes', 'invalid_indexes', 'seq_scans'}
+    """
+    migrations = discover(directory)
+    conn = _connect(dsn)
+    try:
+        cursor = conn.cursor()
+        outstanding = [row for row in _status(migrations, _applied(cursor)) if row['state'] != 'applied']
+        indexes = check_indexes(cursor)
+        seq_scans = check_plans(cursor)
+        cursor.close()
+    except psycopg2.Error as e:
+        raise Exception(f"Database error: {str(e)}")
+    finally:
+        conn.close()
+
+    for row in outstanding:
+        logger.warning("Migration %03d_%s is %s; run python -m jobs.migrate", row['version'], row['name'], row['state'])
+    for index in indexes['missing']:
+        logger.warning("Missing %s index on %s (%s), needed for %s", index['method'], index['table'], index['key'],
+                       index['used_by'])
+    for index in indexes['invalid']:
+        logger.warning("Index %s on %s is INVALID (failed concurrent build); rerun python -m jobs.migrate",
+                       index['index'], index['table'])
+    for finding in seq_scans:
+        if 'error' in finding:
+            logger.warning("Could not plan %s: %s", finding['query'], finding['error'])
+        else:
+            logger.warning("Query %s plans a sequential scan on %s (~%d rows)", finding['query'], finding['table'],
+                           finding['estimated_rows'])
+    return {'migrations': outstanding, 'missing_indexes': indexes['missing'], 'invalid_indexes': indexes['invalid'],
+            'seq_scans': seq_scans}
@@ -0,0 +1,290 @@
+# backend/services/query_log.py - Per-statement timing, slow-query log and sampled EXPLAIN plans
+
+import contextvars
+import hashlib
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+from services.metrics import db_query_seconds
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))  # Statements slower than this are logged
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", "0.1"))  # Share of slow runs explained (0 = never)
+SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS", "300"))  # Per fingerprint
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", "10000"))  # statement_timeout for the EXPLAIN
+SLOW_QUERY_MAX_FINGERPRINTS = int(os.getenv("SLOW_QUERY_MAX_FINGERPRINTS", "500"))  # Least recently seen dropped beyond this
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\$\d+")
+_LIST = re.compile(r"\?(?:\s*,\s*\?)+")  # IN (?, ?, ?) -> IN (?)
+_ROWS = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")  # VALUES (?), (?) -> VALUES (?)
+_CAST = re.compile(r"\?::\w+(?:\[\])?")
+_SPACE = re.compile(r"\s+")
+_COMMENT = re.compile(r"--[^\n]*")
+_WRITE = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|TRUNCATE|FOR UPDATE|FOR SHARE|NEXTVAL|SETVAL)\b", re.IGNORECASE)
+
+# Set while an EXPLAIN capture runs, so its own statements (SET LOCAL, EXPLAIN, ROLLBACK) are not recorded.
+# asyncpg calls query loggers in the context of the task that ran the query, so this works for both backends.
+_capturing = contextvars.ContextVar("query_log_capturing", default=False)
+
+_EXPLAINABLE = ("SELECT", "WITH", "VALUES", "TABLE", "INSERT", "UPDATE", "DELETE", "MERGE")
+
+_NORMALIZED_CACHE_SIZE = 1024
+_NORMALIZED_CACHE_MAX_SQL = 4096  # Longer statements (e.g. expanded VALUES lists) are normalized every time
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    SQL with literals and placeholders replaced by ?, lists of them collapsed
+    and whitespace squeezed, so every execution of a statement shares one
+    fingerprint whatever its parameters or row count.
+    """
+    text = _COMMENT.sub(" ", sql)
+    text = _STRING.sub("?", text)
+    text = _PLACEHOLDER.sub("?", text)
+    text = _NUMBER.sub("?", text)
+    text = _CAST.sub("?", text)
+    text = _SPACE.sub(" ", text).strip()
+    text = _LIST.sub("?", text)
+    text = _ROWS.sub("(?)", text)
+    return text
+
+
+def fingerprint(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+def param_shapes(params) -> Optional[list]:
+    """Types and sizes of the parameters, never their values: ['str(12)', 'list[str](3)', 'None', ...]."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return [f"{key}={_shape(value)}" for key, value in params.items()]
+    return [_shape(value) for value in params]
+
+
+def _shape(value) -> str:
+    if value is None:
+        return 'None'
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}({len(value)})"
+    if isinstance(value, (list, tuple)):
+        kinds = sorted({type(v).__name__ for v in value}) or ['?']
+        return f"list[{'|'.join(kinds)}]({len(value)})"
+    return type(value).__name__
+
+
+def is_read_only(normalized: str) -> bool:
+    """True for statements EXPLAIN ANALYZE may safely re-run (plain reads without locking clauses)."""
+    first = normalized.split(" ", 1)[0].upper()
+    return first in ("SELECT", "WITH", "VALUES", "TABLE") and not _WRITE.search(normalized)
+
+
+class _StatementStats:
+    __slots__ = ('fingerprint', 'sql', 'calls', 'errors', 'slow_calls', 'total', 'max', 'last_slow_at',
+                 'last_slow_ms', 'last_slow_params', 'explain', 'explained_at')
+
+    def __init__(self, key: str, sql: str):
+        self.fingerprint = key
+        self.sql = sql
+        self.calls = 0
+        self.errors = 0
+        self.slow_calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last_slow_at = None
+        self.last_slow_ms = None
+        self.last_slow_params = None
+        self.explain = None
+        self.explained_at = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'fingerprint': self.fingerprint,
+            'sql': self.sql,
+            'calls': self.calls,
+            'errors': self.errors,
+            'slow_calls': self.slow_calls,
+            'total_ms': round(1000 * self.total, 3),
+            'mean_ms': round(1000 * self.total / self.calls, 3) if self.calls else 0.0,
+            'max_ms': round(1000 * self.max, 3),
+            'last_slow_at': self.last_slow_at,
+            'last_slow_ms': self.last_slow_ms,
+            'last_slow_params': self.last_slow_params,
+            'explain': self.explain,
+        }
+
+
+class QueryLog:
+    """
+    Timing for every statement the database backends run, keyed by the
+    fingerprint of its normalized SQL.
+
+    record() is called after each statement (psycopg2 cursor wrapper or
+    asyncpg query logger). Statements over threshold_ms are logged with
+    their normalized SQL, parameter shapes and duration. A sampled share of
+    them (at most one per fingerprint per explain_interval, and never while
+    another capture is running) is offered for EXPLAIN: record() returns
+    True and the backend runs explain_sql() off the request path, then
+    hands the plan to save_explain(). Read-only statements get
+    EXPLAIN (ANALYZE, BUFFERS); writes get a plain EXPLAIN so they are never re-run.
+    """
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_THRESHOLD_MS,
+                 explain_sample_rate: float = SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+                 explain_interval: float = SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS,
+                 max_fingerprints: int = SLOW_QUERY_MAX_FINGERPRINTS):
+        self.threshold = threshold_ms / 1000
+        self.explain_sample_rate = explain_sample_rate
+        self.explain_interval = explain_interval
+        self.max_fingerprints = max_fingerprints
+        self._stats: "OrderedDict[str, _StatementStats]" = OrderedDict()
+        self._normalized: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()  # raw SQL -> (normalized, fingerprint)
+        self._explaining = False
+        self._lock = threading.Lock()
+        self.slow_calls = 0  # Since startup; unlike the per-fingerprint counts it survives reset() and eviction
+        self.explains = 0
+        self.explain_failures = 0
+
+    def _identify(self, sql: str) -> Tuple[str, str]:
+        # Statements are mostly constant strings, so this is usually one dict lookup;
+        # new ones are normalized outside the lock
+        cached = self._normalized.get(sql)
+        if cached is None:
+            normalized = normalize_sql(sql)
+            cached = (normalized, fingerprint(normalized))
+            if len(sql) <= _NORMALIZED_CACHE_MAX_SQL:
+                with self._lock:
+                    self._normalized[sql] = cached
+                    if len(self._normalized) > _NORMALIZED_CACHE_SIZE:
+                        self._normalized.popitem(last=False)
+        return cached
+
+    def record(self, sql, params, seconds: float, failed: bool = False, name: Optional[str] = None) -> bool:
+        """
+        Account one execution. Returns True when the caller should capture an
+        EXPLAIN for it (and then call save_explain or explain_failed).
+
+        The duration is also observed in db_query_duration_seconds, labelled with
+        name (the PREPARED_STATEMENTS entry, when the caller knows it) or the fingerprint.
+        """
+        if _capturing.get():
+            return False
+        if isinstance(sql, bytes):
+            sql = sql.decode(errors='replace')
+        slow = seconds >= self.threshold
+        normalized, key = self._identify(sql)
+        db_query_seconds.observe((name or key, 'error' if failed else 'ok'), seconds)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _StatementStats(key, normalized)
+                if len(self._stats) > self.max_fingerprints:
+                    self._stats.popitem(last=False)
+            else:
+                self._stats.move_to_end(key)
+            stats.calls += 1
+            stats.total += seconds
+            stats.max = max(stats.max, seconds)
+            if failed:
+                stats.errors += 1
+            if not slow:
+                return False
+            shapes = param_shapes(params)
+            stats.slow_calls += 1
+            self.slow_calls += 1
+            stats.last_slow_at = time.time()
+            stats.last_slow_ms = round(1000 * seconds, 3)
+            stats.last_slow_params = shapes
+            explain = (not failed and not self._explaining and self.explain_sample_rate > 0
+                       and normalized.split(" ", 1)[0].upper() in _EXPLAINABLE
+                       and ";" not in normalized.rstrip("; ")  # EXPLAIN takes a single statement
+                       and time.monotonic() - stats.explained_at >= self.explain_interval
+                       and random.random() < self.explain_sample_rate)
+            if explain:
+                self._explaining = True
+                stats.explained_at = time.monotonic()
+        logger.warning("Slow query %.1f ms [%s] %s params=%s", 1000 * seconds, key, normalized[:1000], shapes)
+        return explain
+
+    @contextmanager
+    def capturing(self):
+        """Wrap an EXPLAIN capture so the statements it runs are not recorded."""
+        token = _capturing.set(True)
+        try:
+            yield
+        finally:
+            _capturing.reset(token)
+
+    def explain_sql(self, sql) -> Tuple[str, bool]:
+        """(EXPLAIN statement to run with the original parameters, whether it re-runs the statement)."""
+        if isinstance(sql, bytes):
+            sql = sql.decode(errors='replace')
+        analyze = is_read_only(normalize_sql(sql))
+        options = "ANALYZE, BUFFERS, FORMAT TEXT" if analyze else "FORMAT TEXT"
+        return f"EXPLAIN ({options}) {sql}", analyze
+
+    def save_explain(self, sql, plan_lines: List[str], analyzed: bool, seconds: float):
+        if isinstance(sql, bytes):
+            sql = sql.decode(errors='replace')
+        key = self._identify(sql)[1]
+        with self._lock:
+            self._explaining = False
+            self.explains += 1
+            stats = self._stats.get(key)
+            if stats is not None:
+                stats.explain = {
+                    'plan': "\n".join(plan_lines),
+                    'analyzed': analyzed,
+                    'captured_at': time.time(),
+                    'duration_ms': round(1000 * seconds, 3),
+                }
+        logger.info("Captured EXPLAIN%s for slow query", " ANALYZE" if analyzed else "")
+
+    def explain_failed(self, error: Exception):
+        with self._lock:
+            self._explaining = False
+            self.explain_failures += 1
+        logger.warning("EXPLAIN capture failed: %s", error)
+
+    def top(self, limit: int = 20, order_by: str = 'max') -> List[dict]:
+        """The limit statements with the highest max_ms, total_ms, mean_ms or slow_calls."""
+        keys = {
+            'max': lambda s: s.max,
+            'total': lambda s: s.total,
+            'mean': lambda s: s.total / s.calls if s.calls else 0,
+            'slow': lambda s: (s.slow_calls, s.max),
+        }
+        if order_by not in keys:
+            raise ValueError(f"order_by must be one of {', '.join(keys)}")
+        with self._lock:
+            ranked = sorted(self._stats.values(), key=keys[order_by], reverse=True)[:limit]
+            return [stats.to_dict() for stats in ranked]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'threshold_ms': round(1000 * self.threshold, 3),
+                'explain_sample_rate': self.explain_sample_rate,
+                'fingerprints': len(self._stats),
+                'slow_calls': self.slow_calls,
+                'explains': self.explains,
+                'explain_failures': self.explain_failures,
+            }
+
+
+# Process-wide log shared by both database backends
+query_log = QueryLog()
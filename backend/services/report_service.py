@@ -1,29 +1,373 @@
-
 # backend/services/report_service.py - Selects appropriate report based on user selections of age-class and health issues.
 
-def choose_report(status_dietRelat_preReg, breed):  # Function takes list of health statuses and breed name as inputs
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Declarative rule table (see report_rules.json); edits are picked up without a restart
+REPORT_RULES_PATH = os.getenv("REPORT_RULES_PATH", os.path.join(os.path.dirname(__file__), "report_rules.json"))
+# How often (seconds) the rules file's modification time is checked
+REPORT_RULES_CHECK_SECONDS = float(os.getenv("REPORT_RULES_CHECK_SECONDS", "2"))
+# Submissions classified per POST /api/reports/batch call
+REPORT_BATCH_MAX_ITEMS = int(os.getenv("REPORT_BATCH_MAX_ITEMS", "10000"))
+# Cap on declared statuses: the lookup table has 2^(statuses + 1) rows per age bucket
+REPORT_MAX_STATUSES = 16
+
+UNKNOWN_STATUS = "<unknown>"  # Bit shared by every status not declared in the rule table
+_CONDITIONS = ("only", "any", "all", "none_of", "ages")
+
+
+class ReportRulesError(Exception):
+    """The rule table is malformed or does not cover every combination."""
+
+
+class CompiledReportRules:
+    """
+    A rule table compiled into a lookup array.
+
+    Each declared status gets one bit (plus one shared bit for undeclared
+    statuses), ages fall into the declared buckets (plus one for "unknown
+    age"), and the first matching rule is precomputed for every
+    (bucket, status mask) pair. Classifying a submission is then a few dict
+    lookups to build the mask and one index into the table.
+    """
+
+    def __init__(self, table: dict, source: str = "<dict>"):
+        """
+        Args:
+            table: Parsed rule table ({'statuses', 'age_buckets', 'reports', 'rules'})
+            source: Where the table came from, for error messages
+
+        Raises:
+            ReportRulesError: If the table is malformed or some combination matches no rule
+        """
+        try:
+            statuses = [str(s).strip().lower() for s in table["statuses"]]
+            buckets = table.get("age_buckets") or []
+            self.reports: Dict[str, str] = dict(table["reports"])
+            rules = list(table["rules"])
+        except (KeyError, TypeError, ValueError) as e:
+            raise ReportRulesError(f"{source}: missing or invalid section: {e}")
+        if len(statuses) > REPORT_MAX_STATUSES:
+            raise ReportRulesError(f"{source}: at most {REPORT_MAX_STATUSES} statuses are supported")
+
+        self.version = table.get("version")
+        self.statuses = statuses + [UNKNOWN_STATUS]
+        self._bits = {status: 1 << i for i, status in enumerate(self.statuses)}
+        self._unknown_bit = self._bits[UNKNOWN_STATUS]
+
+        # Bucket i holds ages below boundaries[i]; the last bucket is open-ended
+        self.bucket_names = [b["name"] for b in buckets]
+        self._boundaries = [float(b["below_years"]) for b in buckets if b.get("below_years") is not None]
+        if buckets and len(self._boundaries) != len(buckets) - 1:
+            raise ReportRulesError(f"{source}: only the last age bucket may have below_years null")
+        if self._boundaries != sorted(self._boundaries):
+            raise ReportRulesError(f"{source}: age buckets must be in ascending order")
+        self._unknown_age = len(self.bucket_names)  # Extra row for submissions without an age
+
+        self.report_names = list(self.reports)
+        compiled = [self._compile_rule(rule, i, source) for i, rule in enumerate(rules)]
+        masks = 1 << len(self.statuses)
+        self._table: List[List[int]] = []
+        for bucket in range(len(self.bucket_names) + 1):
+            row = []
+            for mask in range(masks):
+                for report, test in compiled:
+                    if test(mask, bucket):
+                        row.append(report)
+                        break
+                else:
+                    raise ReportRulesError(f"{source}: no rule matches statuses {self._describe(mask)} "
+                                           f"with age bucket {self._bucket_name(bucket)}; add a default rule")
+            self._table.append(row)
+
+    def _compile_rule(self, rule: dict, index: int, source: str):
+        unknown = [key for key in rule if key not in _CONDITIONS + ("report",)]
+        if unknown:
+            raise ReportRulesError(f"{source}: rule {index} has unknown keys {unknown}")
+        if rule.get("report") not in self.reports:
+            raise ReportRulesError(f"{source}: rule {index} refers to undefined report {rule.get('report')!r}")
+        report = self.report_names.index(rule["report"])
+
+        def mask_of(key):
+            names = [str(s).strip().lower() for s in rule.get(key, [])]
+            missing = [n for n in names if n not in self._bits]
+            if missing:
+                raise ReportRulesError(f"{source}: rule {index} uses undeclared statuses {missing}")
+            return sum(self._bits[n] for n in set(names))
+
+        only = mask_of("only") if "only" in rule else None
+        any_of = mask_of("any") if "any" in rule else None
+        all_of = mask_of("all")
+        none_of = mask_of("none_of")
+        ages = None
+        if "ages" in rule:
+            missing = [a for a in rule["ages"] if a not in self.bucket_names]
+            if missing:
+                raise ReportRulesError(f"{source}: rule {index} uses undeclared age buckets {missing}")
+            ages = {self.bucket_names.index(a) for a in rule["ages"]}
+
+        def test(mask: int, bucket: int) -> bool:
+            return ((only is None or mask & ~only == 0)
+                    and (any_of is None or mask & any_of != 0)
+                    and mask & all_of == all_of
+                    and mask & none_of == 0
+                    and (ages is None or bucket in ages))
+        return report, test
+
+    def _describe(self, mask: int) -> List[str]:
+        return [s for s in self.statuses if mask & self._bits[s]]
+
+    def _bucket_name(self, bucket: int) -> str:
+        return self.bucket_names[bucket] if bucket < len(self.bucket_names) else "unknown"
+
+    def status_mask(self, statuses: Iterable[str]) -> int:
+        bits, unknown = self._bits, self._unknown_bit
+        mask = 0
+        for status in statuses:
+            bit = bits.get(status)  # Usually already normalized
+            if bit is None:
+                bit = bits.get(status.lower(), unknown)
+            mask |= bit
+        return mask
+
+    def age_bucket_bounds(self) -> List[Tuple[str, Optional[float]]]:
+        """(bucket name, below_years) in ascending order; the last bucket is open-ended (None)."""
+        return list(zip(self.bucket_names, self._boundaries + [None]))
+
+    def age_bucket(self, age_years: Optional[float]) -> int:
+        if age_years is None:
+            return self._unknown_age
+        return bisect.bisect_right(self._boundaries, age_years)
+
+    def classify(self, statuses: Iterable[str], age_years: Optional[float] = None) -> str:
+        """Report name for a submission."""
+        return self.report_names[self._table[self.age_bucket(age_years)][self.status_mask(statuses)]]
+
+    def render(self, report_name: str, breed: str) -> str:
+        """User-facing message for a report ({breed} is substituted)."""
+        return self.reports[report_name].format(breed=breed)
+
+
+class ReportEngine:
+    """
+    The current compiled rule table, reloaded when the rules file changes.
+
+    The file's modification time is checked at most every check_seconds.
+    A file that fails to parse or compile is logged and the previous rules
+    stay in effect.
+    """
+
+    def __init__(self, path: str, check_seconds: float = 2):
+        self.path = path
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._next_check = 0.0
+        self.loaded_at: Optional[float] = None
+        self.reloads = 0
+        self.reload_errors = 0
+        self.last_error: Optional[str] = None
+        self.rules = self._load()
+
+    def _load(self) -> CompiledReportRules:
+        mtime = os.stat(self.path).st_mtime_ns
+        with open(self.path, encoding="utf-8") as f:
+            try:
+                table = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ReportRulesError(f"{self.path}: invalid JSON: {e}")
+        rules = CompiledReportRules(table, self.path)
+        self._mtime = mtime
+        self.loaded_at = time.time()
+        return rules
+
+    def current(self) -> CompiledReportRules:
+        """The compiled rules, reloading them first if the file changed."""
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_seconds
+            self._maybe_reload()
+        return self.rules
+
+    def _maybe_reload(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            self._reload_failed(e)
+            return
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            try:
+                self.rules = self._load()
+                self.reloads += 1
+                self.last_error = None
+                logger.info("Report rules reloaded from %s (version %s)", self.path, self.rules.version)
+            except (OSError, ReportRulesError) as e:
+                self._mtime = mtime  # Don't retry this version of the file; wait for the next edit
+                self._reload_failed(e)
+
+    def _reload_failed(self, error: Exception):
+        self.reload_errors += 1
+        self.last_error = str(error)
+        logger.error("Report rules not reloaded, keeping previous version: %s", error)
+
+    def classify_batch(self, items: Sequence[Tuple[str, Iterable[str], Optional[float]]]) -> Tuple[object, List[dict]]:
+        """
+        Classify many (breed, statuses, age_years) tuples against one rules snapshot.
+
+        Returns:
+            (rules_version, [{'report_name', 'report'}, ...] in input order)
+        """
+        rules = self.current()
+        results = []
+        rendered: Dict[Tuple[str, str], str] = {}
+        for breed, statuses, age_years in items:
+            name = rules.classify(statuses, age_years)
+            key = (name, breed)
+            message = rendered.get(key)
+            if message is None:
+                message = rendered[key] = rules.render(name, breed)
+            results.append({'report_name': name, 'report': message})
+        return rules.version, results
+
+    def stats(self) -> dict:
+        rules = self.rules
+        return {
+            'path': self.path,
+            'version': rules.version,
+            'loaded_at': self.loaded_at,
+            'reloads': self.reloads,
+            'reload_errors': self.reload_errors,
+            'last_error': self.last_error,
+            'statuses': rules.statuses,
+            'age_buckets': rules.bucket_names,
+            'reports': rules.report_names,
+        }
+
+
+class ReportRenderCache:
+    """
+    Fully rendered submission reports per (breed, report type): the report
+    message plus the breed's food recommendation and key facts, so the
+    submit response needs no separate breed lookup.
+
+    Entries are rendered ahead of time for every breed the catalog reports
+    (register on_breeds_changed as a BreedCatalog listener), re-rendered for
+    breeds that change, and dropped wholesale when the report rules reload.
+    Anything missing is rendered on first use. Breeds that are not in the
+    catalog are rendered per request and never stored, so arbitrary
+    submitted names cannot grow the cache.
+    """
+
+    def __init__(self, engine: ReportEngine, lookup_breed: Callable[[str], Optional[dict]]):
+        """
+        Args:
+            engine: Report rules to classify and render with
+            lookup_breed: Returns the breed record for a breed_name_AKC, or None
+        """
+        self._engine = engine
+        self._lookup_breed = lookup_breed
+        self._rules: Optional[CompiledReportRules] = None
+        self._entries: Dict[Tuple[str, str], dict] = {}  # (breed, report name) -> rendered report
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, breed: str, statuses: Iterable[str], age_years: Optional[float] = None) -> dict:
+        """
+        The report for one submission.
+
+        Returns:
+            {'report_name', 'report', 'food_recommendation', 'breed_info'}; the last two
+            are None for a breed that is not in the catalog. Treat it as read-only (shared).
+        """
+        rules = self._current_rules()
+        report_name = rules.classify(statuses, age_years)
+        entry = self._entries.get((breed, report_name))
+        if entry is not None:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return self._render(rules, breed, report_name, self._lookup_breed(breed))
+
+    def on_breeds_changed(self, upserted: List[dict], removed: List[str]):
+        """BreedCatalog listener: re-render changed breeds, forget removed ones."""
+        rules = self._current_rules()
+        for name in removed:
+            for report_name in rules.report_names:
+                self._entries.pop((name, report_name), None)
+        for row in upserted:
+            for report_name in rules.report_names:
+                self._render(rules, row['breed_name_AKC'], report_name, row)
+
+    def _current_rules(self) -> CompiledReportRules:
+        rules = self._engine.current()
+        if rules is not self._rules:
+            # Rules reloaded: messages and report types may have changed
+            self._entries = {}
+            self._rules = rules
+        return rules
+
+    def _render(self, rules: CompiledReportRules, breed: str, report_name: str, row: Optional[dict]) -> dict:
+        entry = {
+            'report_name': report_name,
+            'report': rules.render(report_name, breed),
+            'food_recommendation': None,
+            'breed_info': None,
+        }
+        if row is not None:
+            entry['food_recommendation'] = {
+                'brand': row.get('food_recomm_brand'),
+                'product': row.get('food_recomm_product'),
+                'format': row.get('food_recomm_format'),
+            }
+            entry['breed_info'] = {
+                'breed_group_AKC': row.get('breed_group_AKC'),
+                'breed_size_categ_AKC': row.get('breed_size_categ_AKC'),
+                'breed_life_expect_yrs': row.get('breed_life_expect_yrs'),
+            }
+            self._entries[(breed, report_name)] = entry
+        return entry
+
+    def stats(self) -> dict:
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+report_engine = ReportEngine(REPORT_RULES_PATH, REPORT_RULES_CHECK_SECONDS)
+
+
+def classify_report(status_dietRelat_preReg: Iterable[str], age_years: Optional[float] = None) -> str:
+    """
+    Name of the report for a submission (e.g. 'Report_basic_foodP1').
+
+    Args:
+        status_dietRelat_preReg: List of diet-related health statuses (e.g., ['none'], ['puppy', 'allergy'])
+        age_years: Dog's age in years, if known
+    """
+    return report_engine.current().classify(status_dietRelat_preReg, age_years)
+
+
+def choose_report(status_dietRelat_preReg, breed, age_years: Optional[float] = None):
     """
     Determines which report/recommendation to provide based on dog's health status.
-    
+
     Args:
         status_dietRelat_preReg: List of diet-related health statuses (e.g., ['none'], ['puppy', 'allergy'])
         breed: Dog breed name (e.g., 'Labrador Retriever')
-    
+        age_years: Dog's age in years, for rules that depend on age (optional)
+
     Returns:
         String message indicating which type of report/recommendation to provide
     """
-    # Normalize text (optional but helpful for beginners)
-    status_dietRelat_preReg = [s.lower() for s in status_dietRelat_preReg]  # Convert all selections to lowercase for consistent comparison
-    
-    # Condition 1: Only none/puppy
-    allowed = {"none", "puppy"}  # Define which selections count as "basic" (no special health concerns)
-    if set(status_dietRelat_preReg).issubset(allowed):  # Check if ALL selections are only "none" and/or "puppy"
-        report_name = "Report_basic_foodP1"  # Assign report name for tracking/logging
-        return f"Info related to puppy or adult food for {breed}"  # Return basic nutrition report message
-    
-    # Condition 2: Any other health issues AT ALL
-    report_name = "Report_enhanced_vet"  # Assign report name for special dietary needs - "Report... adjusted; targeted; advanced
-    return f"Info related to health issues and/or pregnant female or senior"  # Return special health report message
+    rules = report_engine.current()
+    return rules.render(rules.classify(status_dietRelat_preReg, age_years), breed)
 
 
 # Example Use
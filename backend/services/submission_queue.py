@@ -0,0 +1,196 @@
+# backend/services/submission_queue.py - Write-behind batching for POST /api/submit-dog-info
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# "off" (insert inline), "flush" (queue, reply once the batch is committed) or
+# "pending" (queue, reply immediately with a pending_id to poll)
+SUBMIT_WRITE_BEHIND = os.getenv("SUBMIT_WRITE_BEHIND", "off").strip().lower()
+SUBMIT_QUEUE_MAX_SIZE = int(os.getenv("SUBMIT_QUEUE_MAX_SIZE", "1000"))  # Submissions waiting to be written
+SUBMIT_BATCH_SIZE = int(os.getenv("SUBMIT_BATCH_SIZE", "100"))  # Flush when this many are queued...
+SUBMIT_FLUSH_INTERVAL_MS = float(os.getenv("SUBMIT_FLUSH_INTERVAL_MS", "50"))  # ...or this long after the first one
+SUBMIT_ENQUEUE_TIMEOUT = float(os.getenv("SUBMIT_ENQUEUE_TIMEOUT", "0.5"))  # Seconds to wait for queue space
+SUBMIT_PENDING_RETENTION = int(os.getenv("SUBMIT_PENDING_RETENTION", "10000"))  # Resolved pending ids kept
+SUBMIT_DRAIN_TIMEOUT = float(os.getenv("SUBMIT_DRAIN_TIMEOUT", "10"))  # Seconds shutdown waits for queued writes
+
+if SUBMIT_WRITE_BEHIND not in ("off", "flush", "pending"):
+    raise ValueError(f"Unknown SUBMIT_WRITE_BEHIND '{SUBMIT_WRITE_BEHIND}'. Use 'off', 'flush' or 'pending'.")
+
+
+class QueueFullError(Exception):
+    """The write-behind queue stayed full for the whole enqueue timeout (or is shutting down)."""
+
+
+class SubmissionQueue:
+    """
+    Bounded in-process queue that writes submissions to the database in batches.
+
+    A single background task takes queued submissions and calls insert_batch
+    once per batch, flushing when batch_size items are waiting or
+    flush_interval_ms after the first one arrived, whichever comes first.
+
+    Each submit() returns a (pending_id, future) pair; the future resolves to
+    the new record id once its batch commits, so callers can either await it
+    (flush-before-ack) or hand the pending_id to the client and let it poll
+    status(). stop() refuses new work and drains everything already queued,
+    failing whatever is still unwritten after drain_timeout.
+    """
+
+    def __init__(self, insert_batch: Callable[[List[tuple]], Awaitable[List[dict]]],
+                 max_size: int = 1000, batch_size: int = 100, flush_interval_ms: float = 50,
+                 enqueue_timeout: float = 0.5, pending_retention: int = 10000, drain_timeout: float = 10):
+        """
+        Args:
+            insert_batch: Coroutine inserting a list of submissions in one transaction and
+                returning, per submission in order, {'id': ...} or {'error': ...}
+        """
+        self._insert_batch = insert_batch
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.enqueue_timeout = enqueue_timeout
+        self.pending_retention = pending_retention
+        self.drain_timeout = drain_timeout
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flushing: list = []  # Batch being written by the background task
+        self._accepting = False
+        self._statuses: "OrderedDict[str, dict]" = OrderedDict()
+
+        self.enqueued = 0
+        self.rejected = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+
+    async def start(self):
+        """Start the background flusher (called from the FastAPI lifespan)."""
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._accepting = True
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop accepting submissions and wait up to drain_timeout until everything queued
+        has been written. Submissions still unwritten after that are marked failed.
+        """
+        self._accepting = False
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.error("Write-behind queue not drained within %.1f s; %d submissions not written",
+                         self.drain_timeout, len(self._flushing) + self._queue.qsize())
+        # The interrupted batch may or may not have committed; report it as failed either way
+        unwritten = list(self._flushing)
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        while not self._queue.empty():
+            unwritten.append(self._queue.get_nowait())
+            self._queue.task_done()
+        for pending_id, _, future in unwritten:
+            self._resolve(pending_id, future, {'error': "Server shut down before the submission was written"})
+
+    async def submit(self, item: tuple):
+        """
+        Queue one submission, waiting up to enqueue_timeout for space.
+
+        Returns:
+            (pending_id, future) - the future resolves to the record id once written
+
+        Raises:
+            QueueFullError: Queue full for the whole timeout, or shutting down
+        """
+        if not self._accepting:
+            raise QueueFullError("Submission queue is not accepting writes")
+        pending_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        # Recorded before the put: the batch can be written (and its status set) before put() returns here
+        self._remember(pending_id, {'status': 'queued', 'record_id': None, 'error': None})
+        try:
+            await asyncio.wait_for(self._queue.put((pending_id, item, future)), self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            self._statuses.pop(pending_id, None)
+            self.rejected += 1
+            raise QueueFullError("Submission queue is full, please retry shortly")
+        self.enqueued += 1
+        return pending_id, future
+
+    def status(self, pending_id: str) -> Optional[dict]:
+        """State of a pending submission: queued, saved (with record_id) or failed (with error)."""
+        return self._statuses.get(pending_id)
+
+    def _remember(self, pending_id: str, state: dict):
+        self._statuses[pending_id] = state
+        self._statuses.move_to_end(pending_id)
+        while len(self._statuses) > self.pending_retention:
+            self._statuses.popitem(last=False)
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            self._flushing = batch
+            try:
+                await self._flush(batch)
+            finally:
+                self._flushing = []
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch: list):
+        self.batches += 1
+        try:
+            outcomes = await self._insert_batch([item for _, item, _ in batch])
+        except Exception as e:
+            logger.error("Write-behind batch of %d submissions failed: %s", len(batch), e)
+            outcomes = [{'error': str(e)}] * len(batch)
+        for (pending_id, _, future), outcome in zip(batch, outcomes):
+            self._resolve(pending_id, future, outcome)
+
+    def _resolve(self, pending_id: str, future: asyncio.Future, outcome: dict):
+        if outcome.get('error'):
+            self.failed += 1
+            self._remember(pending_id, {'status': 'failed', 'record_id': None, 'error': outcome['error']})
+            # Already done means cancelled: a "flush" request whose client disconnected
+            if not future.done():
+                future.set_exception(Exception(outcome['error']))
+                # Nobody awaits the future in "pending" mode; mark its exception as retrieved
+                future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        else:
+            self.written += 1
+            self._remember(pending_id, {'status': 'saved', 'record_id': outcome['id'], 'error': None})
+            if not future.done():
+                future.set_result(outcome['id'])
+
+    def stats(self) -> dict:
+        return {
+            'queued': self._queue.qsize() if self._queue else 0,
+            'max_size': self.max_size,
+            'enqueued': self.enqueued,
+            'rejected': self.rejected,
+            'written': self.written,
+            'failed': self.failed,
+            'batches': self.batches,
+        }
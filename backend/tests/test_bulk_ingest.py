@@ -0,0 +1,156 @@
+# backend/tests/test_bulk_ingest.py - Streaming JSON/NDJSON record parser and chunked loader
+#
+# Run from backend/:  python -m pytest
+
+import asyncio
+import json
+
+from services.bulk_ingest import RecordParseError, ingest_records, iter_json_records
+
+
+async def chunked(body: str, size: int):
+    data = body.encode()
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def parse(body: str, ndjson: bool = False, size: int = 7, max_record_size: int = 1000):
+    async def run():
+        return [r async for r in iter_json_records(chunked(body, size), ndjson, max_record_size)]
+    return asyncio.run(run())
+
+
+def errors(records):
+    return [str(r) for r in records if isinstance(r, RecordParseError)]
+
+
+# ---------- JSON array ----------
+
+def test_array_elements_split_across_chunks():
+    records = [{"breed": "Löwchen", "statuses": ["a", "b"], "note": "x" * 40}, {"n": None, "t": True}]
+    for size in (1, 2, 3, 5, 64):
+        assert parse(json.dumps(records), size=size) == records
+
+
+def test_trailing_number_is_not_cut_at_a_chunk_boundary():
+    assert parse("[12345, 678.5e1, -9]", size=3) == [12345, 6785.0, -9]
+    assert parse("[1, 23]", size=5) == [1, 23]
+
+
+def test_empty_array():
+    assert parse("  [ ]  ") == []
+
+
+def test_malformed_element_fails_without_reading_the_rest():
+    read = []
+
+    async def body():
+        yield b'[{"a": 1}, {"a": ]}, '
+        for _ in range(1000):
+            read.append(1)
+            yield b'{"a": 1}, '
+
+    async def run():
+        return [r async for r in iter_json_records(body(), ndjson=False)]
+
+    records = asyncio.run(run())
+    assert records[0] == {"a": 1}
+    assert len(errors(records)) == 1 and "Invalid JSON" in errors(records)[0]
+    assert len(read) <= 1
+
+
+def test_missing_closing_bracket():
+    records = parse('[{"a": 1}, {"a": 2}')
+    assert records[:2] == [{"a": 1}, {"a": 2}]
+    assert errors(records) == ["Unexpected end of JSON array"]
+
+
+def test_missing_comma():
+    records = parse('[{"a": 1} {"a": 2}]')
+    assert records[0] == {"a": 1}
+    assert "Expected ',' or ']'" in errors(records)[0]
+
+
+def test_body_that_is_not_an_array():
+    assert "must be a JSON array" in errors(parse('{"a": 1}'))[0]
+
+
+def test_oversized_element_is_rejected_without_buffering_it():
+    records = parse('[{"a": 1}, {"a": "' + "x" * 5000 + '"}]', max_record_size=100)
+    assert records[0] == {"a": 1}
+    assert errors(records) == ["Record exceeds 100 characters"]
+
+
+# ---------- NDJSON ----------
+
+def test_ndjson_records_and_blank_lines():
+    body = '{"a": 1}\n\n{"a": 2}\r\n{"a": 3}'
+    assert parse(body, ndjson=True, size=4) == [{"a": 1}, {"a": 2}, {"a": 3}]
+
+
+def test_ndjson_bad_line_only_affects_itself():
+    records = parse('{"a": 1}\n{"a": \n{"a": 3}\n', ndjson=True)
+    assert records[0] == {"a": 1} and records[2] == {"a": 3}
+    assert isinstance(records[1], RecordParseError)
+
+
+def test_ndjson_oversized_line_is_skipped():
+    body = '{"a": 1}\n{"a": "' + "x" * 5000 + '"}\n{"a": 3}\n'
+    records = parse(body, ndjson=True, size=50, max_record_size=100)
+    assert records[0] == {"a": 1} and records[2] == {"a": 3}
+    assert errors(records) == ["Record exceeds 100 characters"]
+
+
+# ---------- ingest_records ----------
+
+async def aiter(items):
+    for item in items:
+        yield item
+
+
+def validate(raw):
+    if "n" not in raw:
+        raise ValueError("n is required")
+    return raw
+
+
+def test_ingest_rejects_bad_records_individually():
+    batches = []
+
+    async def insert(items):
+        batches.append(len(items))
+        return [{"id": item["n"]} for item in items]
+
+    records = [{"n": 1}, RecordParseError("Invalid JSON: x"), {"m": 2}, {"n": 3}, {"n": 4}]
+    results = asyncio.run(ingest_records(aiter(records), validate, insert, lambda item: {}, chunk_size=2))
+    assert [r["success"] for r in results] == [True, False, False, True, True]
+    assert results[2]["error"] == "n is required"
+    assert batches == [2, 1]
+
+
+def test_ingest_stops_at_max_records():
+    async def insert(items):
+        return [{"id": item["n"]} for item in items]
+
+    records = [{"n": i} for i in range(10)]
+    results = asyncio.run(ingest_records(aiter(records), validate, insert, lambda item: {}, max_records=3))
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert results[-1]["truncated"] and not results[-1]["success"]
+
+
+def test_ingest_failed_chunk_returns_partial_results():
+    calls = []
+
+    async def insert(items):
+        calls.append(len(items))
+        if len(calls) == 2:
+            raise Exception("Timed out waiting for a database connection")
+        return [{"id": item["n"]} for item in items]
+
+    records = [{"n": i} for i in range(10)]
+    results = asyncio.run(ingest_records(aiter(records), validate, insert, lambda item: {}, chunk_size=2))
+    assert [r.get("record_id") for r in results[:2]] == [0, 1]
+    assert [r["success"] for r in results[2:4]] == [False, False]
+    assert "Timed out" in results[2]["error"]
+    assert results[-1]["truncated"] and results[-1]["index"] == 4
+    assert calls == [2, 2]
@@ -0,0 +1,210 @@
+# backend/tests/test_dogapi.py - DogApiClient caching/retries and DogApiSync matching, against httpx.MockTransport
+#
+# Run from backend/:  python -m pytest
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import models.DogApiClient as dogapi
+from models.DogApiClient import DogApiClient, DogApiError
+from services.dogapi_sync import DogApiSync, match_breeds
+
+
+def breed(dogapi_id, name, life_min=None, life_max=None):
+    return {"id": dogapi_id, "type": "breed",
+            "attributes": {"name": name, "life": {"min": life_min, "max": life_max}}}
+
+
+class StubDogApi:
+    """MockTransport handler serving breed pages, with per-test response overrides."""
+
+    def __init__(self, pages, etag='"v1"'):
+        self.pages = pages
+        self.etag = etag
+        self.requests = []
+        self.queued = []  # httpx.Response objects returned (in order) before the normal pages
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.queued:
+            return self.queued.pop(0)
+        if request.headers.get("if-none-match") == self.etag:
+            return httpx.Response(304)
+        number = int(request.url.params.get("page[number]", "1"))
+        body = {"data": self.pages[number - 1], "meta": {"pagination": {"current": number, "last": len(self.pages)}}}
+        return httpx.Response(200, json=body, headers={"ETag": self.etag})
+
+
+def make_client(stub, tmp_path, **kwargs):
+    kwargs.setdefault("cache_ttl_seconds", 3600)
+    return DogApiClient(base_url="https://dogapi.test/api/v2", cache_dir=str(tmp_path), rate_per_second=0,
+                        transport=httpx.MockTransport(stub), **kwargs)
+
+
+async def list_breeds(client):
+    async with client:
+        return await client.list_breeds()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record retry delays instead of sleeping."""
+    delays = []
+
+    async def fake_sleep(seconds):
+        delays.append(seconds)
+
+    monkeypatch.setattr(dogapi.asyncio, "sleep", fake_sleep)
+    return delays
+
+
+# ---------- DogApiClient ----------
+
+def test_list_breeds_fetches_every_page(tmp_path):
+    stub = StubDogApi([[breed("a", "Akita", 10, 14)], [breed("b", "Beagle")]])
+    client = make_client(stub, tmp_path)
+    breeds = asyncio.run(list_breeds(client))
+    assert [b["dogapi_id"] for b in breeds] == ["a", "b"]
+    assert breeds[0]["life_expectancy"] == 12.0
+    assert breeds[1]["life_expectancy"] is None
+    assert client.downloads == 2
+
+
+def test_fresh_cache_entries_skip_the_network(tmp_path):
+    stub = StubDogApi([[breed("a", "Akita")]])
+    asyncio.run(list_breeds(make_client(stub, tmp_path)))
+    client = make_client(stub, tmp_path)
+    assert asyncio.run(list_breeds(client))[0]["name"] == "Akita"
+    assert len(stub.requests) == 1
+    assert client.cache_hits == 1 and client.requests == 0
+
+
+def test_stale_entries_are_revalidated_with_etag(tmp_path):
+    stub = StubDogApi([[breed("a", "Akita")]])
+    asyncio.run(list_breeds(make_client(stub, tmp_path, cache_ttl_seconds=0)))
+    client = make_client(stub, tmp_path, cache_ttl_seconds=0)
+    assert asyncio.run(list_breeds(client))[0]["name"] == "Akita"
+    assert stub.requests[-1].headers["if-none-match"] == '"v1"'
+    assert client.not_modified == 1 and client.downloads == 0
+
+
+def test_not_modified_refreshes_the_entry_timestamp(tmp_path):
+    stub = StubDogApi([[breed("a", "Akita")]])
+    client = make_client(stub, tmp_path, cache_ttl_seconds=0)
+    asyncio.run(list_breeds(client))
+    url = str(stub.requests[0].url)
+    before = client.cache.get(url)["fetched_at"]
+    time.sleep(0.01)
+    asyncio.run(list_breeds(make_client(stub, tmp_path, cache_ttl_seconds=0)))
+    assert client.cache.get(url)["fetched_at"] > before
+
+
+def test_changed_etag_downloads_again(tmp_path):
+    stub = StubDogApi([[breed("a", "Akita")]])
+    asyncio.run(list_breeds(make_client(stub, tmp_path, cache_ttl_seconds=0)))
+    stub.etag = '"v2"'
+    stub.pages = [[breed("a", "Akita Inu")]]
+    client = make_client(stub, tmp_path, cache_ttl_seconds=0)
+    assert asyncio.run(list_breeds(client))[0]["name"] == "Akita Inu"
+    assert client.downloads == 1
+
+
+def test_retry_after_is_honoured(tmp_path, sleeps):
+    stub = StubDogApi([[breed("a", "Akita")]])
+    stub.queued = [httpx.Response(429, headers={"Retry-After": "7"})]
+    client = make_client(stub, tmp_path)
+    assert asyncio.run(list_breeds(client))[0]["name"] == "Akita"
+    assert sleeps == [7.0]
+    assert client.retries == 1
+
+
+def test_server_errors_back_off_with_jitter(tmp_path, sleeps):
+    stub = StubDogApi([[breed("a", "Akita")]])
+    stub.queued = [httpx.Response(503), httpx.Response(502)]
+    client = make_client(stub, tmp_path)
+    asyncio.run(list_breeds(client))
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 1.0 and 0 <= sleeps[1] <= 2.0
+
+
+def test_gives_up_after_max_retries(tmp_path, sleeps):
+    stub = StubDogApi([[breed("a", "Akita")]])
+    stub.queued = [httpx.Response(500)] * 3
+    client = make_client(stub, tmp_path, max_retries=2)
+    with pytest.raises(DogApiError):
+        asyncio.run(list_breeds(client))
+    assert len(stub.requests) == 3
+
+
+def test_client_errors_are_not_retried(tmp_path, sleeps):
+    stub = StubDogApi([[breed("a", "Akita")]])
+    stub.queued = [httpx.Response(404)]
+    with pytest.raises(DogApiError):
+        asyncio.run(list_breeds(make_client(stub, tmp_path)))
+    assert sleeps == [] and len(stub.requests) == 1
+
+
+# ---------- match_breeds / DogApiSync ----------
+
+def row(name, dogapi_id=None, other_names=None):
+    return {"breed_name_AKC": name, "dogapi_id": dogapi_id, "breed_otherNames": other_names}
+
+
+def api(dogapi_id, name, life=None):
+    return {"dogapi_id": dogapi_id, "name": name, "life_expectancy": life}
+
+
+def test_match_by_normalized_name():
+    matches, unmatched = match_breeds([row("Löwchen")], [api("l1", "Lowchen", 13.0), api("x", "Xolo")])
+    assert matches == [("Löwchen", "l1", 13.0)]
+    assert unmatched == ["Xolo"]
+
+
+def test_existing_dogapi_id_is_kept():
+    matches, _ = match_breeds([row("Akita", dogapi_id="old")], [api("old", "Akita Inu"), api("new", "Akita")])
+    assert ("Akita", "old", None) in matches
+    assert all(dogapi_id != "new" for _, dogapi_id, _ in matches)
+
+
+def test_official_names_take_precedence_over_aliases():
+    # "Poodle" is an alias of the first row, but another row is named Poodle
+    catalog = [row("Caniche", other_names="Poodle;Pudel"), row("Poodle")]
+    matches, _ = match_breeds(catalog, [api("p", "Poodle"), api("c", "Pudel")])
+    assert ("Poodle", "p", None) in matches
+    assert ("Caniche", "c", None) in matches
+
+
+def test_alias_used_when_no_row_has_the_name():
+    matches, _ = match_breeds([row("Alsatian", other_names="German Shepherd Dog")], [api("g", "German Shepherd Dog")])
+    assert matches == [("Alsatian", "g", None)]
+
+
+def test_each_dogapi_breed_is_assigned_once():
+    catalog = [row("Toy A", other_names="Toy"), row("Toy B", other_names="Toy")]
+    matches, _ = match_breeds(catalog, [api("t", "Toy")])
+    assert matches == [("Toy A", "t", None)]
+
+
+def test_sync_applies_matches_in_batches(tmp_path):
+    stub = StubDogApi([[breed("a", "Akita", 10, 14), breed("b", "Beagle")], [breed("c", "Collie")]])
+    client = make_client(stub, tmp_path)
+    batches = []
+
+    async def load_catalog():
+        return [row("Akita"), row("Beagle"), row("Collie")]
+
+    async def apply_batch(batch):
+        batches.append(batch)
+        return [name for name, _, _ in batch]
+
+    async def run():
+        async with client:
+            return await DogApiSync(client.list_breeds, load_catalog, apply_batch, batch_size=2).run_once()
+
+    result = asyncio.run(run())
+    assert [len(b) for b in batches] == [2, 1]
+    assert result["updated"] == ["Akita", "Beagle", "Collie"]
+    assert batches[0][0] == ("Akita", "a", 12.0)
@@ -11,7 +11,10 @@ function ChatBot({ apiUrl = 'http://localhost:5000/api/chat' }) {
   const [messages, setMessages] = useState([]);
   const [inputMessage, setInputMessage] = useState('');
   const [isLoading, setIsLoading] = useState(false);
+  const [isStreaming, setIsStreaming] = useState(false);
   const [error, setError] = useState(null);
+  // Server-side session holding the conversation; the server reads the history from it
+  const [sessionId, setSessionId] = useState(null);
 
   const sendMessage = async () => {
     if (!inputMessage.trim() || isLoading) return;
@@ -26,41 +29,84 @@ function ChatBot({ apiUrl = 'http://localhost:5000/api/chat' }) {
     setMessages(prev => [...prev, newUserMessage]);
 
     try {
-      // Format conversation history for API (exclude system messages)
-      const conversationHistory = messages.map(msg => ({
-        role: msg.role,
-        content: msg.content
-      }));
-
-      const response = await fetch(apiUrl, {
+      // Stream the reply over Server-Sent Events so tokens render as they arrive
+      const response = await fetch(`${apiUrl}/stream`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
         body: JSON.stringify({
           message: userMessage,
-          conversation_history: conversationHistory
+          session_id: sessionId,
+          // Ignored while the session is alive; seeds a new one if the server no longer
+          // knows it (another worker, a restart or expiry) so the context is not lost
+          conversation_history: messages
         })
       });
 
-      const data = await response.json();
-
       if (!response.ok) {
+        const data = await response.json().catch(() => ({}));
         throw new Error(data.detail || data.error || 'Failed to get response');
       }
 
-      if (data.success && data.response) {
-        // Add assistant response to UI
-        const assistantMessage = { role: 'assistant', content: data.response };
-        setMessages(prev => [...prev, assistantMessage]);
-      } else {
-        throw new Error(data.error || 'No response from AI');
+      // Add the assistant message on the first token, then grow it as tokens arrive
+      let started = false;
+      const appendToken = (text) => {
+        if (!started) {
+          started = true;
+          setIsStreaming(true);
+          setMessages(prev => [...prev, { role: 'assistant', content: text }]);
+          return;
+        }
+        setMessages(prev => {
+          const last = prev[prev.length - 1];
+          return [...prev.slice(0, -1), { ...last, content: last.content + text }];
+        });
+      };
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let streamError = null;
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // SSE frames are separated by a blank line: "event: <name>\ndata: <json>\n\n"
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+          const frame = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          const event = frame.match(/^event: (.*)$/m)?.[1];
+          const data = frame.match(/^data: (.*)$/m)?.[1];
+          if (!data) continue;
+          const payload = JSON.parse(data);
+          if (event === 'token') {
+            appendToken(payload.content);
+          } else if (event === 'done') {
+            if (payload.session_reset) {
+              console.info('Chat session expired; continued in a new session from the local history');
+            }
+            setSessionId(payload.session_id);
+          } else if (event === 'error') {
+            streamError = payload.error;
+          }
+        }
+      }
+
+      if (streamError) {
+        throw new Error(streamError);
+      }
+      if (!started) {
+        throw new Error('No response from AI');
       }
     } catch (err) {
       setError(err.message);
       console.error('Chat error:', err);
     } finally {
       setIsLoading(false);
+      setIsStreaming(false);
     }
   };
 
@@ -72,6 +118,11 @@ function ChatBot({ apiUrl = 'http://localhost:5000/api/chat' }) {
   };
 
   const clearChat = () => {
+    if (sessionId) {
+      // Best effort: the session also expires on its own
+      fetch(`${apiUrl}/session/${sessionId}`, { method: 'DELETE' }).catch(() => {});
+    }
+    setSessionId(null);
     setMessages([]);
     setError(null);
   };
@@ -99,7 +150,7 @@ function ChatBot({ apiUrl = 'http://localhost:5000/api/chat' }) {
           </div>
         ))}
 
-        {isLoading && (
+        {isLoading && !isStreaming && (
           <div className="message assistant">
             <div className="message-content">
               <span className="typing-indicator">Thinking...</span>